@@ -0,0 +1,540 @@
+#!/usr/bin/env python3
+"""
+Sales Chatbot Async Web Server
+An ASGI (Starlette) server exposing the same routes as web_server.py.
+The Groq call is awaited on a pooled async HTTP client and SQLite work runs
+on a bounded thread pool, so one process can keep hundreds of questions in
+flight instead of blocking a worker thread per request.
+"""
+
+import asyncio
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+
+from starlette.applications import Starlette
+from starlette.middleware import Middleware
+from starlette.middleware.cors import CORSMiddleware
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.responses import HTMLResponse, JSONResponse, Response, StreamingResponse
+from starlette.routing import Route
+
+from chat_bot import run_query, iter_query, iter_in_order, column_types, BATCH_CONCURRENCY, DB_PATH
+from database.connection_pool import POOL_SIZE
+from database.export import (EXPORT_BATCH_ROWS, EXPORT_FORMATS, SQL_REGISTRY, ExportError,
+                             check_format, export_rows)
+from database.guardrails import QueryRejected
+from llm.backends import AsyncHedgedClient
+from llm.sql_router import generate_sql_async
+from http_cache import (COMPRESS_MIN_BYTES, data_validators, is_compressible,
+                        is_not_modified, negotiate, validator_headers)
+from metrics import CONTENT_TYPE, IN_FLIGHT, REGISTRY, SQL_GENERATION_SECONDS, PhaseTimer, record_error
+from single_flight import AsyncSingleFlight
+from web_server import (
+    EXAMPLE_QUERIES,
+    INDEX_PAGE,
+    TEST_PAGE,
+    SalesChatBot,
+    build_batch_item,
+    build_batch_summary,
+    build_cache_stats_payload,
+    collect_cache_metrics,
+    build_database_payload,
+    encode_json,
+    build_query_payload,
+    build_stats_payload,
+    format_ndjson,
+    format_sse,
+    parse_batch_questions,
+    parse_result_format,
+)
+
+# SQLite threads match the connection pool so no thread waits for a connection
+DB_WORKERS = int(os.getenv('ASYNC_DB_WORKERS', str(POOL_SIZE)))
+# Concurrent connections per LLM backend; requests beyond this queue on the client pool
+LLM_POOL_SIZE = int(os.getenv('ASYNC_LLM_POOL_SIZE', '100'))
+
+
+class AsyncSalesChatBot(SalesChatBot):
+    """SalesChatBot whose query path awaits the LLM and offloads SQLite"""
+
+    def __init__(self, executor):
+        super().__init__()
+        self.executor = executor
+        self.client = AsyncHedgedClient(pool_size=LLM_POOL_SIZE)
+        self.flights = AsyncSingleFlight()
+
+    async def process_query_async(self, user_input, use_cache=True):
+        """Process a natural language query without blocking the event loop
+
+        Concurrent identical questions are coalesced as in process_query.
+        """
+        with IN_FLIGHT.track():
+            result, shared = await self.flights.do(self.flight_key(user_input, use_cache),
+                                                   self._process_query_async, user_input, use_cache)
+        return dict(result, coalesced=shared)
+
+    async def _process_query_async(self, user_input, use_cache=True):
+        """Generate and run the SQL for one question"""
+        start_time = time.time()
+        loop = asyncio.get_running_loop()
+        timer = PhaseTimer()
+
+        try:
+            print(f"Processing query: {user_input}")
+
+            with timer.phase('sql_generation'):
+                sql, source = await generate_sql_async(user_input, self.client, DB_PATH, self.executor)
+            SQL_GENERATION_SECONDS.observe(timer.phases['sql_generation'], source=source)
+            print(f"Generated SQL ({source}): {sql}")
+
+            with timer.phase('sql_execution'):
+                headers, results, truncated = await loop.run_in_executor(
+                    self.executor, lambda: run_query(sql, use_cache=use_cache))
+
+            # Building dicts and the response text is CPU work proportional
+            # to the result, so it runs off the loop as well
+            return await loop.run_in_executor(
+                self.executor, self._build_result,
+                user_input, sql, source, headers, results, start_time, timer, truncated)
+
+        except Exception as e:
+            return self._build_error(e, start_time, timer)
+
+    async def stream_query_async(self, user_input):
+        """Async counterpart of SalesChatBot.stream_query (same events)"""
+        start_time = time.time()
+        sql = ''
+        try:
+            sql, source = await generate_sql_async(user_input, self.client, DB_PATH, self.executor)
+            print(f"Generated SQL ({source}): {sql}")
+
+            rows_iter = aiter_blocking(iter_query(sql))
+            headers = await rows_iter.__anext__()
+            yield {
+                'type': 'meta',
+                'sql_query': sql,
+                'source': source,
+                'columns': headers,
+                'first_row_time': round(time.time() - start_time, 4)
+            }
+
+            row_count = 0
+            async for rows in rows_iter:
+                row_count += len(rows)
+                yield {'type': 'rows', 'rows': rows}
+
+            if row_count:
+                response = f"Query executed successfully and returned {row_count} result(s)."
+            else:
+                response = "No results found for your query. The data might not exist or the query needs adjustment."
+            yield {
+                'type': 'end',
+                'success': True,
+                'response': response,
+                'row_count': row_count,
+                'execution_time': round(time.time() - start_time, 2)
+            }
+
+        except Exception as e:
+            yield {
+                'type': 'error',
+                'success': False,
+                'error': f"Error processing query: {str(e)}",
+                'sql_query': sql,
+                'execution_time': round(time.time() - start_time, 2)
+            }
+
+    async def aclose(self):
+        await self.client.aclose()
+
+
+executor = ThreadPoolExecutor(max_workers=DB_WORKERS, thread_name_prefix='sqlite')
+chatbot = None
+
+
+async def run_blocking(func, *args):
+    """Run a blocking function on the bounded SQLite thread pool"""
+    return await asyncio.get_running_loop().run_in_executor(executor, func, *args)
+
+
+_DONE = object()
+
+
+async def aiter_blocking(iterator):
+    """
+    Iterate a blocking iterator (a SQLite cursor generator, an export
+    encoder) on the SQLite thread pool, one item per hop, so a slow client
+    holds no thread between items.
+    """
+    try:
+        while True:
+            item = await run_blocking(next, iterator, _DONE)
+            if item is _DONE:
+                return
+            yield item
+    finally:
+        try:
+            iterator.close()
+        except ValueError:
+            pass  # still running on a worker; it closes when that call releases it
+
+
+async def asset_response(request, asset, error_prefix):
+    """Serve an in-memory page, precompressed, answering revalidations with 304"""
+    try:
+        page = asset.current()
+    except Exception as e:
+        return HTMLResponse(f"{error_prefix}: {str(e)}")
+    if is_not_modified(request.headers, page.etag, page.last_modified):
+        return Response(status_code=304, headers=page.headers())
+    body, encoding = page.encoded(request.headers.get('accept-encoding', ''))
+    return Response(body, headers={**page.headers(encoding), 'Content-Type': page.content_type})
+
+
+async def index(request):
+    """Serve the main web UI from memory"""
+    return await asset_response(request, INDEX_PAGE, "Error loading UI")
+
+
+async def test_ui(request):
+    """Serve the test UI for debugging"""
+    return await asset_response(request, TEST_PAGE, "Error loading test UI")
+
+
+async def data_response(request, build_payload, *args):
+    """Answer a data endpoint with validators from the database version (see web_server)"""
+    resource = f"{request.url.path}?{request.url.query}"
+    validators = await run_blocking(data_validators, DB_PATH, resource)
+    if validators and is_not_modified(request.headers, *validators):
+        return Response(status_code=304, headers=validator_headers(*validators))
+    payload, status = await run_blocking(build_payload, *args)
+    response = JSONResponse(payload, status_code=status)
+    if validators and status == 200:
+        response.headers.update(validator_headers(*validators))
+    return response
+
+
+class CompressionMiddleware:
+    """
+    gzip / brotli encode complete text and JSON responses above
+    COMPRESS_MIN_BYTES. Streamed responses (more than one body message)
+    and responses that already carry a Content-Encoding pass through.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        accept_encoding = Headers(scope=scope).get('accept-encoding', '')
+        start = None
+
+        async def send_compressed(message):
+            nonlocal start
+            if message['type'] == 'http.response.start':
+                start = message  # held until the first body message
+                return
+            if start is None or message['type'] != 'http.response.body':
+                await send(message)
+                return
+
+            headers = MutableHeaders(raw=start['headers'])
+            body = message.get('body', b'')
+            if (not message.get('more_body') and start['status'] not in (204, 304)
+                    and 'content-encoding' not in headers and len(body) >= COMPRESS_MIN_BYTES
+                    and is_compressible(headers.get('content-type', ''))):
+                headers.add_vary_header('Accept-Encoding')
+                body, encoding = negotiate(body, headers['content-type'], accept_encoding)
+                if encoding:
+                    headers['Content-Encoding'] = encoding
+                    headers['Content-Length'] = str(len(body))
+                    message = {**message, 'body': body}
+            await send(start)
+            start = None
+            await send(message)
+
+        await self.app(scope, receive, send_compressed)
+
+
+async def process_query(request):
+    """Process a natural language query"""
+    try:
+        try:
+            data = await request.json()
+        except ValueError:
+            data = {}
+        query = (data.get('query') or '').strip()
+
+        if not query:
+            return JSONResponse({
+                'success': False,
+                'error': 'Query is required',
+                'status': 'error'
+            }, status_code=400)
+
+        result_format, html, error = parse_result_format(data, request.query_params)
+        if error:
+            return JSONResponse({
+                'success': False,
+                'error': error,
+                'status': 'error'
+            }, status_code=400)
+
+        use_cache = data.get('cache', True) is not False and \
+            'no-cache' not in request.headers.get('cache-control', '')
+
+        result = await chatbot.process_query_async(query, use_cache=use_cache)
+        payload, status = await run_blocking(build_query_payload, result, result_format, html)
+        return await run_blocking(json_response, payload, status)
+
+    except Exception as e:
+        return JSONResponse({
+            'success': False,
+            'error': str(e),
+            'status': 'error'
+        }, status_code=500)
+
+
+async def stream_query(request):
+    """Stream rows as they are read (NDJSON or SSE, same body as the Flask route)"""
+    try:
+        data = await request.json()
+    except ValueError:
+        data = {}
+    query = (data.get('query') or '').strip() if isinstance(data, dict) else ''
+
+    if not query:
+        return JSONResponse({
+            'success': False,
+            'error': 'Query is required',
+            'status': 'error'
+        }, status_code=400)
+
+    use_sse = data.get('format') == 'sse' or \
+        'text/event-stream' in request.headers.get('accept', '')
+    if use_sse:
+        encode, media_type = format_sse, 'text/event-stream'
+    else:
+        encode, media_type = format_ndjson, 'application/x-ndjson'
+
+    async def generate():
+        async for event in chatbot.stream_query_async(query):
+            yield encode(event)
+
+    return StreamingResponse(generate(), media_type=media_type,
+                             headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+
+async def export_query(request):
+    """Stream a query result as CSV, Arrow IPC or Parquet (same parameters as the Flask route)"""
+    params = dict(request.query_params)
+    if request.method == 'POST':
+        try:
+            body = await request.json()
+        except ValueError:
+            body = None
+        params.update(body if isinstance(body, dict) else {})
+    fmt = params.get('format', 'csv')
+    question = (params.get('question') or '').strip()
+    key = params.get('sql_id')
+    sql = ''
+
+    try:
+        check_format(fmt)
+        if key:
+            sql = SQL_REGISTRY.get(key)
+            if sql is None:
+                return JSONResponse({
+                    'success': False,
+                    'error': f"Unknown sql_id {key!r}; ask the question through /api/query first "
+                             f"or export by question",
+                    'status': 'error'
+                }, status_code=404)
+        elif question:
+            sql, source = await generate_sql_async(question, chatbot.client, DB_PATH, executor)
+            key = SQL_REGISTRY.register(sql)
+            print(f"Exporting SQL ({source}): {sql}")
+        else:
+            return JSONResponse({
+                'success': False,
+                'error': 'question or sql_id is required',
+                'status': 'error'
+            }, status_code=400)
+
+        declared = await run_blocking(column_types, sql) if fmt != 'csv' else None
+        batches = iter_query(sql, EXPORT_BATCH_ROWS)
+        headers = await run_blocking(next, batches)
+        body = export_rows(fmt, headers, batches, declared)
+
+    except ExportError as e:
+        return JSONResponse({'success': False, 'error': str(e), 'status': 'error'}, status_code=400)
+    except QueryRejected as e:
+        record_error('export', e)
+        return JSONResponse({'success': False, 'error': f"❌ {e}", 'sql_query': sql, 'status': 'error'},
+                            status_code=400)
+    except Exception as e:
+        record_error('export', e)
+        return JSONResponse({
+            'success': False,
+            'error': f"Error exporting query: {str(e)}",
+            'status': 'error'
+        }, status_code=500)
+
+    content_type, extension = EXPORT_FORMATS[fmt]
+    return StreamingResponse(aiter_blocking(body), media_type=content_type, headers={
+        'Content-Disposition': f'attachment; filename="export-{key}.{extension}"',
+        'X-SQL-Id': key,
+        'Cache-Control': 'no-cache'
+    })
+
+
+async def iter_batch(questions, use_cache):
+    """Answer questions concurrently, yielding (index, result) as each finishes"""
+    slots = asyncio.Semaphore(BATCH_CONCURRENCY)
+
+    async def answer(index, question):
+        async with slots:
+            return index, await chatbot.process_query_async(question, use_cache=use_cache)
+
+    for next_done in asyncio.as_completed([answer(i, q) for i, q in enumerate(questions)]):
+        yield await next_done
+
+
+async def aiter_in_order(completed):
+    """Async counterpart of chat_bot.iter_in_order"""
+    pending, next_index = {}, 0
+    async for index, result in completed:
+        pending[index] = result
+        while next_index in pending:
+            yield next_index, pending.pop(next_index)
+            next_index += 1
+
+
+async def process_query_batch(request):
+    """Answer a list of questions concurrently (same body as the Flask route)"""
+    try:
+        data = await request.json()
+    except ValueError:
+        data = {}
+    questions, error = parse_batch_questions(data if isinstance(data, dict) else {})
+    if error:
+        return JSONResponse({
+            'success': False,
+            'error': error,
+            'status': 'error'
+        }, status_code=400)
+
+    use_cache = data.get('cache', True) is not False and \
+        'no-cache' not in request.headers.get('cache-control', '')
+    start_time = time.time()
+
+    stream = data.get('stream') is True or \
+        'application/x-ndjson' in request.headers.get('accept', '')
+    if not stream:
+        completed = [pair async for pair in iter_batch(questions, use_cache)]
+        items = [build_batch_item(index, questions[index], result)
+                 for index, result in iter_in_order(completed)]
+        return JSONResponse(build_batch_summary(items, start_time, results=items))
+
+    async def generate():
+        items = []
+        results = iter_batch(questions, use_cache)
+        if data.get('ordered') is True:
+            results = aiter_in_order(results)
+        async for index, result in results:
+            item = build_batch_item(index, questions[index], result)
+            items.append(item)
+            yield format_ndjson({'type': 'result', **item})
+        yield format_ndjson({'type': 'end', **build_batch_summary(items, start_time)})
+
+    return StreamingResponse(generate(), media_type='application/x-ndjson',
+                             headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+
+def json_response(payload, status=200):
+    """Serialize a payload with encode_json, recording the time it takes"""
+    with PhaseTimer().phase('serialization'):
+        body = encode_json(payload)
+    return Response(body, status_code=status, media_type='application/json')
+
+
+async def get_metrics(request):
+    """Prometheus metrics (same families as the Flask server)"""
+    body = await run_blocking(lambda: REGISTRY.render() + collect_cache_metrics(chatbot))
+    return Response(body, media_type=CONTENT_TYPE)
+
+
+async def get_stats(request):
+    """Get database statistics"""
+    return await data_response(request, build_stats_payload)
+
+
+async def get_cache_stats(request):
+    """Get cache counters, per-path request counts and coalescing counters"""
+    return JSONResponse(build_cache_stats_payload(chatbot))
+
+
+async def get_examples(request):
+    """Get example queries"""
+    return JSONResponse({
+        'status': 'success',
+        'examples': EXAMPLE_QUERIES
+    })
+
+
+async def get_database_contents(request):
+    """Get database contents (same parameters as the Flask route)"""
+    return await data_response(request, build_database_payload, request.query_params)
+
+
+@asynccontextmanager
+async def lifespan(app):
+    """Create the async chatbot on startup and close its HTTP pool on shutdown"""
+    global chatbot
+    chatbot = AsyncSalesChatBot(executor)
+    try:
+        yield
+    finally:
+        await chatbot.aclose()
+        executor.shutdown(wait=False)
+
+
+app = Starlette(
+    routes=[
+        Route('/', index),
+        Route('/test', test_ui),
+        Route('/api/query', process_query, methods=['POST']),
+        Route('/api/query/stream', stream_query, methods=['POST']),
+        Route('/api/export', export_query, methods=['GET', 'POST']),
+        Route('/api/query/batch', process_query_batch, methods=['POST']),
+        Route('/metrics', get_metrics, methods=['GET']),
+        Route('/api/stats', get_stats, methods=['GET']),
+        Route('/api/cache/stats', get_cache_stats, methods=['GET']),
+        Route('/api/examples', get_examples, methods=['GET']),
+        Route('/api/database', get_database_contents, methods=['GET']),
+    ],
+    middleware=[Middleware(CORSMiddleware, allow_origins=['*'], allow_methods=['*'],
+                           allow_headers=['*']),
+                Middleware(CompressionMiddleware)],
+    lifespan=lifespan,
+)
+
+
+def run(host='0.0.0.0', port=5000):
+    """Serve the ASGI app with uvicorn"""
+    import uvicorn
+    uvicorn.run(app, host=host, port=port, log_level='info')
+
+
+if __name__ == '__main__':
+    print("🚀 Starting Sales Chatbot Async Web Server...")
+    print("📱 Web UI will be available at: http://localhost:5000")
+    print("🔌 API endpoints available at: http://localhost:5000/api/")
+    print("⚡ Press Ctrl+C to stop the server")
+
+    run()
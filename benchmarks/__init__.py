@@ -0,0 +1,2 @@
+# Benchmarks Package
+# This package contains offline benchmarks that run against a mock LLM instead of Groq
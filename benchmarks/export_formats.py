@@ -0,0 +1,118 @@
+"""
+Export Format Benchmark
+Pulls a whole "Show all orders" extract (100k rows at scale factor 0.1)
+through /api/export in each format, and through /api/query as the JSON
+baseline, then times loading each into a pyarrow Table the way a
+downstream tool would. Reports size, server time and load time.
+
+Needs pyarrow:
+
+    python -m benchmarks.export_formats --scale 0.1
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+from tabulate import tabulate
+
+# The extract is the whole table, so lift the /api/query row cap for the
+# JSON baseline (read when the guardrails module is imported)
+os.environ.setdefault('QUERY_MAX_ROWS', '0')
+
+import chat_bot
+import web_server
+from benchmarks.latency import ensure_scale_db
+from database import export
+
+QUESTION = "Show all orders"
+
+
+def load_json(body: bytes):
+    return export.pa.Table.from_pylist(json.loads(body)['results'])
+
+
+def load_csv(body: bytes):
+    import pyarrow.csv
+    return pyarrow.csv.read_csv(export.pa.BufferReader(body))
+
+
+def load_arrow(body: bytes):
+    return export.pa.ipc.open_stream(body).read_all()
+
+
+def load_parquet(body: bytes):
+    return export.pq.read_table(export.pa.BufferReader(body))
+
+
+# name -> (request, loader)
+TARGETS = {
+    'json (/api/query)': (lambda c: c.post('/api/query', json={'query': QUESTION, 'html': False}), load_json),
+    'csv': (lambda c: c.get('/api/export', query_string={'question': QUESTION, 'format': 'csv'}), load_csv),
+    'arrow': (lambda c: c.get('/api/export', query_string={'question': QUESTION, 'format': 'arrow'}), load_arrow),
+    'parquet': (lambda c: c.get('/api/export', query_string={'question': QUESTION, 'format': 'parquet'}),
+                load_parquet),
+}
+
+
+def run_benchmark(db_path: str, repeat: int = 3) -> list:
+    """Size, server time and load time for each target (fastest of ``repeat``)."""
+    saved = chat_bot.DB_PATH, web_server.DB_PATH
+    chat_bot.DB_PATH = web_server.DB_PATH = db_path
+    client = web_server.app.test_client()
+    results = []
+    try:
+        for name, (fetch, load) in TARGETS.items():
+            fetch_seconds = load_seconds = float('inf')
+            for _ in range(repeat):
+                start = time.perf_counter()
+                body = fetch(client).get_data()
+                fetch_seconds = min(fetch_seconds, time.perf_counter() - start)
+
+                start = time.perf_counter()
+                table = load(body)
+                load_seconds = min(load_seconds, time.perf_counter() - start)
+            results.append({
+                'target': name,
+                'rows': table.num_rows,
+                'bytes': len(body),
+                'server_ms': round(fetch_seconds * 1000, 1),
+                'load_ms': round(load_seconds * 1000, 1),
+            })
+    finally:
+        chat_bot.DB_PATH, web_server.DB_PATH = saved
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export format size, server time and load time")
+    parser.add_argument('--scale', type=float, default=0.1,
+                        help="scale factor of the generated database (default: 0.1, 100k orders)")
+    parser.add_argument('--db', help="use an existing database instead")
+    parser.add_argument('--repeat', type=int, default=3, help="runs per format; the fastest is kept")
+    parser.add_argument('--output', '-o', help="also write the results as JSON")
+    args = parser.parse_args()
+
+    if export.pa is None:
+        print("❌ This benchmark needs pyarrow (pip install pyarrow)")
+        sys.exit(1)
+
+    db_path = args.db or ensure_scale_db(args.scale)
+    results = run_benchmark(db_path, args.repeat)
+    baseline = results[0]
+    print(f"\n📦 {QUESTION!r} from {os.path.basename(db_path)}:")
+    print(tabulate([[r['target'], f"{r['rows']:,}", f"{r['bytes'] / 1e6:.2f}", r['server_ms'], r['load_ms'],
+                     f"{baseline['load_ms'] / max(r['load_ms'], 0.1):.1f}x"] for r in results],
+                   headers=['format', 'rows', 'MB', 'server ms', 'load ms', 'load vs json'],
+                   tablefmt='simple'))
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+        print(f"\n💾 Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""
+Hedged Request Benchmark
+Sends the benchmark questions to a primary mock LLM with a heavy tail
+(a few requests straggle for seconds) and compares latency percentiles
+of the primary alone with HedgedClient hedging to a second, slightly
+slower but steady mock. Also reports how many extra requests hedging
+cost.
+
+    python -m benchmarks.hedging --questions 300 --slow-rate 0.03
+"""
+
+import argparse
+import json
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from tabulate import tabulate
+
+from benchmarks.mock_llm import CANNED_SQL, MockLLMServer
+from llm.backends import HEDGE_MIN_SAMPLES, Backend, HedgedClient
+
+
+def percentiles(samples: list) -> dict:
+    samples = sorted(samples)
+    pick = lambda p: samples[min(len(samples) - 1, int(len(samples) * p / 100))] * 1000
+    return {'p50_ms': round(pick(50), 1), 'p95_ms': round(pick(95), 1), 'p99_ms': round(pick(99), 1),
+            'max_ms': round(samples[-1] * 1000, 1), 'mean_ms': round(statistics.mean(samples) * 1000, 1)}
+
+
+def run(client: HedgedClient, questions: int, concurrency: int) -> list:
+    canned = list(CANNED_SQL)
+
+    def ask(i):
+        question = canned[i % len(canned)]
+        start = time.perf_counter()
+        client.get_sql(question, prompt=f"Question: {question}\nSQL:")
+        return time.perf_counter() - start
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        return list(pool.map(ask, range(questions)))
+
+
+def run_benchmark(questions: int, concurrency: int, latency_ms: float, slow_rate: float,
+                  slow_ms: float, secondary_ms: float) -> list:
+    results = []
+    with MockLLMServer(CANNED_SQL, latency_ms, latency_ms * 0.2, slow_rate=slow_rate, slow_ms=slow_ms) as primary, \
+            MockLLMServer(CANNED_SQL, secondary_ms, secondary_ms * 0.2) as secondary:
+        for name, urls in (('primary only', [primary.url]), ('hedged', [primary.url, secondary.url])):
+            backends = [Backend(f'mock-{i}', url, 'mock', 'mock') for i, url in enumerate(urls)]
+            client = HedgedClient(backends, workers=concurrency * 2)
+            run(client, HEDGE_MIN_SAMPLES * 2, concurrency)  # warm up connections and the latency window
+            sent_before = primary.requests + secondary.requests
+            samples = run(client, questions, concurrency)
+            sent = primary.requests + secondary.requests - sent_before
+            results.append({'client': name, **percentiles(samples),
+                            'extra_requests': f"{(sent - questions) / questions:.1%}",
+                            'hedge_delay_ms': backends[0].stats()['hedge_delay_ms'] if len(backends) > 1 else None})
+            client.close()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="LLM tail latency with and without hedged requests")
+    parser.add_argument('--questions', type=int, default=300)
+    parser.add_argument('--concurrency', type=int, default=4)
+    parser.add_argument('--latency', type=float, default=150.0, help="primary mock median latency in ms")
+    parser.add_argument('--slow-rate', type=float, default=0.03, help="fraction of primary requests that straggle")
+    parser.add_argument('--slow-ms', type=float, default=2000.0, help="extra ms for a straggling request")
+    parser.add_argument('--secondary', type=float, default=200.0, help="secondary mock median latency in ms")
+    parser.add_argument('--output', '-o', help="also write the results as JSON")
+    args = parser.parse_args()
+
+    results = run_benchmark(args.questions, args.concurrency, args.latency, args.slow_rate,
+                            args.slow_ms, args.secondary)
+    print(f"\n⏱️ {args.questions} questions, {args.slow_rate:.0%} of primary requests +{args.slow_ms:g}ms:")
+    print(tabulate([list(r.values()) for r in results], headers=list(results[0]), tablefmt='simple'))
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+        print(f"\n💾 Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
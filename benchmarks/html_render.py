@@ -0,0 +1,140 @@
+"""
+HTML Table Rendering Benchmark
+Measures rows per second for the /api/query HTML table, comparing the
+original string-concatenation renderer (kept here as the baseline) with
+html_table.render_html_table. Rows come from an orders/customers join on
+a real database, repeated up to each requested size.
+
+    python -m benchmarks.html_render --rows 100,1000,10000,100000
+"""
+
+import argparse
+import json
+import os
+import sqlite3
+import time
+from itertools import islice, cycle
+
+from tabulate import tabulate
+
+from html_table import render_html_table
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_DB = os.path.join(ROOT, 'data', 'sales.db')
+
+SAMPLE_SQL = ("SELECT o.*, c.name AS customer_name, c.customer_type, p.name AS product_name "
+              "FROM orders o JOIN customers c ON o.customer_id = c.customer_id "
+              "JOIN products p ON o.product_id = p.product_id")
+
+
+def legacy_generate_html_table(data, sql_query=''):
+    """The renderer /api/query used before html_table: one += per fragment,
+    isinstance per cell, no escaping."""
+    if not data:
+        return "<div class='text-gray-500 text-center py-8'>No results found</div>"
+
+    headers = list(data[0].keys()) if isinstance(data[0], dict) else []
+    if not headers:
+        headers = [f"Column_{i+1}" for i in range(len(data[0]))]
+        rows = data
+    else:
+        rows = [[row[col] for col in headers] for row in data]
+
+    html = '<div class="overflow-x-auto">'
+    html += '<table class="min-w-full divide-y divide-gray-200">'
+    html += '<thead class="bg-gray-50">'
+    html += '<tr>'
+    for header in headers:
+        html += f'<th class="px-6 py-3 text-left text-xs font-medium text-gray-500 uppercase tracking-wider">{header}</th>'
+    html += '</tr>'
+    html += '</thead>'
+    html += '<tbody class="bg-white divide-y divide-gray-200">'
+    for row in rows:
+        html += '<tr>'
+        for cell in row:
+            if isinstance(cell, float):
+                if cell > 1000:
+                    formatted_cell = f"${cell:,.2f}"
+                else:
+                    formatted_cell = f"{cell:.2f}"
+            elif isinstance(cell, int) and cell > 1000:
+                formatted_cell = f"{cell:,}"
+            else:
+                formatted_cell = str(cell)
+            html += f'<td class="px-6 py-4 whitespace-nowrap text-sm text-gray-900">{formatted_cell}</td>'
+        html += '</tr>'
+    html += '</tbody>'
+    html += '</table>'
+    html += '</div>'
+    return html
+
+
+RENDERERS = {
+    'before': legacy_generate_html_table,
+    'after': lambda data, sql_query='': render_html_table(data),
+}
+
+
+def sample_rows(db_path: str, count: int) -> list:
+    """count result dicts, as /api/query passes them, cycling the join rows."""
+    with sqlite3.connect(db_path) as conn:
+        cursor = conn.execute(SAMPLE_SQL)
+        headers = [desc[0] for desc in cursor.description]
+        base = cursor.fetchall()
+    return [dict(zip(headers, row)) for row in islice(cycle(base), count)]
+
+
+def best_time(render, data, repeat: int) -> float:
+    """Fastest of ``repeat`` renders, in seconds."""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        render(data, '')
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def run_benchmark(sizes, db_path: str = DEFAULT_DB, repeat: int = 5) -> list:
+    """
+    Time both renderers at each result size.
+
+    Returns:
+        list: one dict per size with seconds and rows/s for each renderer
+    """
+    results = []
+    for size in sizes:
+        data = sample_rows(db_path, size)
+        entry = {'rows': size}
+        for name, render in RENDERERS.items():
+            seconds = best_time(render, data, repeat)
+            entry[name] = {'seconds': round(seconds, 6), 'rows_per_second': round(size / seconds)}
+        entry['speedup'] = round(entry['before']['seconds'] / entry['after']['seconds'], 2)
+        results.append(entry)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="HTML table rendering throughput, before vs after")
+    parser.add_argument('--rows', default='100,1000,10000,100000',
+                        help="comma-separated result sizes (default: 100,1000,10000,100000)")
+    parser.add_argument('--db', default=DEFAULT_DB, help="database to sample rows from")
+    parser.add_argument('--repeat', type=int, default=5, help="renders per size; the fastest is kept")
+    parser.add_argument('--output', '-o', help="also write the results as JSON")
+    args = parser.parse_args()
+
+    sizes = [int(s) for s in args.rows.split(',') if s.strip()]
+    results = run_benchmark(sizes, args.db, args.repeat)
+
+    print("\n📊 HTML table rendering (rows/s, best of {}):".format(args.repeat))
+    print(tabulate([[r['rows'], f"{r['before']['rows_per_second']:,}", f"{r['after']['rows_per_second']:,}",
+                     f"{r['speedup']:.2f}x"] for r in results],
+                   headers=['rows', 'before', 'after', 'speedup'], tablefmt='simple'))
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+        print(f"\n💾 Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,301 @@
+"""
+End-to-End Latency Benchmark
+Times each stage of answering a question the way SalesChatBot.process_query
+and /api/query do: SQL generation, execute_query, dict conversion,
+_generate_response, the HTML table and JSON serialization. Groq is
+replaced by a local mock with configurable latency and canned SQL, and
+the suite runs against generated databases at several scale factors.
+
+Results are written as JSON so a later run can be compared against them:
+
+    python -m benchmarks.latency --scales 0.01,0.1 --llm-latency 300 --output before.json
+    python -m benchmarks.latency --scales 0.01,0.1 --llm-latency 300 --baseline before.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import sqlite3
+import statistics
+import subprocess
+import sys
+import time
+from datetime import date, datetime
+
+from tabulate import tabulate
+
+import chat_bot
+import web_server
+from benchmarks.mock_llm import CANNED_SQL, MockLLMServer
+from data.generate_database import generate_database
+from llm import llm_interface
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+STAGES = ('sql_generation', 'execute_query', 'dict_conversion', 'generate_response',
+          'html_table', 'json_serialization', 'total')
+
+# Benchmark databases are generated once per scale with fixed inputs so
+# every run (and every machine) measures the same data
+BENCH_SEED = 42
+BENCH_AS_OF = date(2025, 6, 30)
+RESULTS_DIR = os.path.join(ROOT, 'benchmarks', 'results')
+
+
+def scale_db_path(scale: float) -> str:
+    return os.path.join(ROOT, 'data', f"sales_sf{scale:g}_seed{BENCH_SEED}_{BENCH_AS_OF}.db")
+
+
+def ensure_scale_db(scale: float) -> str:
+    """Return the benchmark database for a scale factor, generating it if needed."""
+    path = scale_db_path(scale)
+    if not os.path.exists(path):
+        print(f"🔄 Generating scale factor {scale:g} database...")
+        generate_database(path, scale, BENCH_SEED, BENCH_AS_OF)
+    return path
+
+
+def time_stages(bot, question: str) -> tuple:
+    """
+    Answer one question, timing each stage.
+
+    Returns:
+        tuple: (stage -> seconds, row count)
+    """
+    timings = {}
+    start = mark = time.perf_counter()
+
+    def lap(stage):
+        nonlocal mark
+        now = time.perf_counter()
+        timings[stage] = now - mark
+        mark = now
+
+    sql = llm_interface.get_sql_from_query(question)
+    lap('sql_generation')
+
+    headers, results = chat_bot.execute_query(sql, use_cache=False)
+    if isinstance(results, str):
+        raise Exception(results)
+    lap('execute_query')
+
+    result = {
+        'success': True,
+        'sql_query': sql,
+        'columns': headers,
+        'rows': results,
+        'source': 'llm',
+        'cache_hit': False,
+        'execution_time': 0
+    }
+    web_server.result_records(result)
+    lap('dict_conversion')
+
+    result['response'] = bot._generate_response(question, results, headers)
+    lap('generate_response')
+
+    payload, _ = web_server.build_query_payload(result)
+    lap('html_table')
+
+    web_server.encode_json(payload)
+    lap('json_serialization')
+
+    timings['total'] = time.perf_counter() - start
+    return timings, len(results)
+
+
+def summarize(samples: list) -> dict:
+    """Mean, median, p95, min and max of a list of seconds, in milliseconds."""
+    ordered = sorted(samples)
+    ms = lambda seconds: round(seconds * 1000, 3)
+    return {
+        'mean_ms': ms(statistics.fmean(ordered)),
+        'p50_ms': ms(statistics.median(ordered)),
+        'p95_ms': ms(ordered[min(len(ordered) - 1, int(0.95 * len(ordered)))]),
+        'min_ms': ms(ordered[0]),
+        'max_ms': ms(ordered[-1]),
+    }
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True,
+                              text=True, timeout=10).stdout.strip() or None
+    except Exception:
+        return None
+
+
+def run_benchmark(scales=(0.01,), iterations: int = 5, warmup: int = 1, llm_latency_ms: float = 0.0,
+                  llm_jitter_ms: float = 0.0, canned: dict = None, db_paths=()) -> dict:
+    """
+    Run every canned question against every database.
+
+    Args:
+        scales (tuple): Scale factors to generate (or reuse) databases for
+        iterations (int): Timed runs per question
+        warmup (int): Untimed runs per question first
+        llm_latency_ms (float): Mock LLM latency
+        llm_jitter_ms (float): ± uniform jitter on the mock latency
+        canned (dict): question -> SQL (default: CANNED_SQL)
+        db_paths (tuple): Extra existing databases to benchmark
+
+    Returns:
+        dict: 'meta' describing the run and one 'results' entry per
+        database and question with per-stage timings
+    """
+    canned = canned or CANNED_SQL
+    targets = [(scale, ensure_scale_db(scale)) for scale in scales]
+    targets += [(None, path) for path in db_paths]
+
+    os.environ.setdefault('GROQ_API_KEY', 'mock')
+    bot = web_server.SalesChatBot()
+    saved_client, saved_db = llm_interface._default_client, chat_bot.DB_PATH
+    results = []
+
+    with MockLLMServer(canned, llm_latency_ms, llm_jitter_ms) as mock:
+        # get_sql_from_query uses the shared default client, so swapping it
+        # routes every LLM call to the mock
+        llm_interface._default_client = llm_interface.GroqClient(api_key='mock', url=mock.url)
+        try:
+            for scale, path in targets:
+                chat_bot.DB_PATH = web_server.DB_PATH = path
+                with sqlite3.connect(path) as conn:
+                    orders = conn.execute("SELECT COUNT(*) FROM orders").fetchone()[0]
+                label = f"SF {scale:g}" if scale is not None else os.path.basename(path)
+                print(f"⏱️ {label}: {orders:,} orders")
+
+                for question in canned:
+                    for _ in range(warmup):
+                        time_stages(bot, question)
+                    samples = {stage: [] for stage in STAGES}
+                    for _ in range(iterations):
+                        timings, rows = time_stages(bot, question)
+                        for stage in STAGES:
+                            samples[stage].append(timings[stage])
+                    results.append({
+                        'scale': scale,
+                        'db_path': os.path.relpath(path, ROOT),
+                        'orders': orders,
+                        'question': question,
+                        'rows': rows,
+                        'stages': {stage: summarize(values) for stage, values in samples.items()},
+                    })
+        finally:
+            llm_interface._default_client.close()
+            llm_interface._default_client, chat_bot.DB_PATH = saved_client, saved_db
+            web_server.DB_PATH = saved_db
+
+    return {
+        'meta': {
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'git_commit': git_commit(),
+            'python': platform.python_version(),
+            'sqlite': sqlite3.sqlite_version,
+            'platform': platform.platform(),
+            'iterations': iterations,
+            'warmup': warmup,
+            'llm_latency_ms': llm_latency_ms,
+            'llm_jitter_ms': llm_jitter_ms,
+            'seed': BENCH_SEED,
+            'as_of': BENCH_AS_OF.isoformat(),
+        },
+        'results': results,
+    }
+
+
+def result_key(entry: dict) -> tuple:
+    return entry['scale'] if entry['scale'] is not None else entry['db_path'], entry['question']
+
+
+def compare(report: dict, baseline: dict, threshold: float = 0.10) -> list:
+    """
+    Compare median stage timings with a baseline report.
+
+    Returns:
+        list: (scale, question, stage, baseline_ms, current_ms, change)
+        for every stage slower than the baseline by more than ``threshold``
+    """
+    previous = {result_key(entry): entry for entry in baseline['results']}
+    regressions, rows = [], []
+    for entry in report['results']:
+        old = previous.get(result_key(entry))
+        if old is None:
+            continue
+        for stage in STAGES:
+            before = old['stages'][stage]['p50_ms']
+            after = entry['stages'][stage]['p50_ms']
+            change = (after - before) / before if before else 0.0
+            rows.append([result_key(entry)[0], entry['question'][:40], stage,
+                         before, after, f"{change:+.1%}" + (" ⚠️" if change > threshold else "")])
+            if change > threshold:
+                regressions.append((result_key(entry)[0], entry['question'], stage, before, after, change))
+
+    if rows:
+        print("\n📉 Median vs baseline (ms):")
+        print(tabulate(rows, headers=['scale', 'question', 'stage', 'baseline', 'current', 'change'],
+                       tablefmt='simple'))
+    else:
+        print("\n⚠️ No results in common with the baseline")
+    return regressions
+
+
+def print_report(report: dict):
+    """Print median stage timings for every database and question."""
+    rows = [
+        [entry['scale'] if entry['scale'] is not None else entry['db_path'], entry['question'][:40],
+         entry['rows']] + [entry['stages'][stage]['p50_ms'] for stage in STAGES]
+        for entry in report['results']
+    ]
+    print("\n📊 Median stage timings (ms):")
+    print(tabulate(rows, headers=['scale', 'question', 'rows'] + [s.replace('_', ' ') for s in STAGES],
+                   tablefmt='simple'))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline end-to-end latency benchmark")
+    parser.add_argument('--scales', default='0.01',
+                        help="comma-separated scale factors (default: 0.01)")
+    parser.add_argument('--db', action='append', default=[],
+                        help="also benchmark an existing database (repeatable)")
+    parser.add_argument('--iterations', '-n', type=int, default=5, help="timed runs per question")
+    parser.add_argument('--warmup', type=int, default=1, help="untimed runs per question")
+    parser.add_argument('--llm-latency', type=float, default=0.0, help="mock LLM latency in ms")
+    parser.add_argument('--llm-jitter', type=float, default=0.0, help="± mock LLM jitter in ms")
+    parser.add_argument('--canned', help="JSON file mapping questions to SQL (default: CANNED_SQL)")
+    parser.add_argument('--output', '-o', help="results file (default: benchmarks/results/latency-<time>.json)")
+    parser.add_argument('--baseline', help="earlier results file to compare against")
+    parser.add_argument('--threshold', type=float, default=10.0,
+                        help="percent slowdown reported as a regression (default: 10)")
+    parser.add_argument('--fail-on-regression', action='store_true',
+                        help="exit with status 1 if any stage regressed")
+    args = parser.parse_args()
+
+    scales = [float(s) for s in args.scales.split(',') if s.strip()]
+    canned = None
+    if args.canned:
+        with open(args.canned, 'r', encoding='utf-8') as f:
+            canned = json.load(f)
+
+    report = run_benchmark(scales, args.iterations, args.warmup, args.llm_latency,
+                           args.llm_jitter, canned, args.db)
+    print_report(report)
+
+    output = args.output or os.path.join(
+        RESULTS_DIR, f"latency-{datetime.now().strftime('%Y%m%d-%H%M%S')}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    print(f"\n💾 Results written to {output}")
+
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            regressions = compare(report, json.load(f), args.threshold / 100)
+        if regressions:
+            print(f"\n⚠️ {len(regressions)} stage(s) more than {args.threshold:g}% slower than the baseline")
+            if args.fail_on_regression:
+                sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""
+Streamed Completion Benchmark
+Times GroqClient.get_sql against the mock LLM with and without streaming,
+for completions shaped like different models' output: bare SQL, SQL in a
+code fence, and a reasoning model's <think> preamble plus an explanation
+after the SQL. Streaming stops reading at the end of the statement, so
+the saving is whatever the model would have generated after it.
+
+    python -m benchmarks.llm_stream --token-ms 4 --latency 150
+"""
+
+import argparse
+import json
+import statistics
+import time
+
+from tabulate import tabulate
+
+from benchmarks.mock_llm import CANNED_SQL, MockLLMServer
+from llm.llm_interface import GroqClient
+
+# name -> (think words before the SQL, explanation words after it)
+SHAPES = {
+    'bare SQL': (0, 0),
+    'SQL + explanation': (0, 60),
+    'reasoning + explanation': (150, 60),
+}
+
+
+def time_client(client: GroqClient, questions, iterations: int) -> list:
+    """Seconds per get_sql call over every question, ``iterations`` times."""
+    samples = []
+    for _ in range(iterations):
+        for question in questions:
+            start = time.perf_counter()
+            client.get_sql(question, prompt=f"Question: {question}\nSQL:")
+            samples.append(time.perf_counter() - start)
+    return samples
+
+
+def run_benchmark(latency_ms: float, token_ms: float, iterations: int) -> list:
+    results = []
+    questions = list(CANNED_SQL)
+    for shape, (think, explain) in SHAPES.items():
+        with MockLLMServer(CANNED_SQL, latency_ms, token_ms=token_ms,
+                           think_tokens=think, explain_tokens=explain) as mock:
+            row = {'shape': shape}
+            for stream in (False, True):
+                client = GroqClient(api_key='mock', url=mock.url, stream=stream)
+                time_client(client, questions[:1], 1)  # warm the connection
+                samples = time_client(client, questions, iterations)
+                row['stream_ms' if stream else 'full_ms'] = round(statistics.median(samples) * 1000, 1)
+                client.close()
+            results.append(row)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="get_sql latency, streamed vs whole completion")
+    parser.add_argument('--latency', type=float, default=150.0, help="mock time to first token in ms")
+    parser.add_argument('--token-ms', type=float, default=4.0, help="mock ms per generated word")
+    parser.add_argument('--iterations', type=int, default=3)
+    parser.add_argument('--output', '-o', help="also write the results as JSON")
+    args = parser.parse_args()
+
+    results = run_benchmark(args.latency, args.token_ms, args.iterations)
+    print(f"\n⏱️ Median get_sql ms ({args.latency:g}ms to first token, {args.token_ms:g}ms per word):")
+    print(tabulate([[r['shape'], r['full_ms'], r['stream_ms'], f"{r['full_ms'] / r['stream_ms']:.2f}x"]
+                    for r in results],
+                   headers=['completion', 'whole', 'streamed', 'speedup'], tablefmt='simple'))
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+        print(f"\n💾 Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,271 @@
+"""
+Mock LLM Server
+A local stand-in for the Groq chat-completions endpoint. It answers with
+canned SQL after an artificial delay, so benchmarks measure our own code
+without spending quota or picking up network noise.
+
+Requests with ``"stream": true`` get server-sent events, one word per
+event, ``token_ms`` apart. The completion can be padded like a reasoning
+model's: a <think> preamble before the SQL and an explanation after it.
+
+``rate_limit`` enforces a quota of that many requests per ``rate_window``
+seconds (sliding window) with 429 + Retry-After like Groq, and
+``error_rate`` answers that fraction of requests with a 503.
+
+Run ``python -m benchmarks.mock_llm --latency 300`` and point GROQ_API_URL
+at it to drive a real server with the mock.
+"""
+
+import argparse
+import json
+import random
+import re
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+MOCK_PATH = '/openai/v1/chat/completions'
+
+# Returned for questions missing from the canned table
+DEFAULT_SQL = "SELECT COUNT(*) FROM orders"
+
+# Benchmark workload: question -> the SQL a model would return for it.
+# Small aggregates through to result sets that grow with the scale factor.
+CANNED_SQL = {
+    "What is the total revenue from completed orders?":
+        "SELECT SUM(price * quantity) AS total_revenue FROM orders WHERE status = 'completed'",
+    "Which customer type generates the most revenue?":
+        "SELECT c.customer_type, SUM(o.price * o.quantity) AS revenue FROM customers c "
+        "JOIN orders o ON c.customer_id = o.customer_id WHERE o.status = 'completed' "
+        "GROUP BY c.customer_type ORDER BY revenue DESC",
+    "Show me the top 10 products by sales":
+        "SELECT p.name, SUM(o.quantity) AS units, SUM(o.price * o.quantity) AS revenue FROM products p "
+        "JOIN orders o ON p.product_id = o.product_id WHERE o.status = 'completed' "
+        "GROUP BY p.product_id ORDER BY revenue DESC LIMIT 10",
+    "How many orders were placed each month?":
+        "SELECT strftime('%Y-%m', order_date) AS month, COUNT(*) AS orders FROM orders "
+        "GROUP BY month ORDER BY month",
+    "Show the 1000 most recent orders":
+        "SELECT * FROM orders ORDER BY order_date DESC LIMIT 1000",
+    "Show all VIP customers":
+        "SELECT * FROM customers WHERE customer_type = 'vip' ORDER BY customer_id",
+}
+
+_WORDS = re.compile(r'\S+\s*')
+
+_QUESTION = re.compile(r'Question:\s*(.*?)\s*SQL:\s*$', re.S)
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+    # The default backlog of 5 resets connections when many clients connect at once
+    request_queue_size = 128
+
+
+def extract_question(prompt: str) -> str:
+    """Pull the user question out of a build_prompt() prompt."""
+    match = _QUESTION.search(prompt)
+    return match.group(1) if match else prompt
+
+
+class MockLLMServer:
+    """
+    Threaded HTTP server answering chat-completions requests with canned SQL.
+
+    Use as a context manager; ``url`` is the endpoint to give GroqClient.
+    """
+
+    def __init__(self, canned: dict = None, latency_ms: float = 0.0, jitter_ms: float = 0.0,
+                 host: str = '127.0.0.1', port: int = 0, token_ms: float = 0.0,
+                 think_tokens: int = 0, explain_tokens: int = 0,
+                 slow_rate: float = 0.0, slow_ms: float = 0.0,
+                 rate_limit: int = 0, rate_window: float = 60.0, error_rate: float = 0.0):
+        self.canned = canned or {}
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.token_ms = token_ms
+        self.think_tokens = think_tokens
+        self.explain_tokens = explain_tokens
+        self.slow_rate = slow_rate
+        self.slow_ms = slow_ms
+        self.rate_limit = rate_limit
+        self.rate_window = rate_window
+        self.error_rate = error_rate
+        self.requests = 0
+        self.throttled = 0  # answered 429
+        self.failed = 0     # answered 503
+        self._admitted = deque()  # times of requests inside the quota window
+        self._lock = threading.Lock()
+        self._server = _Server((host, port), self._handler())
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}{MOCK_PATH}"
+
+    def answer(self, question: str) -> str:
+        """Canned SQL for a question."""
+        return self.canned.get(question, DEFAULT_SQL)
+
+    def completion(self, question: str) -> str:
+        """The full completion text for a question, padding included."""
+        content = self.answer(question)
+        if self.think_tokens:
+            content = f"<think>\n{' '.join(['considering'] * self.think_tokens)}\n</think>\n```sql\n{content};\n```"
+        if self.explain_tokens:
+            content += '\n\n' + ' '.join(['explaining'] * self.explain_tokens)
+        return content
+
+    def delay(self) -> float:
+        """Seconds to wait before answering."""
+        jitter = random.uniform(-self.jitter_ms, self.jitter_ms) if self.jitter_ms else 0.0
+        if self.slow_rate and random.random() < self.slow_rate:
+            jitter += self.slow_ms  # the occasional straggler behind a bad p99
+        return max(0.0, self.latency_ms + jitter) / 1000
+
+    def reject(self):
+        """(status, Retry-After seconds) to refuse a request with, or None to answer it."""
+        with self._lock:
+            self.requests += 1
+            if self.rate_limit:
+                now = time.monotonic()
+                while self._admitted and self._admitted[0] <= now - self.rate_window:
+                    self._admitted.popleft()
+                if len(self._admitted) >= self.rate_limit:
+                    self.throttled += 1
+                    return 429, self._admitted[0] + self.rate_window - now
+                self._admitted.append(now)
+            if self.error_rate and random.random() < self.error_rate:
+                self.failed += 1
+                return 503, None
+        return None
+
+    def _handler(self):
+        mock = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'  # keep-alive, like the real endpoint
+            # Headers and body go out in separate writes; without this,
+            # Nagle + delayed ACK add ~40ms to every response
+            disable_nagle_algorithm = True
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'{}')
+                prompt = body.get('messages', [{}])[-1].get('content', '')
+                refusal = mock.reject()
+                if refusal is not None:
+                    self.refuse(*refusal)
+                    return
+                time.sleep(mock.delay())
+                content = mock.completion(extract_question(prompt))
+                if body.get('stream'):
+                    self.stream(body.get('model', 'mock'), content)
+                    return
+                time.sleep(len(_WORDS.findall(content)) * mock.token_ms / 1000)
+
+                payload = json.dumps({
+                    'model': body.get('model', 'mock'),
+                    'choices': [{'index': 0, 'finish_reason': 'stop', 'message': {
+                        'role': 'assistant', 'content': content}}],
+                }).encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def stream(self, model: str, content: str):
+                """Send the completion as chunked server-sent events, a word at a time."""
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/event-stream')
+                self.send_header('Transfer-Encoding', 'chunked')
+                self.end_headers()
+                events = [{'model': model, 'choices': [{'index': 0, 'delta': {'content': word},
+                                                        'finish_reason': None}]}
+                          for word in _WORDS.findall(content)]
+                events.append({'model': model, 'choices': [{'index': 0, 'delta': {}, 'finish_reason': 'stop'}]})
+                try:
+                    for i, event in enumerate(events):
+                        if i and mock.token_ms:
+                            time.sleep(mock.token_ms / 1000)
+                        self.send_chunk(f"data: {json.dumps(event)}\n\n")
+                    self.send_chunk("data: [DONE]\n\n")
+                    self.wfile.write(b"0\r\n\r\n")
+                except (BrokenPipeError, ConnectionResetError):
+                    self.close_connection = True  # the client stopped reading early
+
+            def refuse(self, status: int, retry_after: float = None):
+                payload = json.dumps({'error': {'message': 'Rate limit reached' if status == 429
+                                                else 'Service unavailable'}}).encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(payload)))
+                if retry_after is not None:
+                    self.send_header('Retry-After', f"{retry_after:.2f}")
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def send_chunk(self, text: str):
+                data = text.encode('utf-8')
+                self.wfile.write(f"{len(data):x}\r\n".encode('ascii') + data + b"\r\n")
+                self.wfile.flush()
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, name='mock-llm', daemon=True)
+        self._thread.start()
+        return self
+
+    def serve_forever(self):
+        """Serve on the calling thread until interrupted."""
+        self._server.serve_forever()
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve canned SQL on a mock Groq endpoint")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--latency', type=float, default=0.0, help="artificial latency in ms")
+    parser.add_argument('--jitter', type=float, default=0.0, help="± uniform jitter in ms")
+    parser.add_argument('--token-ms', type=float, default=0.0, help="ms between generated words")
+    parser.add_argument('--think-tokens', type=int, default=0, help="words of <think> preamble before the SQL")
+    parser.add_argument('--explain-tokens', type=int, default=0, help="words of explanation after the SQL")
+    parser.add_argument('--slow-rate', type=float, default=0.0, help="fraction of requests that straggle")
+    parser.add_argument('--slow-ms', type=float, default=0.0, help="extra ms for a straggling request")
+    parser.add_argument('--rate-limit', type=int, default=0, help="requests per --rate-window before 429s")
+    parser.add_argument('--rate-window', type=float, default=60.0, help="quota window in seconds")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="fraction of requests answered 503")
+    parser.add_argument('--canned', help="JSON file mapping questions to SQL (default: CANNED_SQL)")
+    args = parser.parse_args()
+
+    canned = CANNED_SQL
+    if args.canned:
+        with open(args.canned, 'r', encoding='utf-8') as f:
+            canned = json.load(f)
+
+    server = MockLLMServer(canned, args.latency, args.jitter, args.host, args.port,
+                           args.token_ms, args.think_tokens, args.explain_tokens,
+                           args.slow_rate, args.slow_ms, args.rate_limit, args.rate_window, args.error_rate)
+    print(f"🧪 Mock LLM listening on {server.url} ({args.latency:g}ms latency)")
+    print(f"   export GROQ_API_URL={server.url}")
+    print("   export GROQ_RPM_LIMIT=0 GROQ_TPM_LIMIT=0  # or the quota to test against")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,118 @@
+"""
+/api/query Payload Benchmark
+Measures response size and build / encode time of each result format on
+a large "Show all orders" answer (100k rows at scale factor 0.1). The
+baseline is the original response: records plus two copies of the HTML
+table, serialized with Flask's json provider.
+
+    python -m benchmarks.payload_formats --scale 0.1
+"""
+
+import argparse
+import gzip
+import json
+import os
+import sqlite3
+import time
+
+from tabulate import tabulate
+
+import web_server
+from benchmarks.latency import ensure_scale_db
+from database.guardrails import run_guarded
+
+QUESTION = "Show all orders"
+SQL = "SELECT * FROM orders ORDER BY order_date DESC"
+
+ENCODERS = {
+    'flask': lambda payload: web_server.app.json.dumps(payload).encode('utf-8'),
+    'json': lambda payload: json.dumps(payload, ensure_ascii=False, separators=(',', ':'),
+                                       default=str).encode('utf-8'),
+}
+if web_server.orjson is not None:
+    ENCODERS['orjson'] = web_server.encode_json
+
+# (format, html) combinations measured with every encoder
+VARIANTS = [(fmt, html) for fmt in web_server.RESULT_FORMATS for html in (True, False)]
+
+
+def load_result(db_path: str) -> dict:
+    """A process_query-style result for every order, without the row cap."""
+    with sqlite3.connect(db_path) as conn:
+        headers, rows, _ = run_guarded(conn, SQL, max_rows=0, timeout=0)
+    return {
+        'success': True,
+        'response': f"Query executed successfully and returned {len(rows)} result(s).",
+        'sql_query': SQL,
+        'columns': headers,
+        'rows': rows,
+        'source': 'rules',
+        'cache_hit': False,
+        'execution_time': 0,
+    }
+
+
+def best_of(func, repeat: int):
+    """(fastest seconds, last return value) over ``repeat`` calls."""
+    best, value = float('inf'), None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        value = func()
+        best = min(best, time.perf_counter() - start)
+    return best, value
+
+
+def measure(result: dict, repeat: int = 3) -> list:
+    """Size and timing for every (format, html, encoder) combination."""
+    rows = []
+    for fmt, html in VARIANTS:
+        # Records are cached on the result once built; drop them so every
+        # variant pays for its own conversion
+        build_seconds, payload = best_of(
+            lambda: web_server.build_query_payload(
+                {k: v for k, v in result.items() if k != 'sql_result'}, fmt, html)[0], repeat)
+        for encoder, encode in ENCODERS.items():
+            encode_seconds, body = best_of(lambda: encode(payload), repeat)
+            rows.append({
+                'format': fmt,
+                'html': html,
+                'encoder': encoder,
+                'bytes': len(body),
+                'gzip_bytes': len(gzip.compress(body, compresslevel=6)),
+                'build_ms': round(build_seconds * 1000, 1),
+                'encode_ms': round(encode_seconds * 1000, 1),
+            })
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="/api/query payload size and encode time by format")
+    parser.add_argument('--scale', type=float, default=0.1,
+                        help="scale factor of the generated database (default: 0.1, 100k orders)")
+    parser.add_argument('--db', help="use an existing database instead")
+    parser.add_argument('--repeat', type=int, default=3, help="runs per measurement; the fastest is kept")
+    parser.add_argument('--output', '-o', help="also write the results as JSON")
+    args = parser.parse_args()
+
+    db_path = args.db or ensure_scale_db(args.scale)
+    result = load_result(db_path)
+    print(f"⏱️ {QUESTION!r}: {len(result['rows']):,} rows from {os.path.basename(db_path)}")
+
+    rows = measure(result, args.repeat)
+    baseline = next(r for r in rows if (r['format'], r['html'], r['encoder']) == ('records', True, 'flask'))
+    table = [[r['format'], 'yes' if r['html'] else 'no', r['encoder'], f"{r['bytes'] / 1e6:.2f}",
+              f"{r['gzip_bytes'] / 1e6:.2f}", r['build_ms'], r['encode_ms'],
+              f"{(baseline['build_ms'] + baseline['encode_ms']) / max(r['build_ms'] + r['encode_ms'], 0.1):.1f}x"]
+             for r in rows]
+    print("\n📦 Payload size (MB) and time (ms); baseline is records + HTML via flask:")
+    print(tabulate(table, headers=['format', 'html', 'encoder', 'MB', 'gzip MB', 'build', 'encode',
+                                   'vs baseline'], tablefmt='simple'))
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({'rows': len(result['rows']), 'results': rows}, f, indent=2)
+        print(f"\n💾 Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
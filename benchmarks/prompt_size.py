@@ -0,0 +1,153 @@
+"""
+Prompt Size Benchmark
+Compares the text-to-SQL prompt built from the introspected schema with
+the original hard-coded prompt (full schema and every example on each
+call) over the benchmark questions. Reports estimated input tokens and
+build time per question; input tokens are what Groq's per-minute token
+limits and time-to-first-token scale with.
+
+--accuracy also asks the configured LLM each question that has reference
+SQL with both prompts, and counts the answers whose results match the
+reference's. Run it before lowering PROMPT_TOKEN_BUDGET: a smaller prompt
+is only a win if the SQL stays right.
+
+    python -m benchmarks.prompt_size --scale 0.1
+    python -m benchmarks.prompt_size --scale 0.1 --budget 200 --accuracy
+"""
+
+import argparse
+import json
+import os
+import sqlite3
+import time
+
+from tabulate import tabulate
+
+from benchmarks.latency import ensure_scale_db
+from benchmarks.mock_llm import CANNED_SQL
+from llm.backends import get_hedged_client
+from llm.prompt_builder import PROMPT_TOKEN_BUDGET, build_prompt, estimate_tokens, get_schema
+
+QUESTIONS = list(CANNED_SQL) + [
+    "How many VIP customers joined this year?",
+    "Which products are low on stock?",
+    "List customers who bought Electronics",
+    "How many orders were refunded last month?",
+]
+
+
+def legacy_build_prompt(user_query: str) -> str:
+    """The original prompt, kept as the benchmark baseline."""
+    return f"""Generate only a SQL query for SQLite. No explanations.
+
+Schema:
+customers: customer_id (PK), name, email, join_date, customer_type ('regular', 'premium', 'vip')
+products: product_id (PK), name, category, base_price, stock_level
+orders: order_id (PK), customer_id (FK), product_id (FK), quantity, price, order_date (YYYY-MM-DD), status ('completed', 'refunded', 'cancelled', 'pending')
+
+Important: When user asks to "show all" or requests complete data, return ALL rows without LIMIT.
+
+Example queries:
+- VIP customers: SELECT COUNT(*) FROM customers WHERE customer_type = 'vip'
+- All customers: SELECT * FROM customers ORDER BY customer_id
+- All products: SELECT * FROM products ORDER BY product_id
+- All orders: SELECT * FROM orders ORDER BY order_date DESC
+- Show customers: SELECT * FROM customers
+- Show products: SELECT * FROM products
+- Show orders: SELECT * FROM orders
+- Completed orders revenue: SELECT SUM(price * quantity) FROM orders WHERE status = 'completed'
+- Customer order info: SELECT c.name, o.* FROM customers c JOIN orders o ON c.customer_id = o.customer_id
+
+Question: {user_query}
+SQL:""".strip()
+
+
+def measure(db_path: str, token_budget: int, repeat: int = 100) -> list:
+    """Estimated tokens and mean build time of both prompts for every question."""
+    results = []
+    for question in QUESTIONS:
+        row = {'question': question}
+        for name, build in (('legacy', legacy_build_prompt),
+                            ('schema', lambda q: build_prompt(q, db_path, token_budget))):
+            start = time.perf_counter()
+            for _ in range(repeat):
+                prompt = build(question)
+            row[f'{name}_tokens'] = estimate_tokens(prompt)
+            row[f'{name}_us'] = round((time.perf_counter() - start) / repeat * 1e6, 1)
+        results.append(row)
+    return results
+
+
+def query_result(db_path: str, sql: str):
+    """Rows of sql in a comparable form (order-insensitive), or None if it fails."""
+    conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+    try:
+        return sorted(map(repr, conn.execute(sql).fetchall()))
+    except sqlite3.Error:
+        return None
+    finally:
+        conn.close()
+
+
+def measure_accuracy(db_path: str, token_budget: int) -> list:
+    """Whether each prompt's generated SQL returns the reference SQL's rows."""
+    client = get_hedged_client()
+    results = []
+    for question, reference in CANNED_SQL.items():
+        expected = query_result(db_path, reference)
+        row = {'question': question}
+        for name, build in (('legacy', legacy_build_prompt),
+                            ('schema', lambda q: build_prompt(q, db_path, token_budget))):
+            try:
+                sql = client.get_sql(question, db_path, prompt=build(question))
+            except Exception as e:
+                print(f"⚠️ {name} prompt failed for {question!r}: {e}")
+                sql = None
+            row[f'{name}_sql'] = sql
+            row[f'{name}_ok'] = bool(sql) and query_result(db_path, sql) == expected
+        results.append(row)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Text-to-SQL prompt size, schema-built vs hard-coded")
+    parser.add_argument('--scale', type=float, default=0.1,
+                        help="scale factor of the generated database (default: 0.1)")
+    parser.add_argument('--db', help="use an existing database instead")
+    parser.add_argument('--budget', type=int, default=PROMPT_TOKEN_BUDGET, help="prompt token budget")
+    parser.add_argument('--accuracy', action='store_true',
+                        help="also compare the LLM's SQL from both prompts with the reference SQL "
+                             "(calls the configured LLM backends)")
+    parser.add_argument('--output', '-o', help="also write the results as JSON")
+    args = parser.parse_args()
+
+    db_path = args.db or ensure_scale_db(args.scale)
+    start = time.perf_counter()
+    get_schema(db_path)
+    print(f"🔍 Introspected {os.path.basename(db_path)} in {(time.perf_counter() - start) * 1000:.1f}ms")
+
+    results = measure(db_path, args.budget)
+    print(tabulate([[r['question'], r['legacy_tokens'], r['schema_tokens'], r['schema_us']] for r in results],
+                   headers=['question', 'legacy tokens', 'schema tokens', 'build µs'], tablefmt='simple'))
+    legacy = sum(r['legacy_tokens'] for r in results)
+    schema = sum(r['schema_tokens'] for r in results)
+    print(f"\n📉 {schema:,} vs {legacy:,} estimated input tokens ({1 - schema / legacy:.0%} fewer, "
+          f"budget {args.budget})")
+
+    if args.accuracy:
+        accuracy = measure_accuracy(db_path, args.budget)
+        print()
+        print(tabulate([[r['question'], '✅' if r['legacy_ok'] else '❌', '✅' if r['schema_ok'] else '❌']
+                        for r in accuracy], headers=['question', 'legacy', 'schema'], tablefmt='simple'))
+        print(f"\n🎯 {sum(r['schema_ok'] for r in accuracy)}/{len(accuracy)} correct with the schema prompt, "
+              f"{sum(r['legacy_ok'] for r in accuracy)}/{len(accuracy)} with the legacy prompt")
+        results = {'size': results, 'accuracy': accuracy}
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+        print(f"\n💾 Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""
+Rate Limit Benchmark
+Drives a mock LLM that enforces a requests-per-minute quota (429 with
+Retry-After beyond it) and fails a fraction of requests with 503, from
+many threads at once. Compares a bare GroqClient, one that only retries
+(backoff and Retry-After), and one that also paces itself to the quota
+with the token-bucket limiter. Reports answered questions, throughput
+and how many requests the provider saw.
+
+The mock's quota window is shortened (``--window``) so a run takes
+seconds. The client is given the same rate per minute and a burst scaled
+down by the same factor.
+
+    python -m benchmarks.rate_limits --rpm 1200 --questions 150
+"""
+
+import argparse
+import json
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from tabulate import tabulate
+
+from benchmarks.mock_llm import CANNED_SQL, MockLLMServer
+from llm.llm_interface import GroqClient
+from llm.resilience import BURST_SECONDS, BackendGuard
+
+
+def run(client: GroqClient, questions: int, concurrency: int) -> tuple:
+    """(latencies of answered questions, failures, wall seconds)"""
+    canned = list(CANNED_SQL)
+
+    def ask(i):
+        question = canned[i % len(canned)]
+        start = time.perf_counter()
+        try:
+            client.get_sql(question, prompt=f"Question: {question}\nSQL:")
+        except Exception:
+            return None
+        return time.perf_counter() - start
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        samples = list(pool.map(ask, range(questions)))
+    wall = time.perf_counter() - start
+    answered = [s for s in samples if s is not None]
+    return answered, questions - len(answered), wall
+
+
+def run_benchmark(questions: int, concurrency: int, rpm: int, window: float,
+                  error_rate: float, latency_ms: float) -> list:
+    clients = {
+        'no retries': lambda: None,
+        'retry + backoff': lambda: BackendGuard('retry'),
+        'limiter + retry': lambda: BackendGuard('limiter', rpm=rpm, burst_seconds=BURST_SECONDS * window / 60),
+    }
+    results = []
+    for name, guard in clients.items():
+        with MockLLMServer(CANNED_SQL, latency_ms, latency_ms * 0.2, rate_limit=round(rpm * window / 60),
+                           rate_window=window, error_rate=error_rate) as mock:
+            client = GroqClient(api_key='mock', url=mock.url, pool_size=concurrency, guard=guard())
+            answered, failed, wall = run(client, questions, concurrency)
+            client.close()
+            answered.sort()
+            results.append({
+                'client': name,
+                'answered': f"{len(answered) / questions:.0%}",
+                'answered_per_s': round(len(answered) / wall, 1),
+                'requests': mock.requests,
+                'http_429': mock.throttled,
+                'http_503': mock.failed,
+                'p50_ms': round(statistics.median(answered) * 1000, 1) if answered else None,
+                'p95_ms': round(answered[int(len(answered) * 0.95)] * 1000, 1) if answered else None,
+            })
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="LLM throughput against a quota, with and without the limiter")
+    parser.add_argument('--questions', type=int, default=150)
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--rpm', type=int, default=1200, help="provider quota in requests per minute")
+    parser.add_argument('--window', type=float, default=5.0, help="mock quota window in seconds")
+    parser.add_argument('--error-rate', type=float, default=0.05, help="fraction of requests answered 503")
+    parser.add_argument('--latency', type=float, default=50.0, help="mock latency in ms")
+    parser.add_argument('--output', '-o', help="also write the results as JSON")
+    args = parser.parse_args()
+
+    results = run_benchmark(args.questions, args.concurrency, args.rpm, args.window,
+                            args.error_rate, args.latency)
+    print(f"\n🚦 {args.questions} questions, {args.concurrency} threads, quota {args.rpm} RPM, "
+          f"{args.error_rate:.0%} 503s:")
+    print(tabulate([list(r.values()) for r in results], headers=list(results[0]), tablefmt='simple'))
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+        print(f"\n💾 Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
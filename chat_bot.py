@@ -1,25 +1,181 @@
 # Sales Chatbot - Phase 3: Complete Interactive Chatbot
 # Integrates database + LLM for natural language sales queries
 
-import sqlite3
 import os
+import sys
+import json
+import time
+import argparse
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from tabulate import tabulate
-from llm.llm_interface import get_sql_from_query
+from llm.sql_router import generate_sql
+from database.connection_pool import DB_PATH, get_pool
+from database.result_cache import RESULT_CACHE_ENABLED, get_result_cache, is_cacheable
+from database.guardrails import QUERY_MAX_ROWS, QueryRejected, check_plan, run_guarded
+from database.export import declared_types
 
-DB_PATH = "data/sales.db"
+STREAM_CHUNK_SIZE = int(os.getenv('STREAM_CHUNK_SIZE', '500'))
+# Questions answered at once by a batch. Each worker makes at most one LLM
+# call at a time; SQLite work is further capped by the connection pool.
+BATCH_CONCURRENCY = int(os.getenv('BATCH_CONCURRENCY', '8'))
 
-def execute_query(sql: str):
-    """Execute SQL query on the sales database and return formatted results."""
+def run_query(sql: str, use_cache: bool = True):
+    """Execute SQL query on the sales database under the query guardrails.
+
+    The statement's plan is checked for runaway joins, execution is cut
+    off at the time / VM-step budget, and at most QUERY_MAX_ROWS rows are
+    returned. Read-only results are served from the result cache while
+    the database data_version is unchanged; pass use_cache=False to
+    always hit SQLite. Truncated results are not cached.
+
+    Returns:
+        tuple: (headers, rows, truncated), or ([], error message, False)
+    """
     try:
-        conn = sqlite3.connect(DB_PATH)
+        cache = None
+        if use_cache and RESULT_CACHE_ENABLED and is_cacheable(sql):
+            cache = get_result_cache(DB_PATH)
+            version = cache.data_version()
+            cached = cache.get(sql, version)
+            if cached is not None:
+                return cached + (False,)
+
+        with get_pool(DB_PATH).connection() as conn:
+            headers, rows, truncated = run_guarded(conn, sql)
+
+        if cache is not None and not truncated:
+            cache.put(sql, version, headers, rows)
+        return headers, rows, truncated
+    except QueryRejected as e:
+        return [], f"❌ {e}", False
+    except Exception as e:
+        return [], f"❌ SQL Error: {e}", False
+
+def execute_query(sql: str, use_cache: bool = True):
+    """Execute SQL query on the sales database and return formatted results.
+
+    Same as run_query without the truncation flag.
+    """
+    headers, rows, _ = run_query(sql, use_cache)
+    return headers, rows
+
+def iter_query(sql: str, chunk_size: int = STREAM_CHUNK_SIZE):
+    """Execute SQL and yield the column headers, then lists of rows.
+
+    Rows are read with fetchmany so only one chunk is held in memory at a
+    time. The stream reads at the client's pace, so it uses its own
+    connection instead of a pooled one. Slow downloads then can't starve
+    /api/query. The connection is closed when the generator finishes or
+    is closed early, on whichever thread that happens. Runaway joins are
+    rejected up front. The row cap and time budget do not apply.
+    """
+    with get_pool(DB_PATH).dedicated() as conn:
+        check_plan(conn, sql)
         cursor = conn.cursor()
         cursor.execute(sql)
-        rows = cursor.fetchall()
-        headers = [desc[0] for desc in cursor.description] if cursor.description else []
-        conn.close()
-        return headers, rows
+        yield [desc[0] for desc in cursor.description] if cursor.description else []
+        while True:
+            rows = cursor.fetchmany(chunk_size)
+            if not rows:
+                break
+            yield rows
+
+def column_types(sql: str) -> list:
+    """Declared type of each column of sql's result ('' for expressions), for typed exports."""
+    with get_pool(DB_PATH).dedicated() as conn:
+        return declared_types(conn, sql)
+
+def answer_question(question: str, use_cache: bool = True) -> dict:
+    """Answer one question without printing, for batch runs.
+
+    Returns a JSON-serializable dict with the SQL, its source, the columns
+    and rows, or the error, plus the time taken.
+    """
+    start_time = time.time()
+    result = {'question': question, 'success': False}
+    try:
+        sql, source = generate_sql(question, DB_PATH)
+        result.update(sql_query=sql, source=source)
+
+        headers, rows, truncated = run_query(sql, use_cache=use_cache)
+        if isinstance(rows, str):  # It's an error message
+            result['error'] = rows
+        else:
+            result.update(success=True, columns=headers, rows=[list(row) for row in rows],
+                          row_count=len(rows), truncated=truncated)
     except Exception as e:
-        return [], f"❌ SQL Error: {e}"
+        result['error'] = f"❌ Error: {e}"
+    result['execution_time'] = round(time.time() - start_time, 4)
+    return result
+
+def run_batch(questions, handler=answer_question, workers: int = BATCH_CONCURRENCY):
+    """Answer questions concurrently, yielding (index, result) as each finishes.
+
+    Args:
+        questions (list): Questions to answer
+        handler (callable): Turns one question into a result dict
+        workers (int): Maximum questions in flight at once
+
+    Yields:
+        tuple: (index into questions, handler result)
+    """
+    workers = max(1, min(workers, len(questions) or 1))
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='batch') as executor:
+        futures = {executor.submit(handler, question): index
+                   for index, question in enumerate(questions)}
+        for future in as_completed(futures):
+            yield futures[future], future.result()
+
+def iter_in_order(completed):
+    """Re-order (index, result) pairs from run_batch, yielding each as soon as
+    every earlier index has been yielded."""
+    pending, next_index = {}, 0
+    for index, result in completed:
+        pending[index] = result
+        while next_index in pending:
+            yield next_index, pending.pop(next_index)
+            next_index += 1
+
+def read_questions(source):
+    """Read one question per line, skipping blank lines and # comments."""
+    return [line.strip() for line in source
+            if line.strip() and not line.lstrip().startswith('#')]
+
+def run_batch_file(path: str, output: str = '-', workers: int = BATCH_CONCURRENCY,
+                   ordered: bool = True):
+    """Answer every question in a file ('-' for stdin) and write JSONL.
+
+    Each output line is an answer_question result with its input index.
+    Lines are written in input order unless ordered=False, in which case
+    they are written as questions finish.
+    """
+    from dotenv import load_dotenv
+    load_dotenv()
+
+    if path == '-':
+        questions = read_questions(sys.stdin)
+    else:
+        with open(path, 'r', encoding='utf-8') as f:
+            questions = read_questions(f)
+
+    out = sys.stdout if output == '-' else open(output, 'w', encoding='utf-8')
+    print(f"📦 Answering {len(questions)} question(s) with {workers} worker(s)...", file=sys.stderr)
+    start_time = time.time()
+    failures = 0
+    try:
+        results = run_batch(questions, workers=workers)
+        if ordered:
+            results = iter_in_order(results)
+        for index, result in results:
+            failures += not result['success']
+            out.write(json.dumps({'index': index, **result}, default=str) + '\n')
+            out.flush()
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    print(f"✅ {len(questions) - failures} succeeded, {failures} failed "
+          f"in {time.time() - start_time:.2f}s", file=sys.stderr)
+    return failures
 
 def display_welcome():
     """Display welcome message and available sample questions."""
@@ -48,15 +204,15 @@ def process_query(user_input: str):
         
         try:
             print("💡 Generating SQL query...")
-            sql = get_sql_from_query(user_input)
-            print(f"📄 Generated SQL: {sql}")
+            sql, source = generate_sql(user_input, DB_PATH)
+            print(f"📄 Generated SQL ({source}): {sql}")
         except Exception as e:
             error_msg = f"❌ LLM Error: {str(e)}"
             print(error_msg)
             return False, error_msg
 
         print("📊 Executing query...")
-        headers, results = execute_query(sql)
+        headers, results, truncated = run_query(sql)
 
         if isinstance(results, str):  # It's an error message
             print(f"❌ Error: {results}")
@@ -64,6 +220,8 @@ def process_query(user_input: str):
         elif results:
             print(f"\n✅ Found {len(results)} result(s):")
             print(tabulate(results, headers=headers, tablefmt="grid"))
+            if truncated:
+                print(f"✂️ Showing the first {QUERY_MAX_ROWS:,} rows; the full result is larger.")
             return True, {"headers": headers, "results": results}
         else:
             print("✅ Query executed successfully, but returned no results.")
@@ -100,11 +258,11 @@ def run_chatbot():
                 continue
 
             print("💡 Generating SQL query...")
-            sql = get_sql_from_query(user_input)
-            print(f"📄 Generated SQL: {sql}")
+            sql, source = generate_sql(user_input, DB_PATH)
+            print(f"📄 Generated SQL ({source}): {sql}")
 
             print("📊 Executing query...")
-            headers, results = execute_query(sql)
+            headers, results, truncated = run_query(sql)
 
             if isinstance(results, str):  # It's an error message
                 print(results)
@@ -112,6 +270,8 @@ def run_chatbot():
             elif results:
                 print(f"\n✅ Found {len(results)} result(s):")
                 print(tabulate(results, headers=headers, tablefmt="grid"))
+                if truncated:
+                    print(f"✂️ Showing the first {QUERY_MAX_ROWS:,} rows; the full result is larger.")
             else:
                 print("✅ Query executed successfully, but returned no results.")
                 print("💡 This might mean the data doesn't exist or the query needs adjustment.")
@@ -124,4 +284,17 @@ def run_chatbot():
             print("💡 Try asking a different question or check your internet connection.")
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Sales Analysis Assistant")
+    parser.add_argument('--batch', metavar='FILE',
+                        help="answer the questions in FILE (one per line, '-' for stdin) and write JSONL")
+    parser.add_argument('--output', '-o', default='-', help="JSONL output file (default: stdout)")
+    parser.add_argument('--workers', type=int, default=BATCH_CONCURRENCY,
+                        help="questions answered concurrently")
+    parser.add_argument('--unordered', action='store_true',
+                        help="write results as they finish instead of in input order")
+    args = parser.parse_args()
+
+    if args.batch:
+        sys.exit(1 if run_batch_file(args.batch, args.output, args.workers,
+                                     ordered=not args.unordered) else 0)
     run_chatbot()
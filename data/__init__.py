@@ -0,0 +1,2 @@
+# Data Package
+# This package contains the scripts that build, grow and load-test the SQLite sales database
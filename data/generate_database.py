@@ -0,0 +1,335 @@
+#!/usr/bin/env python3
+"""
+Scale-Factor Data Generator
+Builds a sales database of any size with the schema and catalog of
+setup_database.py. Scale factor 1 is 100,000 customers, 1,000 products
+and 1,000,000 orders; the same --scale, --seed and --as-of always produce
+the same data.
+
+Names and emails come from pools drawn once from Faker, every order
+column is sampled a batch at a time, and rows are loaded with
+executemany in large transactions with journaling off. Indexes, ANALYZE
+and the summary tables are built after the load.
+
+Usage:
+    python -m data.generate_database --scale 10 --output data/sales_sf10.db
+"""
+
+import argparse
+import os
+import random
+import sqlite3
+import sys
+import time
+from datetime import date, timedelta
+from itertools import accumulate
+
+from faker import Faker
+
+from data.setup_database import (
+    CUSTOMER_TYPES,
+    CUSTOMER_TYPE_WEIGHTS,
+    INDEXES,
+    SCHEMA,
+    edge_case_orders,
+    install_summary_tables,
+    set_journal_mode,
+    order_statuses,
+    product_data,
+    status_weights,
+)
+
+# Rows per unit of scale factor
+CUSTOMERS_PER_SF = 100_000
+PRODUCTS_PER_SF = 1_000
+ORDERS_PER_SF = 1_000_000
+
+DEFAULT_SEED = 42
+DEFAULT_BATCH_SIZE = 100_000
+NAME_POOL_SIZE = 1_000
+ORDER_HISTORY_DAYS = 180
+
+# Variants appended to catalog names to grow the product table
+PRODUCT_VARIANTS = ["Pro", "Lite", "Max", "Mini", "Plus", "Classic", "Deluxe", "Eco", "Sport", "Travel"]
+
+# Bulk-load settings: the output is a scratch file until it is renamed into
+# place, so durability is traded for speed
+BULK_LOAD_PRAGMAS = [
+    "PRAGMA journal_mode = OFF",
+    "PRAGMA synchronous = OFF",
+    "PRAGMA locking_mode = EXCLUSIVE",
+    "PRAGMA temp_store = MEMORY",
+    "PRAGMA cache_size = -262144",
+]
+
+
+def scaled_counts(scale: float) -> dict:
+    """Row counts for a scale factor (at least one customer, the full catalog)."""
+    return {
+        'customers': max(3, round(CUSTOMERS_PER_SF * scale)),
+        'products': max(len(product_data), round(PRODUCTS_PER_SF * scale)),
+        'orders': max(1, round(ORDERS_PER_SF * scale)),
+    }
+
+
+def date_pool(start: date, end: date):
+    """Every date from start to end inclusive as 'YYYY-MM-DD' strings."""
+    return [(start + timedelta(days=i)).isoformat() for i in range((end - start).days + 1)]
+
+
+def build_name_pools(fake: Faker):
+    """Draw the first names, last names and email domains customers are built from."""
+    first = [fake.unique.first_name() for _ in range(NAME_POOL_SIZE // 2)]
+    fake.unique.clear()
+    last = [fake.unique.last_name() for _ in range(NAME_POOL_SIZE // 2)]
+    fake.unique.clear()
+    domains = list({fake.free_email_domain() for _ in range(50)})
+    return first, last, sorted(domains)
+
+
+def generate_customers(count: int, rng: random.Random, fake: Faker, as_of: date):
+    """
+    Build customer rows.
+
+    Returns:
+        tuple: (rows, customer_types) where customer_types[i] is the type of
+        customer i + 1
+    """
+    first, last, domains = build_name_pools(fake)
+    firsts = rng.choices(first, k=count)
+    lasts = rng.choices(last, k=count)
+    domain_picks = rng.choices(domains, k=count)
+    join_dates = rng.choices(date_pool(as_of - timedelta(days=730), as_of - timedelta(days=30)), k=count)
+    types = rng.choices(CUSTOMER_TYPES, weights=CUSTOMER_TYPE_WEIGHTS, k=count)
+
+    rows = [
+        (i, f"{fn} {ln}", f"{fn}.{ln}{i}@{domain}".lower(), joined, ctype)
+        for i, (fn, ln, domain, joined, ctype)
+        in enumerate(zip(firsts, lasts, domain_picks, join_dates, types), 1)
+    ]
+    return rows, types
+
+
+def generate_products(count: int, rng: random.Random):
+    """The setup_database catalog followed by priced variants of it."""
+    rows = []
+    for i, (name, category, base_price) in enumerate(product_data, 1):
+        stock = rng.randint(10, 200) if base_price > 0 else 5  # Limited stock for free items
+        rows.append((i, name, category, base_price, stock))
+
+    for i in range(len(product_data) + 1, count + 1):
+        name, category, base_price = product_data[(i - 1) % len(product_data)]
+        variant = PRODUCT_VARIANTS[(i - 1) // len(product_data) % len(PRODUCT_VARIANTS)]
+        price = round(base_price * rng.uniform(0.5, 1.5), 2)
+        stock = rng.randint(10, 200) if price > 0 else 5
+        rows.append((i, f"{name} {variant} {i}", category, price, stock))
+    return rows
+
+
+def generate_orders(count: int, rng: random.Random, customer_types, products, as_of: date,
+                    batch_size: int = DEFAULT_BATCH_SIZE, first_order_id: int = 1,
+                    history_days: int = ORDER_HISTORY_DAYS, status_mix: dict = None):
+    """
+    Yield batches of order rows.
+
+    Keeps the behaviour of setup_database.py: more orders in recent months,
+    VIP customers favour expensive products and get a 10% discount,
+    quantities depend on price, and 30% of refunds are recorded at zero.
+    Each column is sampled for a whole batch with one choices() call.
+
+    Args:
+        first_order_id (int): order_id of the first generated order
+        history_days (int): Orders are dated within this many days up to as_of
+        status_mix (dict): status -> weight (default: setup_database's weights)
+    """
+    customer_ids = range(1, len(customer_types) + 1)
+    is_vip = [ctype == 'vip' for ctype in customer_types]
+    product_ids = range(1, len(products) + 1)
+    prices = [p[3] for p in products]
+    by_price = list(accumulate(prices))  # VIP customers weight products by price
+    status_mix = status_mix or dict(zip(order_statuses, status_weights))
+    status_names = list(status_mix)
+    status_cum = list(accumulate(status_mix.values()))
+
+    # Month m back gets weight 175 - 25m, the midpoint of setup_database's ranges.
+    # That reaches zero at month 7, so older months keep the floor weight of 1:
+    # the cumulative weights must keep increasing for bisect-based sampling.
+    if history_days < 1:
+        raise ValueError(f"history_days must be at least 1, got {history_days}")
+    dates = date_pool(as_of - timedelta(days=history_days - 1), as_of)
+    date_cum = list(accumulate(max(1, 175 - 25 * ((len(dates) - 1 - d) // 30)) for d in range(len(dates))))
+
+    last_id = first_order_id + count - 1
+    for first_id in range(first_order_id, last_id + 1, batch_size):
+        k = min(batch_size, last_id - first_id + 1)
+        customers = rng.choices(customer_ids, k=k)
+        any_products = rng.choices(product_ids, k=k)
+        vip_products = rng.choices(product_ids, cum_weights=by_price, k=k)
+        expensive_qty = rng.choices((1, 2), weights=(80, 20), k=k)
+        free_qty = rng.choices((1, 2, 3), k=k)
+        regular_qty = rng.choices((1, 2, 3, 4, 5), k=k)
+        statuses = rng.choices(status_names, cum_weights=status_cum, k=k)
+        order_dates = rng.choices(dates, cum_weights=date_cum, k=k)
+        zero_refunds = rng.choices((True, False), weights=(30, 70), k=k)
+        noise = [rng.random() for _ in range(k)]
+
+        batch = []
+        for order_id, customer_id, any_product, vip_product, expensive, free, regular, \
+                status, order_date, zero_refund, r in zip(
+                    range(first_id, first_id + k), customers, any_products, vip_products,
+                    expensive_qty, free_qty, regular_qty, statuses, order_dates, zero_refunds, noise):
+            vip = is_vip[customer_id - 1]
+            product_id = vip_product if vip else any_product
+            base_price = prices[product_id - 1]
+
+            if base_price > 500:  # Expensive items
+                quantity = expensive
+            elif base_price == 0:  # Free items
+                quantity = free
+            else:
+                quantity = regular
+
+            variation = 0.8 + 0.4 * r  # ±20% variation
+            if vip:
+                variation *= 0.9  # VIP discount
+            price = round(base_price * variation, 2)
+
+            # Edge case: refunded orders have 0 effective price in some systems
+            if zero_refund and status == 'refunded':
+                price = 0.00
+
+            batch.append((order_id, customer_id, product_id, quantity, price, order_date, status))
+        yield batch
+
+
+def load(conn, table: str, rows) -> int:
+    """Insert rows with one executemany in a single transaction."""
+    placeholders = ', '.join('?' * len(rows[0]))
+    with conn:
+        conn.executemany(f"INSERT INTO {table} VALUES ({placeholders})", rows)
+    return len(rows)
+
+
+def generate_database(output: str, scale: float = 1.0, seed: int = DEFAULT_SEED,
+                      as_of: date = None, batch_size: int = DEFAULT_BATCH_SIZE,
+                      force: bool = False) -> dict:
+    """
+    Generate a database at ``output`` for a scale factor.
+
+    The data is written to ``output + '.tmp'`` and renamed into place when
+    complete, so a half-built file never appears at ``output``.
+
+    Args:
+        output (str): Database file to create
+        scale (float): Scale factor (1 = 1,000,000 orders)
+        seed (int): Random seed; the same seed, scale and as_of give the same data
+        as_of (date): Date the order history ends on (default: today)
+        batch_size (int): Rows per executemany transaction
+        force (bool): Replace an existing output file
+
+    Returns:
+        dict: Row counts and timings
+    """
+    if os.path.exists(output) and not force:
+        raise Exception(f"{output} already exists (use --force to replace it)")
+
+    as_of = as_of or date.today()
+    counts = scaled_counts(scale)
+    rng = random.Random(seed)
+    fake = Faker()
+    fake.seed_instance(seed)
+
+    tmp_path = output + '.tmp'
+    for suffix in ('', '-journal', '-wal', '-shm'):
+        if os.path.exists(tmp_path + suffix):
+            os.remove(tmp_path + suffix)
+
+    timings = {}
+    start = time.time()
+    conn = sqlite3.connect(tmp_path)
+    try:
+        for pragma in BULK_LOAD_PRAGMAS:
+            conn.execute(pragma)
+        for statement in SCHEMA:
+            conn.execute(statement)
+
+        print(f"📊 Generating {counts['customers']:,} customers...")
+        customers, customer_types = generate_customers(counts['customers'], rng, fake, as_of)
+        load(conn, 'customers', customers)
+        del customers
+
+        print(f"🛍️ Generating {counts['products']:,} products...")
+        products = generate_products(counts['products'], rng)
+        load(conn, 'products', products)
+
+        print(f"🛒 Generating {counts['orders']:,} orders...")
+        loaded = 0
+        for batch in generate_orders(counts['orders'], rng, customer_types, products, as_of, batch_size):
+            loaded += load(conn, 'orders', batch)
+            elapsed = time.time() - start
+            print(f"   {loaded:,} / {counts['orders']:,} orders ({loaded / elapsed:,.0f} rows/s)", end='\r')
+        print()
+        load(conn, 'orders', edge_case_orders(counts['orders'] + 1, len(products)))
+        timings['load'] = round(time.time() - start, 2)
+
+        print("🗂️ Building indexes...")
+        index_start = time.time()
+        for statement in INDEXES:
+            conn.execute(statement)
+        conn.execute("ANALYZE")
+        timings['indexes'] = round(time.time() - index_start, 2)
+    finally:
+        conn.close()
+
+    print("🧮 Installing summary tables for /api/stats...")
+    summary_start = time.time()
+    install_summary_tables(tmp_path)
+    timings['summary_tables'] = round(time.time() - summary_start, 2)
+    set_journal_mode(tmp_path)
+
+    os.replace(tmp_path, output)
+    for suffix in ('-wal', '-shm'):
+        if os.path.exists(output + suffix):
+            os.remove(output + suffix)
+    timings['total'] = round(time.time() - start, 2)
+
+    counts['orders'] += 3  # edge cases
+    return {'path': output, 'scale': scale, 'seed': seed, 'as_of': as_of.isoformat(),
+            **counts, 'timings': timings}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a sales database for a scale factor")
+    parser.add_argument('--scale', '-s', type=float, default=1.0,
+                        help="scale factor (1 = 100k customers, 1M orders; default: 1)")
+    parser.add_argument('--seed', type=int, default=DEFAULT_SEED, help="random seed")
+    parser.add_argument('--as-of', type=date.fromisoformat, default=None,
+                        help="last order date, YYYY-MM-DD (default: today)")
+    parser.add_argument('--output', '-o', default=None,
+                        help="database file (default: data/sales_sf<scale>.db)")
+    parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE,
+                        help="rows per insert transaction")
+    parser.add_argument('--force', action='store_true', help="replace an existing output file")
+    args = parser.parse_args()
+
+    output = args.output or os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                         f"sales_sf{args.scale:g}.db")
+    print(f"🔄 Generating scale factor {args.scale:g} database at {output} (seed {args.seed})...")
+    try:
+        summary = generate_database(output, args.scale, args.seed, args.as_of,
+                                    args.batch_size, args.force)
+    except Exception as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+
+    timings = summary['timings']
+    print("\n✅ Database generated successfully!")
+    print(f"   • {summary['customers']:,} customers")
+    print(f"   • {summary['products']:,} products")
+    print(f"   • {summary['orders']:,} orders")
+    print(f"   ⏱️ load {timings['load']}s, indexes {timings['indexes']}s, "
+          f"summary tables {timings['summary_tables']}s, total {timings['total']}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,335 @@
+#!/usr/bin/env python3
+"""
+Live Order-Stream Simulator
+Appends orders to a sales database at a steady or bursty rate while
+reader threads run the queries the web server serves, so write latency
+and "database is locked" contention can be measured under concurrent
+reads and writes.
+
+Orders are drawn with the same rules as generate_database.py (and so
+setup_database.py), dated today, and written in small BEGIN IMMEDIATE
+transactions. The summary-table triggers fire on every insert, as they
+would in production.
+
+Usage:
+    python -m data.simulate_orders --rate 200 --burst 5 --duration 60 --readers 4
+    python -m data.simulate_orders --url http://localhost:5000 --readers 8
+"""
+
+import argparse
+import json
+import os
+import random
+import sqlite3
+import sys
+import threading
+import time
+from datetime import date
+
+from data.generate_database import generate_orders
+from data.setup_database import DEFAULT_DB_PATH, order_statuses, status_weights
+from database.connection_pool import ConnectionPool
+from database.summary_tables import read_stats
+from llm.intent_matcher import INTENTS
+
+INSERT_ORDER_SQL = ("INSERT INTO orders (customer_id, product_id, quantity, price, order_date, status) "
+                    "VALUES (?, ?, ?, ?, ?, ?)")
+
+# Reader workload: the /api/stats lookup plus the SQL behind the rule-based
+# questions (full-table dumps excluded)
+READ_QUERIES = [('stats', None)] + [
+    (intent.name, intent.sql.replace('{n}', '5'))
+    for intent in INTENTS if not intent.name.startswith('all_')
+]
+
+# Questions sent to /api/query in --url mode; they resolve on the rules path
+# so the measurement is SQLite, not the LLM
+HTTP_QUESTIONS = [
+    "How many customers do we have?",
+    "What is the total revenue from completed orders?",
+    "Show me the top 5 products by sales",
+    "How many orders are there?",
+]
+
+
+def is_lock_error(error) -> bool:
+    """True for SQLite's 'database is locked' / 'database table is locked' / busy errors."""
+    message = str(error).lower()
+    return 'locked' in message or 'busy' in message
+
+
+def parse_status_mix(text: str) -> dict:
+    """Parse 'completed=85,refunded=8' into a status -> weight dict."""
+    mix = {}
+    for part in text.split(','):
+        status, _, weight = part.partition('=')
+        status = status.strip()
+        if status not in order_statuses:
+            raise argparse.ArgumentTypeError(
+                f"Unknown status '{status}'. Choose from: {', '.join(order_statuses)}")
+        try:
+            mix[status] = float(weight)
+        except ValueError:
+            raise argparse.ArgumentTypeError(f"Invalid weight for '{status}': {weight!r}")
+    if not mix or sum(mix.values()) <= 0:
+        raise argparse.ArgumentTypeError("The status mix needs at least one positive weight")
+    return mix
+
+
+class LatencyStats:
+    """Thread-safe latency samples plus lock / error counters"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.samples = []
+        self.rows = 0
+        self.locked = 0
+        self.errors = 0
+
+    def record(self, seconds: float, rows: int = 1):
+        with self._lock:
+            self.samples.append(seconds)
+            self.rows += rows
+
+    def fail(self, error):
+        with self._lock:
+            if is_lock_error(error):
+                self.locked += 1
+            else:
+                self.errors += 1
+
+    def summary(self) -> dict:
+        """Count, error counters and latency percentiles in milliseconds."""
+        with self._lock:
+            samples = sorted(self.samples)
+            result = {'count': len(samples), 'rows': self.rows,
+                      'locked': self.locked, 'errors': self.errors}
+        if samples:
+            pick = lambda q: round(samples[min(len(samples) - 1, int(q * len(samples)))] * 1000, 2)
+            result.update(p50_ms=pick(0.50), p95_ms=pick(0.95), p99_ms=pick(0.99),
+                          max_ms=round(samples[-1] * 1000, 2))
+        return result
+
+
+def load_catalog(conn):
+    """Return (customer_types, products) in the shapes generate_orders expects."""
+    customer_types = [row[0] for row in conn.execute(
+        "SELECT customer_type FROM customers ORDER BY customer_id")]
+    products = conn.execute(
+        "SELECT product_id, name, category, base_price, stock_level FROM products ORDER BY product_id"
+    ).fetchall()
+    return customer_types, products
+
+
+def write_orders(db_path, rate, burst, max_batch, status_mix, stop, stats, seed=None,
+                 busy_timeout=5.0):
+    """
+    Append orders until ``stop`` is set.
+
+    Arrivals follow a Poisson process of bursts: each burst holds on
+    average ``burst`` orders (at most ``max_batch``) and bursts are spaced
+    so the long-run rate is ``rate`` orders/sec. Each burst is one
+    transaction; its BEGIN IMMEDIATE to COMMIT time is the write latency.
+    """
+    rng = random.Random(seed)
+    conn = sqlite3.connect(db_path, timeout=busy_timeout, isolation_level=None)
+    try:
+        customer_types, products = load_catalog(conn)
+        next_arrival = time.monotonic()
+        while not stop.is_set():
+            delay = next_arrival - time.monotonic()
+            if delay > 0 and stop.wait(delay):
+                break
+            next_arrival += rng.expovariate(rate / burst)
+
+            size = min(max_batch, max(1, round(rng.expovariate(1 / burst))))
+            batch = next(generate_orders(size, rng, customer_types, products, date.today(),
+                                         batch_size=size, history_days=1, status_mix=status_mix))
+            rows = [order[1:] for order in batch]  # let SQLite assign order_id
+
+            start = time.perf_counter()
+            try:
+                conn.execute("BEGIN IMMEDIATE")
+                conn.executemany(INSERT_ORDER_SQL, rows)
+                conn.execute("COMMIT")
+                stats.record(time.perf_counter() - start, len(rows))
+            except sqlite3.Error as e:
+                if conn.in_transaction:
+                    conn.execute("ROLLBACK")
+                stats.fail(e)
+    finally:
+        conn.close()
+
+
+def read_sqlite(pool, stop, stats, seed=None):
+    """Run READ_QUERIES against pooled read-only connections until ``stop`` is set."""
+    rng = random.Random(seed)
+    while not stop.is_set():
+        name, sql = rng.choice(READ_QUERIES)
+        start = time.perf_counter()
+        try:
+            with pool.connection() as conn:
+                if sql is None:
+                    read_stats(conn)
+                else:
+                    conn.execute(sql).fetchall()
+            stats.record(time.perf_counter() - start)
+        except Exception as e:
+            stats.fail(e)
+
+
+def read_http(base_url, stop, stats, seed=None):
+    """Alternate /api/stats and rule-path /api/query requests until ``stop`` is set."""
+    import requests
+
+    rng = random.Random(seed)
+    session = requests.Session()
+    while not stop.is_set():
+        start = time.perf_counter()
+        try:
+            if rng.random() < 0.5:
+                response = session.get(f"{base_url}/api/stats", timeout=30)
+            else:
+                response = session.post(f"{base_url}/api/query", timeout=30, json={
+                    'query': rng.choice(HTTP_QUESTIONS), 'cache': False})
+            if response.status_code != 200:
+                raise Exception(response.json().get('error', f"HTTP {response.status_code}"))
+            stats.record(time.perf_counter() - start)
+        except Exception as e:
+            stats.fail(e)
+
+
+def simulate(db_path=DEFAULT_DB_PATH, rate=50.0, burst=1.0, max_batch=50, status_mix=None,
+             duration=60.0, readers=4, url=None, seed=None, busy_timeout=5.0,
+             report_interval=5.0) -> dict:
+    """
+    Run the writer and reader threads for ``duration`` seconds.
+
+    Args:
+        db_path (str): Database to append orders to
+        rate (float): Target orders per second
+        burst (float): Mean orders per burst (1 = steady single-order writes)
+        max_batch (int): Largest burst written in one transaction
+        status_mix (dict): status -> weight for new orders
+        duration (float): Seconds to run
+        readers (int): Concurrent reader threads
+        url (str): Web server base URL; readers call its API instead of SQLite
+        seed (int): Random seed
+        busy_timeout (float): Seconds the writer waits on a locked database
+        report_interval (float): Seconds between progress lines (0 disables)
+
+    Returns:
+        dict: Write and read summaries
+    """
+    stop = threading.Event()
+    writes, reads = LatencyStats(), LatencyStats()
+    pool = None if url else ConnectionPool(db_path, size=max(1, readers))
+
+    threads = [threading.Thread(target=write_orders, name='writer', daemon=True, args=(
+        db_path, rate, burst, max_batch, status_mix, stop, writes, seed, busy_timeout))]
+    for i in range(readers):
+        seed_i = None if seed is None else seed + i + 1
+        if url:
+            threads.append(threading.Thread(target=read_http, name=f'reader-{i}', daemon=True,
+                                            args=(url.rstrip('/'), stop, reads, seed_i)))
+        else:
+            threads.append(threading.Thread(target=read_sqlite, name=f'reader-{i}', daemon=True,
+                                            args=(pool, stop, reads, seed_i)))
+
+    start = time.monotonic()
+    deadline = start + duration
+    for thread in threads:
+        thread.start()
+    try:
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            time.sleep(min(report_interval, remaining) if report_interval else remaining)
+            elapsed = time.monotonic() - start
+            if not report_interval or elapsed >= duration:
+                continue
+            w, r = writes.summary(), reads.summary()
+            print(f"⏱️ {elapsed:5.0f}s  {w['rows']:,} orders ({w['rows'] / elapsed:,.0f}/s), "
+                  f"write p95 {w.get('p95_ms', 0)}ms, reads {r['count']:,}, "
+                  f"locked writer/readers {w['locked']}/{r['locked']}")
+    except KeyboardInterrupt:
+        print("\n🛑 Stopping...")
+    finally:
+        stop.set()
+        for thread in threads:
+            thread.join()
+        if pool:
+            pool.close()
+
+    elapsed = time.monotonic() - start
+    write_summary = writes.summary()
+    write_summary['orders_per_sec'] = round(write_summary['rows'] / elapsed, 1)
+    return {
+        'db_path': db_path,
+        'duration': round(elapsed, 2),
+        'target_rate': rate,
+        'burst': burst,
+        'readers': readers,
+        'reader_mode': 'http' if url else 'sqlite',
+        'writes': write_summary,
+        'reads': reads.summary(),
+    }
+
+
+def print_report(report: dict):
+    """Print a simulate() summary."""
+    w, r = report['writes'], report['reads']
+    print(f"\n📊 Order stream: {report['duration']}s, target {report['target_rate']:g} orders/s, "
+          f"burst {report['burst']:g}, {report['readers']} {report['reader_mode']} reader(s)")
+    print(f"   ✍️ Writes: {w['rows']:,} orders in {w['count']:,} transactions "
+          f"({w['orders_per_sec']:,} orders/s)")
+    if w['count']:
+        print(f"      latency p50 {w['p50_ms']}ms, p95 {w['p95_ms']}ms, "
+              f"p99 {w['p99_ms']}ms, max {w['max_ms']}ms")
+    print(f"      locked {w['locked']}, other errors {w['errors']}")
+    print(f"   📖 Reads: {r['count']:,} queries")
+    if r['count']:
+        print(f"      latency p50 {r['p50_ms']}ms, p95 {r['p95_ms']}ms, "
+              f"p99 {r['p99_ms']}ms, max {r['max_ms']}ms")
+    print(f"      locked {r['locked']}, other errors {r['errors']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Append a live order stream to a sales database")
+    parser.add_argument('--db', default=DEFAULT_DB_PATH, help="database to write to")
+    parser.add_argument('--rate', type=float, default=50.0, help="target orders per second")
+    parser.add_argument('--burst', type=float, default=1.0,
+                        help="mean orders per burst; each burst is one transaction")
+    parser.add_argument('--max-batch', type=int, default=50, help="largest burst per transaction")
+    parser.add_argument('--status-mix', type=parse_status_mix,
+                        default=dict(zip(order_statuses, status_weights)),
+                        help="status weights, e.g. completed=85,refunded=8,cancelled=5,pending=2")
+    parser.add_argument('--duration', type=float, default=60.0, help="seconds to run")
+    parser.add_argument('--readers', type=int, default=4, help="concurrent reader threads")
+    parser.add_argument('--url', help="web server base URL; readers call /api/stats and /api/query")
+    parser.add_argument('--busy-timeout', type=float, default=5.0,
+                        help="seconds the writer waits on a locked database")
+    parser.add_argument('--seed', type=int, default=None, help="random seed")
+    parser.add_argument('--report-interval', type=float, default=5.0,
+                        help="seconds between progress lines (0 disables)")
+    parser.add_argument('--json', action='store_true', help="print the summary as JSON")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.db):
+        print(f"❌ Database not found: {args.db}")
+        sys.exit(1)
+
+    if not args.json:
+        print(f"🛒 Streaming orders into {args.db} for {args.duration:g}s...")
+    report = simulate(args.db, args.rate, args.burst, args.max_batch, args.status_mix,
+                      args.duration, args.readers, args.url, args.seed, args.busy_timeout,
+                      args.report_interval)
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print_report(report)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,2 @@
+# Database Package
+# This package contains modules for pooled, tuned access to the SQLite sales database
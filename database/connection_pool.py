@@ -0,0 +1,159 @@
+"""
+SQLite Connection Pool
+Keeps a small set of read-only connections to the sales database open and
+tuned (mmap, page cache, in-memory temp store, larger statement cache)
+so queries and stats calls stop paying connect/configure costs every time.
+
+The pool never writes to the database. Its journal mode (WAL by default,
+so readers don't block the order simulator) is set when the database is
+built, by data/setup_database.py and data/generate_database.py.
+"""
+
+import os
+import queue
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+import dotenv
+
+# DB_PATH is the one database path every module defaults to, so read .env first
+dotenv.load_dotenv()
+
+DB_PATH = os.getenv('DATABASE_PATH', os.path.join('data', 'sales.db'))
+POOL_SIZE = int(os.getenv('DB_POOL_SIZE', '8'))
+POOL_TIMEOUT = float(os.getenv('DB_POOL_TIMEOUT', '10'))
+MMAP_SIZE = int(os.getenv('DB_MMAP_SIZE', str(256 * 1024 * 1024)))
+CACHE_SIZE = int(os.getenv('DB_CACHE_SIZE', '-65536'))  # negative = KiB, so 64 MiB
+TEMP_STORE = os.getenv('DB_TEMP_STORE', 'MEMORY')
+STATEMENT_CACHE = int(os.getenv('DB_STATEMENT_CACHE', '512'))
+
+
+class ConnectionPool:
+    """
+    Bounded pool of read-only SQLite connections.
+
+    A thread holds at most one connection at a time: nested ``connection()``
+    calls on the same thread reuse the connection already checked out.
+    Idle connections are handed out most-recently-used first so their page
+    cache stays warm.
+    """
+
+    def __init__(self, db_path: str = DB_PATH, size: int = POOL_SIZE,
+                 timeout: float = POOL_TIMEOUT,
+                 mmap_size: int = MMAP_SIZE, cache_size: int = CACHE_SIZE,
+                 temp_store: str = TEMP_STORE, statement_cache: int = STATEMENT_CACHE):
+        self.db_path = db_path
+        self.size = size
+        self.timeout = timeout
+        self.mmap_size = mmap_size
+        self.cache_size = cache_size
+        self.temp_store = temp_store
+        self.statement_cache = statement_cache
+
+        self._idle = queue.LifoQueue()
+        self._opened = 0
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def _open(self) -> sqlite3.Connection:
+        """Open and configure a new read-only connection."""
+        conn = sqlite3.connect(
+            f"file:{self.db_path}?mode=ro", uri=True,
+            check_same_thread=False,
+            cached_statements=self.statement_cache
+        )
+        conn.execute(f"PRAGMA mmap_size={self.mmap_size}")
+        conn.execute(f"PRAGMA cache_size={self.cache_size}")
+        conn.execute(f"PRAGMA temp_store={self.temp_store}")
+        return conn
+
+    def _checkout(self) -> sqlite3.Connection:
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+
+        with self._lock:
+            if self._opened < self.size:
+                self._opened += 1
+                grow = True
+            else:
+                grow = False
+
+        if grow:
+            try:
+                return self._open()
+            except Exception:
+                with self._lock:
+                    self._opened -= 1
+                raise
+
+        try:
+            return self._idle.get(timeout=self.timeout)
+        except queue.Empty:
+            raise Exception(f"Timed out waiting for a database connection (pool size {self.size})")
+
+    def _checkin(self, conn: sqlite3.Connection):
+        if conn.in_transaction:
+            conn.rollback()
+        self._idle.put(conn)
+
+    @contextmanager
+    def connection(self):
+        """Check out this thread's connection for the duration of a with-block."""
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            yield conn
+            return
+
+        conn = self._checkout()
+        self._local.conn = conn
+        try:
+            yield conn
+        finally:
+            self._local.conn = None
+            self._checkin(conn)
+
+    @contextmanager
+    def dedicated(self):
+        """
+        Open a configured read-only connection outside the pool, closed on exit.
+
+        For reads that last as long as a client download, such as streamed
+        responses and exports. They don't hold a pool slot meanwhile, and
+        nothing is tied to the thread that opened the connection, so a
+        generator may be resumed or closed on any thread.
+        """
+        conn = self._open()
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    def close(self):
+        """Close every idle connection."""
+        while True:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            conn.close()
+            with self._lock:
+                self._opened -= 1
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(db_path: str = DB_PATH) -> ConnectionPool:
+    """Return the shared pool for a database path, creating it on first use."""
+    key = os.path.abspath(db_path)
+    pool = _pools.get(key)
+    if pool is None:
+        with _pools_lock:
+            pool = _pools.get(key)
+            if pool is None:
+                pool = _pools[key] = ConnectionPool(db_path)
+    return pool
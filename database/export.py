@@ -0,0 +1,247 @@
+"""
+Result Export
+Streams a query result as CSV, Arrow IPC or Parquet straight from the
+SQLite cursor. Rows are converted one fetchmany batch at a time, so an
+extract is never held in memory whole: each CSV chunk, Arrow record batch
+or Parquet row group is written and handed to the response before the
+next batch is read.
+
+Generated SQL is registered under a short id (a hash of the canonical
+SQL) so a client can export the exact statement /api/query ran. pyarrow
+is optional; without it only CSV is available.
+"""
+
+import csv
+import hashlib
+import io
+import os
+import threading
+from collections import OrderedDict
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = pq = None
+
+from database.result_cache import canonicalize_sql
+
+# Rows per fetchmany batch, i.e. per Arrow record batch / Parquet row group
+EXPORT_BATCH_ROWS = int(os.getenv('EXPORT_BATCH_ROWS', '50000'))
+# Generated statements remembered for export by sql_id
+EXPORT_SQL_IDS = int(os.getenv('EXPORT_SQL_IDS', '1024'))
+PARQUET_COMPRESSION = os.getenv('PARQUET_COMPRESSION', 'zstd')
+
+# format -> (media type, file extension)
+EXPORT_FORMATS = {
+    'csv': ('text/csv; charset=utf-8', 'csv'),
+    'arrow': ('application/vnd.apache.arrow.stream', 'arrows'),
+    'parquet': ('application/vnd.apache.parquet', 'parquet'),
+}
+
+
+class ExportError(Exception):
+    """Raised for an unsupported format or a result that can't be converted."""
+
+
+def check_format(fmt: str):
+    """Raise ExportError unless fmt can be exported here."""
+    if fmt not in EXPORT_FORMATS:
+        raise ExportError(f"format must be one of: {', '.join(EXPORT_FORMATS)}")
+    if fmt != 'csv' and pa is None:
+        raise ExportError(f"{fmt} export needs pyarrow (pip install pyarrow); csv is always available")
+
+
+def sql_id(sql: str) -> str:
+    """Stable id of a statement: a hash of its canonical text."""
+    return hashlib.blake2b(canonicalize_sql(sql).encode('utf-8'), digest_size=8).hexdigest()
+
+
+class SqlRegistry:
+    """Bounded LRU map of sql_id -> generated SQL, for exports by id."""
+
+    def __init__(self, max_entries: int = EXPORT_SQL_IDS):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def register(self, sql: str) -> str:
+        key = sql_id(sql)
+        with self._lock:
+            self._entries[key] = sql
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return key
+
+    def get(self, key: str):
+        with self._lock:
+            sql = self._entries.get(key)
+            if sql is not None:
+                self._entries.move_to_end(key)
+            return sql
+
+
+SQL_REGISTRY = SqlRegistry()
+
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only stream that collects what a writer produces until drained."""
+
+    def __init__(self):
+        super().__init__()
+        self._chunks = []
+        self._position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        data = bytes(data)
+        self._chunks.append(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def drain(self) -> bytes:
+        data = b''.join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def iter_csv(headers, batches):
+    """Yield a header line, then one encoded CSV chunk per batch of rows."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator='\n')
+    writer.writerow(headers)
+    for rows in batches:
+        writer.writerows(rows)
+        yield buffer.getvalue().encode('utf-8')
+        buffer.seek(0)
+        buffer.truncate()
+    yield buffer.getvalue().encode('utf-8')
+
+
+def declared_types(conn, sql: str) -> list:
+    """
+    Declared type of each result column ('' for expressions), without running the query.
+
+    Read from a temporary view, which lives in the connection's own temp
+    schema, so a read-only connection can create it.
+    """
+    name = f"_export_{sql_id(sql)}"
+    conn.execute(f"CREATE TEMP VIEW IF NOT EXISTS {name} AS {sql.strip().rstrip(';')}")
+    try:
+        return [row[2] or '' for row in conn.execute(f"PRAGMA temp.table_info({name})")]
+    finally:
+        conn.execute(f"DROP VIEW IF EXISTS temp.{name}")
+
+
+def _arrow_type(values, complete: bool = True, declared: str = ''):
+    """
+    Arrow type for a column from the Python types in its first batch.
+
+    The schema can't change once written, so a column of ints is only
+    int64 when that batch is the whole result or the column is declared
+    INTEGER. Otherwise (e.g. SUM(price * quantity)) a later float could
+    turn up, so it is widened to float64 up front.
+    """
+    kinds = {type(v) for v in values if v is not None}
+    if not kinds or kinds == {str}:
+        return pa.string()
+    if kinds == {int}:
+        return pa.int64() if complete or 'INT' in declared.upper() else pa.float64()
+    if kinds <= {int, float}:
+        return pa.float64()
+    if kinds == {bytes}:
+        return pa.binary()
+    return pa.string()  # mixed storage classes are exported as text
+
+
+def arrow_schema(headers, rows, complete: bool = True, declared=None):
+    """Schema inferred from the first batch of rows (see _arrow_type)."""
+    columns = list(zip(*rows)) if rows else [() for _ in headers]
+    declared = declared or [''] * len(headers)
+    return pa.schema([pa.field(name, _arrow_type(values, complete, decl))
+                      for name, values, decl in zip(headers, columns, declared)])
+
+
+def record_batch(schema, rows):
+    """Convert a batch of row tuples to an Arrow record batch of the schema."""
+    columns = list(zip(*rows)) if rows else [() for _ in schema]
+    arrays = []
+    for field, values in zip(schema, columns):
+        if field.type == pa.string() and any(v is not None and type(v) is not str for v in values):
+            values = [v if v is None or type(v) is str else str(v) for v in values]
+        elif field.type == pa.int64() and any(type(v) is float for v in values):
+            # Integral REALs in an INTEGER column convert losslessly; pyarrow
+            # would silently truncate any others, so those are refused below
+            values = [int(v) if type(v) is float and v.is_integer() else v for v in values]
+            if any(type(v) is float for v in values):
+                raise ExportError(f"Column {field.name!r} is declared INTEGER but holds fractional values")
+        try:
+            arrays.append(pa.array(values, type=field.type))
+        except (pa.ArrowInvalid, pa.ArrowTypeError) as e:
+            raise ExportError(f"Column {field.name!r} changes type part way through the result: {e}") from e
+    return pa.RecordBatch.from_arrays(arrays, schema=schema)
+
+
+def _iter_arrow_writer(open_writer, write, headers, batches, declared=None):
+    """Drive a pyarrow writer batch by batch, yielding its output as it is produced."""
+    batches = iter(batches)
+    first = next(batches, [])
+    second = next(batches, None)  # is the first batch the whole result?
+    schema = arrow_schema(headers, first, second is None, declared)
+    sink = _ChunkSink()
+    writer = open_writer(sink, schema)
+    try:
+        for rows in [batch for batch in (first, second) if batch]:
+            write(writer, record_batch(schema, rows))
+            yield sink.drain()
+        for rows in batches:
+            write(writer, record_batch(schema, rows))
+            yield sink.drain()
+    finally:
+        writer.close()
+    yield sink.drain()
+
+
+def iter_arrow(headers, batches, declared=None):
+    """Yield an Arrow IPC stream: the schema, then one record batch per batch of rows."""
+    return _iter_arrow_writer(pa.ipc.new_stream, lambda writer, batch: writer.write_batch(batch),
+                              headers, batches, declared)
+
+
+def iter_parquet(headers, batches, declared=None):
+    """Yield a Parquet file with one row group per batch of rows."""
+    return _iter_arrow_writer(
+        lambda sink, schema: pq.ParquetWriter(sink, schema, compression=PARQUET_COMPRESSION),
+        lambda writer, batch: writer.write_batch(batch, row_group_size=batch.num_rows or None),
+        headers, batches, declared)
+
+
+def export_rows(fmt: str, headers, batches, declared=None):
+    """
+    Encode batches of rows in an export format.
+
+    Args:
+        fmt (str): 'csv', 'arrow' or 'parquet'
+        headers (list): Column names
+        batches (iterable): Lists of row tuples, e.g. from chat_bot.iter_query
+        declared (list): Declared column types from declared_types(), so
+            INTEGER columns of a multi-batch result can stay int64
+
+    Returns:
+        iterator: bytes chunks of the encoded result
+
+    Raises:
+        ExportError: If the format is unknown or needs pyarrow
+    """
+    check_format(fmt)
+    if fmt == 'csv':
+        return iter_csv(headers, batches)
+    if fmt == 'arrow':
+        return iter_arrow(headers, batches, declared)
+    return iter_parquet(headers, batches, declared)
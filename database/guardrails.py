@@ -0,0 +1,176 @@
+"""
+Query Guardrails
+Keeps one bad LLM-generated statement from tying up a worker. Before a
+statement runs, its EXPLAIN QUERY PLAN is checked for unindexed
+multi-table scans (cartesian joins) whose estimated cost is over a
+threshold. While it runs, a SQLite progress handler enforces a
+wall-clock and optional VM-step budget. Results are fetched up to a row
+cap and flagged as truncated beyond it.
+"""
+
+import os
+import re
+import sqlite3
+import time
+from contextlib import contextmanager
+
+QUERY_TIMEOUT = float(os.getenv('QUERY_TIMEOUT_SECONDS', '10'))
+# 0 disables the VM-step budget (the wall-clock budget still applies)
+QUERY_MAX_VM_STEPS = int(os.getenv('QUERY_MAX_VM_STEPS', '0'))
+QUERY_MAX_ROWS = int(os.getenv('QUERY_MAX_ROWS', '10000'))
+# Largest product of full-scan row counts allowed in one nested loop
+QUERY_MAX_SCAN_COST = float(os.getenv('QUERY_MAX_SCAN_COST', '1e8'))
+
+# VM instructions between progress-handler calls
+PROGRESS_INTERVAL = 1000
+
+_TABLE_REF = re.compile(r'\b(?:FROM|JOIN)\s+([A-Za-z_]\w*)(?:\s+(?:AS\s+)?([A-Za-z_]\w*))?', re.I)
+_COMMA_REF = re.compile(r',\s*([A-Za-z_]\w*)(?:\s+(?:AS\s+)?([A-Za-z_]\w*))?', re.I)
+_NOT_ALIASES = {'on', 'using', 'where', 'join', 'inner', 'left', 'right', 'cross', 'natural',
+                'outer', 'group', 'order', 'limit', 'having', 'union', 'except', 'intersect'}
+# A full-scan step: "SCAN o" (SQLite >= 3.36) or "SCAN TABLE orders AS o" (older)
+_SCAN_STEP = re.compile(r'^SCAN (?:TABLE )?([A-Za-z_]\w*)')
+
+
+class QueryRejected(Exception):
+    """Raised when a statement is refused before or during execution."""
+
+
+def table_sizes(conn) -> dict:
+    """Approximate row count of every table (MAX(rowid), one index seek each)."""
+    sizes = {}
+    for (table,) in conn.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'table' AND name NOT LIKE 'sqlite_%'"):
+        try:
+            sizes[table.lower()] = conn.execute(f'SELECT MAX(rowid) FROM "{table}"').fetchone()[0] or 0
+        except sqlite3.Error:  # WITHOUT ROWID tables
+            sizes[table.lower()] = conn.execute(f'SELECT COUNT(*) FROM "{table}"').fetchone()[0]
+    return sizes
+
+
+def table_aliases(sql: str) -> dict:
+    """Map every alias (and bare table name) in FROM / JOIN clauses to its table."""
+    aliases = {}
+    for pattern in (_TABLE_REF, _COMMA_REF):
+        for table, alias in pattern.findall(sql):
+            aliases[table.lower()] = table.lower()
+            if alias and alias.lower() not in _NOT_ALIASES:
+                aliases[alias.lower()] = table.lower()
+    return aliases
+
+
+def scan_cost(conn, sql: str):
+    """
+    Estimate the worst nested-loop full-scan cost in a statement's plan.
+
+    Full SCAN steps that share a parent in EXPLAIN QUERY PLAN run as one
+    nested loop, so their row counts multiply. SEARCH steps (index or
+    automatic-index lookups) are cheap and ignored.
+
+    Returns:
+        tuple: (cost, scanned tables of the worst loop)
+    """
+    sizes = table_sizes(conn)
+    aliases = table_aliases(sql)
+    loops = {}
+    for _, parent, _, detail in conn.execute(f"EXPLAIN QUERY PLAN {sql}"):
+        step = _SCAN_STEP.match(detail)
+        if not step:
+            continue
+        name = step.group(1).lower()
+        table = aliases.get(name, name)
+        if table in sizes:
+            loops.setdefault(parent, []).append(table)
+
+    worst, worst_tables = 0, []
+    for tables in loops.values():
+        if len(tables) < 2:
+            continue
+        cost = 1
+        for table in tables:
+            cost *= max(1, sizes[table])
+        if cost > worst:
+            worst, worst_tables = cost, tables
+    return worst, worst_tables
+
+
+def check_plan(conn, sql: str, max_cost: float = QUERY_MAX_SCAN_COST):
+    """Raise QueryRejected if the plan scans several unindexed tables in one loop."""
+    if not max_cost:
+        return
+    cost, tables = scan_cost(conn, sql)
+    if cost > max_cost:
+        raise QueryRejected(
+            f"Query rejected: joining {', '.join(tables)} without an index would visit "
+            f"about {cost:,.0f} row combinations (limit {max_cost:,.0f}). "
+            f"Add a join condition or narrow the question.")
+
+
+@contextmanager
+def execution_budget(conn, timeout: float = QUERY_TIMEOUT, max_steps: int = QUERY_MAX_VM_STEPS):
+    """
+    Interrupt the statements run inside the block once they exceed
+    ``timeout`` seconds or ``max_steps`` VM instructions.
+
+    The progress handler is removed on exit so pooled connections are
+    returned without it.
+    """
+    if not timeout and not max_steps:
+        yield
+        return
+
+    deadline = time.monotonic() + timeout if timeout else None
+    state = {'steps': 0, 'reason': None}
+
+    def progress():
+        state['steps'] += PROGRESS_INTERVAL
+        if max_steps and state['steps'] > max_steps:
+            state['reason'] = f"more than {max_steps:,} VM steps"
+            return 1
+        if deadline is not None and time.monotonic() > deadline:
+            state['reason'] = f"the {timeout:g}s time limit"
+            return 1
+        return 0
+
+    conn.set_progress_handler(progress, PROGRESS_INTERVAL)
+    try:
+        yield
+    except sqlite3.OperationalError as e:
+        if state['reason'] and 'interrupt' in str(e).lower():
+            raise QueryRejected(f"Query stopped: it exceeded {state['reason']}") from e
+        raise
+    finally:
+        conn.set_progress_handler(None, 0)
+
+
+def fetch_capped(cursor, max_rows: int = QUERY_MAX_ROWS):
+    """
+    Fetch at most ``max_rows`` rows.
+
+    Returns:
+        tuple: (rows, truncated) where truncated is True if more rows existed
+    """
+    if not max_rows:
+        return cursor.fetchall(), False
+    rows = cursor.fetchmany(max_rows + 1)
+    truncated = len(rows) > max_rows
+    return rows[:max_rows], truncated
+
+
+def run_guarded(conn, sql: str, max_rows: int = QUERY_MAX_ROWS, timeout: float = QUERY_TIMEOUT,
+                max_steps: int = QUERY_MAX_VM_STEPS, max_cost: float = QUERY_MAX_SCAN_COST):
+    """
+    Run a statement with every guardrail applied.
+
+    Returns:
+        tuple: (headers, rows, truncated)
+
+    Raises:
+        QueryRejected: If the plan is too expensive or the budget runs out
+    """
+    check_plan(conn, sql, max_cost)
+    with execution_budget(conn, timeout, max_steps):
+        cursor = conn.execute(sql)
+        headers = [desc[0] for desc in cursor.description] if cursor.description else []
+        rows, truncated = fetch_capped(cursor, max_rows)
+    return headers, rows, truncated
@@ -0,0 +1,498 @@
+"""
+Index Advisor
+Collects a sample of the SQL that the chatbot actually generates into a
+workload log (opt-in with WORKLOAD_CAPTURE), then uses EXPLAIN QUERY PLAN
+to find full scans and temp B-tree sorts and recommends composite /
+covering indexes for them.
+
+Only single SELECT / WITH statements from the log are analyzed; anything
+else is skipped without being run. The workload is first planned and
+timed on a read-only connection. Candidate indexes are then created
+inside a transaction, the workload is re-planned and re-timed with
+PRAGMA query_only on, and the transaction is rolled back, so the report
+shows real before/after plans without touching the database unless
+--apply is given. Every timed run goes through the same guardrails as a
+chatbot query (plan check, time budget, row cap).
+
+Usage:
+    python -m database.index_advisor [--db PATH] [--log PATH] [--apply] [--json]
+"""
+
+import argparse
+import atexit
+import json
+import os
+import queue
+import random
+import re
+import sqlite3
+import threading
+import time
+from collections import Counter, OrderedDict
+
+from database.connection_pool import DB_PATH
+from database.guardrails import QUERY_MAX_ROWS, QueryRejected, check_plan, execution_budget, fetch_capped
+from llm.backends import is_valid_sql
+
+WORKLOAD_LOG_PATH = os.getenv('WORKLOAD_LOG_PATH', os.path.join('data', 'query_workload.jsonl'))
+# Capture is off by default; when on, this fraction of statements is logged
+WORKLOAD_CAPTURE = os.getenv('WORKLOAD_CAPTURE', 'false').lower() in ('1', 'true', 'yes')
+WORKLOAD_SAMPLE_RATE = float(os.getenv('WORKLOAD_SAMPLE_RATE', '0.1'))
+# The log moves to <path>.1 past this size, so at most twice this is kept
+WORKLOAD_LOG_MAX_BYTES = int(os.getenv('WORKLOAD_LOG_MAX_BYTES', str(10 * 1024 * 1024)))
+# Entries waiting for the writer thread; more are dropped rather than block a request
+WORKLOAD_QUEUE_SIZE = 10000
+MAX_INDEX_COLUMNS = 5
+
+_TOKEN = re.compile(r"""
+    (?P<string>'(?:[^']|'')*')
+  | (?P<number>\d+(?:\.\d+)?)
+  | (?P<ident>[A-Za-z_][A-Za-z0-9_]*(?:\.(?:[A-Za-z_][A-Za-z0-9_]*|\*))?)
+  | (?P<op><=|>=|!=|<>|==|[=<>(),*;])
+  | (?P<other>\S)
+""", re.VERBOSE)
+
+_KEYWORDS = {
+    'select', 'from', 'where', 'join', 'inner', 'left', 'right', 'outer', 'cross', 'on',
+    'group', 'order', 'by', 'having', 'limit', 'offset', 'and', 'or', 'not', 'as', 'in',
+    'is', 'null', 'like', 'between', 'asc', 'desc', 'distinct', 'union', 'all', 'case',
+    'when', 'then', 'else', 'end', 'with', 'exists', 'using', 'natural',
+}
+_EQUALITY_OPS = {'=', '==', 'in', 'is'}
+_RANGE_OPS = {'<', '>', '<=', '>=', 'between', 'like'}
+
+
+class WorkloadLog:
+    """
+    Sampled, size-bounded workload log.
+
+    record() only samples and enqueues, so callers on the request path
+    never touch the file; a daemon thread appends queued entries in
+    batches and rotates the file at ``max_bytes``.
+    """
+
+    def __init__(self, path: str = WORKLOAD_LOG_PATH, sample_rate: float = WORKLOAD_SAMPLE_RATE,
+                 max_bytes: int = WORKLOAD_LOG_MAX_BYTES, queue_size: int = WORKLOAD_QUEUE_SIZE):
+        self.path = path
+        self.sample_rate = sample_rate
+        self.max_bytes = max_bytes
+        self.dropped = 0  # sampled entries lost to a full queue
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._thread = threading.Thread(target=self._run, name='workload-log', daemon=True)
+        self._thread.start()
+
+    def record(self, sql: str, source: str = ''):
+        if random.random() >= self.sample_rate:
+            return
+        try:
+            self._queue.put_nowait((time.time(), source, sql))
+        except queue.Full:
+            self.dropped += 1
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            while True:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            entries = [item for item in batch if item is not None]
+            if entries:
+                self._write(entries)
+            for _ in batch:
+                self._queue.task_done()
+            if None in batch:
+                return
+
+    def _write(self, entries: list):
+        lines = ''.join(json.dumps({'ts': round(ts, 3), 'source': source, 'sql': sql}) + '\n'
+                        for ts, source, sql in entries)
+        try:
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(lines)
+                size = f.tell()
+            if self.max_bytes and size > self.max_bytes:
+                os.replace(self.path, self.path + '.1')
+        except OSError as e:
+            print(f"⚠️  Could not write workload log: {e}")
+
+    def flush(self):
+        """Wait until every queued entry is written."""
+        self._queue.join()
+
+    def close(self):
+        self._queue.put(None)
+        self._thread.join(timeout=1)
+
+
+_workload_log = None
+_workload_log_lock = threading.Lock()
+
+
+def get_workload_log() -> WorkloadLog:
+    """Return the shared WorkloadLog, starting its writer on first use."""
+    global _workload_log
+    if _workload_log is None:
+        with _workload_log_lock:
+            if _workload_log is None:
+                _workload_log = WorkloadLog()
+                atexit.register(_workload_log.close)
+    return _workload_log
+
+
+def record_workload(sql: str, source: str = ''):
+    """Sample one generated SQL statement into the workload log, if capture is on."""
+    if WORKLOAD_CAPTURE and WORKLOAD_LOG_PATH:
+        get_workload_log().record(sql, source)
+
+
+def load_workload(path: str = WORKLOAD_LOG_PATH) -> Counter:
+    """Return SQL text -> number of times it appears in the workload log and its rotated part."""
+    workload = Counter()
+    for part in (path + '.1', path):
+        if not os.path.exists(part):
+            continue
+        with open(part, encoding='utf-8') as f:
+            for line in f:
+                try:
+                    sql = json.loads(line)['sql']
+                except (ValueError, KeyError):
+                    continue
+                workload[' '.join(sql.split()).rstrip(';')] += 1
+    return workload
+
+
+def explain(conn, sql: str) -> list:
+    """Return the EXPLAIN QUERY PLAN detail lines for a statement."""
+    return [row[3] for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}")]
+
+
+def plan_problems(plan: list) -> list:
+    """Pick out full table scans and temp B-tree sorts from a plan."""
+    return [step for step in plan
+            if (step.startswith('SCAN ') and 'COVERING INDEX' not in step)
+            or 'USE TEMP B-TREE' in step]
+
+
+def time_query(conn, sql: str, repeat: int = 3, max_rows: int = QUERY_MAX_ROWS) -> tuple:
+    """
+    Best-of-N wall time in milliseconds to read a statement's result.
+
+    Runs under the chatbot's guardrails: the plan check, the time budget
+    and the row cap, so timing stops after max_rows rows.
+
+    Returns:
+        tuple: (milliseconds, rows read, truncated)
+
+    Raises:
+        QueryRejected: If the plan is too expensive or the budget runs out
+    """
+    check_plan(conn, sql)
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        with execution_budget(conn):
+            rows, truncated = fetch_capped(conn.execute(sql), max_rows)
+        elapsed = (time.perf_counter() - start) * 1000
+        best = elapsed if best is None else min(best, elapsed)
+    return round(best, 3), len(rows), truncated
+
+
+def _schema(conn):
+    """Return (table -> columns, table -> primary key column) for every user table."""
+    tables = [row[0] for row in conn.execute(
+        "SELECT name FROM sqlite_master WHERE type = 'table' AND name NOT LIKE 'sqlite_%'")]
+    schema, pks = {}, {}
+    for table in tables:
+        info = conn.execute(f"PRAGMA table_info({table})").fetchall()
+        schema[table] = [col[1] for col in info]
+        pks[table] = next((col[1] for col in info if col[5] == 1), None)
+    return schema, pks
+
+
+def _existing_indexes(conn, table: str) -> list:
+    """Return the column lists of existing indexes on a table."""
+    indexes = []
+    for index in conn.execute(f"PRAGMA index_list({table})"):
+        cols = [row[2] for row in conn.execute(f"PRAGMA index_info({index[1]})")]
+        if all(cols):
+            indexes.append(cols)
+    return indexes
+
+
+def analyze_columns(sql: str, schema: dict) -> dict:
+    """
+    Classify the columns a statement uses, per table.
+
+    Returns table -> {'eq': [...], 'range': [...], 'order': [...],
+    'used': set(...), 'star': bool}. This is a lightweight token scan,
+    not a full SQL parser; columns inside function calls are ignored for
+    eq/range purposes.
+    """
+    tokens = [(m.lastgroup, m.group()) for m in _TOKEN.finditer(sql)]
+    lowered = [(kind, text.lower()) for kind, text in tokens]
+
+    # Resolve table aliases from FROM / JOIN clauses
+    aliases = {}
+    for i, (kind, text) in enumerate(lowered):
+        if text in ('from', 'join') and i + 1 < len(lowered) and lowered[i + 1][1] in schema:
+            table = lowered[i + 1][1]
+            aliases[table] = table
+            j = i + 2
+            if j < len(lowered) and lowered[j][1] == 'as':
+                j += 1
+            if j < len(lowered) and lowered[j][0] == 'ident' and lowered[j][1] not in _KEYWORDS:
+                aliases[lowered[j][1]] = table
+    tables = sorted(set(aliases.values()))
+
+    usage = {t: {'eq': [], 'range': [], 'order': [], 'used': set(), 'star': False} for t in tables}
+
+    def resolve(ident):
+        if '.' in ident:
+            alias, column = ident.split('.', 1)
+            table = aliases.get(alias)
+            if table is None:
+                return None
+            if column == '*':
+                usage[table]['star'] = True
+                return None
+            return (table, column) if column in schema[table] else None
+        owners = [t for t in tables if ident in schema[t]]
+        return (owners[0], ident) if len(owners) == 1 else None
+
+    clause = None
+    for i, (kind, text) in enumerate(lowered):
+        if kind == 'ident' and text in _KEYWORDS:
+            if text in ('select', 'where', 'on', 'having'):
+                clause = text
+            elif text in ('group', 'order') and i + 1 < len(lowered) and lowered[i + 1][1] == 'by':
+                clause = text
+            elif text in ('limit', 'from'):
+                clause = text
+            continue
+        if kind == 'op' and text == '*' and clause == 'select' and i > 0 and \
+                lowered[i - 1][1] in ('select', 'distinct', ','):
+            for t in tables:
+                usage[t]['star'] = True
+            continue
+        if kind != 'ident':
+            continue
+
+        ref = resolve(text)
+        if ref is None:
+            continue
+        table, column = ref
+        entry = usage[table]
+        entry['used'].add(column)
+
+        nxt = lowered[i + 1][1] if i + 1 < len(lowered) else ''
+        prev = lowered[i - 1][1] if i > 0 else ''
+        in_call = prev == '(' and i > 1 and lowered[i - 2][0] == 'ident' \
+            and lowered[i - 2][1] not in _KEYWORDS
+        if clause in ('where', 'on', 'having') and not in_call:
+            if nxt == 'not' and i + 2 < len(lowered):
+                nxt = lowered[i + 2][1]
+            if nxt in _EQUALITY_OPS or prev in ('=', '=='):
+                if column not in entry['eq']:
+                    entry['eq'].append(column)
+            elif nxt in _RANGE_OPS or prev in _RANGE_OPS:
+                if column not in entry['range']:
+                    entry['range'].append(column)
+        elif clause in ('group', 'order') and not in_call:
+            if column not in entry['order']:
+                entry['order'].append(column)
+    return usage
+
+
+def candidate_indexes(sql: str, schema: dict, pks: dict, existing: dict) -> list:
+    """Propose (table, columns) composite/covering indexes for one statement."""
+    candidates = []
+    for table, use in analyze_columns(sql, schema).items():
+        # The primary key is already the table's own B-tree key
+        pk = pks.get(table)
+        columns = [c for c in use['eq'] if c != pk]
+        if use['range'] and use['range'][0] != pk:
+            columns.append(use['range'][0])
+        elif not use['range']:
+            columns += [c for c in use['order'] if c not in columns and c != pk]
+        if not columns:
+            continue
+
+        # Make the index covering when the statement touches few columns
+        rest = sorted(use['used'] - set(columns) - {pk})
+        if not use['star'] and len(columns) + len(rest) <= MAX_INDEX_COLUMNS:
+            columns += rest
+
+        columns = columns[:MAX_INDEX_COLUMNS]
+        if any(idx[:len(columns)] == columns for idx in existing.get(table, [])):
+            continue
+        candidates.append((table, tuple(columns)))
+    return candidates
+
+
+def index_name(table: str, columns) -> str:
+    """Deterministic name for an advisor-created index."""
+    return f"idx_advisor_{table}_{'_'.join(columns)}"
+
+
+def advise(db_path: str = DB_PATH, log_path: str = WORKLOAD_LOG_PATH,
+           apply: bool = False, repeat: int = 3) -> dict:
+    """
+    Analyze the logged workload and recommend indexes.
+
+    Args:
+        db_path (str): Database to analyze
+        log_path (str): Workload log written by record_workload
+        apply (bool): Keep the recommended indexes instead of rolling back
+        repeat (int): Timing runs per query (best is reported)
+
+    Returns:
+        dict: recommendations plus per-query before/after plans and timings
+    """
+    workload = load_workload(log_path)
+    # Logged SQL is unvalidated LLM output: only single reads are ever run
+    skipped = sum(count for sql, count in workload.items() if not is_valid_sql(sql))
+    workload = Counter({sql: count for sql, count in workload.items() if is_valid_sql(sql)})
+
+    conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+    try:
+        schema, pks = _schema(conn)
+        existing = {t: _existing_indexes(conn, t) for t in schema}
+
+        queries = OrderedDict()
+        proposals = OrderedDict()
+        for sql, count in workload.most_common():
+            try:
+                plan = explain(conn, sql)
+                time_before, rows, truncated = time_query(conn, sql, repeat)
+            except (sqlite3.Error, QueryRejected) as e:
+                queries[sql] = {'count': count, 'error': str(e)}
+                continue
+            queries[sql] = {
+                'count': count,
+                'plan_before': plan,
+                'time_before_ms': time_before,
+                'rows': rows,
+                'truncated': truncated,
+            }
+            if plan_problems(plan):
+                for table, columns in candidate_indexes(sql, schema, pks, existing):
+                    proposals.setdefault((table, columns), []).append(sql)
+    finally:
+        conn.close()
+
+    conn = sqlite3.connect(db_path, isolation_level=None)
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        for table, columns in proposals:
+            conn.execute(f"CREATE INDEX IF NOT EXISTS {index_name(table, columns)} "
+                         f"ON {table}({', '.join(columns)})")
+        conn.execute("ANALYZE")
+
+        used = set()
+        conn.execute("PRAGMA query_only = ON")
+        try:
+            for sql, info in queries.items():
+                if 'error' in info:
+                    continue
+                info['plan_after'] = explain(conn, sql)
+                try:
+                    info['time_after_ms'] = time_query(conn, sql, repeat)[0]
+                except QueryRejected as e:
+                    info['time_after_ms'] = None
+                    info['error_after'] = str(e)
+                for step in info['plan_after']:
+                    for table, columns in proposals:
+                        if index_name(table, columns) in step:
+                            used.add((table, columns))
+        finally:
+            conn.execute("PRAGMA query_only = OFF")
+
+        # Only keep indexes the planner actually chose
+        for table, columns in proposals:
+            if (table, columns) not in used:
+                conn.execute(f"DROP INDEX IF EXISTS {index_name(table, columns)}")
+        conn.execute("COMMIT" if apply else "ROLLBACK")
+    finally:
+        conn.close()
+
+    recommendations = [
+        {
+            'table': table,
+            'columns': list(columns),
+            'sql': f"CREATE INDEX {index_name(table, columns)} ON {table}({', '.join(columns)});",
+            'queries': len(proposals[(table, columns)]),
+            'weight': sum(queries[q]['count'] for q in proposals[(table, columns)]),
+        }
+        for table, columns in proposals if (table, columns) in used
+    ]
+    recommendations.sort(key=lambda r: r['weight'], reverse=True)
+
+    timed = [q for q in queries.values() if 'error' not in q and q['time_after_ms'] is not None]
+    total_before = sum(q['time_before_ms'] * q['count'] for q in timed)
+    total_after = sum(q['time_after_ms'] * q['count'] for q in timed)
+    return {
+        'applied': apply,
+        'statements': len(queries),
+        'executions': sum(workload.values()),
+        'skipped': skipped,
+        'workload_time_before_ms': round(total_before, 3),
+        'workload_time_after_ms': round(total_after, 3),
+        'recommendations': recommendations,
+        'queries': [{'sql': sql, **info} for sql, info in queries.items()],
+    }
+
+
+def print_report(report: dict):
+    """Print an advisor report in a readable form."""
+    print("🔎 Index Advisor Report")
+    print("=" * 60)
+    print(f"Workload: {report['statements']} distinct statements, "
+          f"{report['executions']} executions")
+    if report['skipped']:
+        print(f"⚠️ Skipped {report['skipped']} logged execution(s) that are not a single SELECT / WITH")
+    print(f"Weighted workload time: {report['workload_time_before_ms']:.2f} ms -> "
+          f"{report['workload_time_after_ms']:.2f} ms")
+
+    print("\n💡 Recommended indexes" + (" (applied)" if report['applied'] else ""))
+    print("-" * 60)
+    if not report['recommendations']:
+        print("No index changes recommended.")
+    for rec in report['recommendations']:
+        print(f"{rec['sql']}  -- helps {rec['queries']} statement(s), "
+              f"{rec['weight']} execution(s)")
+
+    print("\n📄 Per-statement plans")
+    print("-" * 60)
+    for query in report['queries']:
+        print(f"\n[{query['count']}x] {query['sql']}")
+        if 'error' in query:
+            print(f"   ❌ {query['error']}")
+            continue
+        rows = f"{query['rows']}{'+' if query['truncated'] else ''} rows"
+        print(f"   before ({query['time_before_ms']} ms, {rows}): {' | '.join(query['plan_before'])}")
+        if query.get('error_after'):
+            print(f"   after: ❌ {query['error_after']}")
+        else:
+            print(f"   after  ({query['time_after_ms']} ms, {rows}): {' | '.join(query['plan_after'])}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Recommend indexes for the logged query workload")
+    parser.add_argument('--db', default=DB_PATH, help="database to analyze")
+    parser.add_argument('--log', default=WORKLOAD_LOG_PATH, help="workload log (JSONL)")
+    parser.add_argument('--apply', action='store_true', help="create the recommended indexes")
+    parser.add_argument('--repeat', type=int, default=3, help="timing runs per statement")
+    parser.add_argument('--json', action='store_true', help="print the report as JSON")
+    args = parser.parse_args()
+
+    report = advise(args.db, args.log, apply=args.apply, repeat=args.repeat)
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print_report(report)
+
+
+if __name__ == "__main__":
+    main()
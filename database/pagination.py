@@ -0,0 +1,233 @@
+"""
+Keyset Pagination
+Pages through the customers, products and orders tables with cursor
+(keyset) seeks instead of OFFSET, so every page costs the same. Supports
+server-side sorting on indexed columns, simple comparison filters (a
+repeated equality filter matches any of its values) and a column
+projection.
+
+Run ``python -m database.pagination`` to add the sort indexes to an
+existing database.
+"""
+
+import base64
+import json
+import sqlite3
+import sys
+
+from database.connection_pool import DB_PATH
+
+PAGE_TABLES = ('customers', 'products', 'orders')
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+# Default ordering per table, matching the original full dump
+DEFAULT_SORT = {
+    'customers': 'customer_id',
+    'products': 'product_id',
+    'orders': '-order_date',
+}
+
+# Secondary indexes that make the common sort/filter columns seekable
+PAGINATION_INDEXES = {
+    'idx_customers_name': ('customers', 'name'),
+    'idx_customers_join_date': ('customers', 'join_date'),
+    'idx_customers_customer_type': ('customers', 'customer_type'),
+    'idx_products_name': ('products', 'name'),
+    'idx_products_category': ('products', 'category'),
+    'idx_products_base_price': ('products', 'base_price'),
+    'idx_orders_order_date': ('orders', 'order_date'),
+    'idx_orders_customer_id': ('orders', 'customer_id'),
+    'idx_orders_product_id': ('orders', 'product_id'),
+    'idx_orders_status': ('orders', 'status'),
+}
+
+FILTER_OPERATORS = {
+    'eq': '=',
+    'ne': '!=',
+    'gt': '>',
+    'gte': '>=',
+    'lt': '<',
+    'lte': '<=',
+}
+
+# Query parameters that are not column filters; names starting with '_'
+# (cache busters such as jQuery's ``_=``) are ignored too
+RESERVED_PARAMS = {'table', 'limit', 'cursor', 'sort', 'fields', 'full'}
+# Operators that accept a repeated parameter, as IN / NOT IN
+LIST_OPERATORS = {'eq': 'IN', 'ne': 'NOT IN'}
+
+
+class PaginationError(ValueError):
+    """Raised for invalid table, column, sort, filter or cursor input."""
+
+
+def encode_cursor(sort_value, pk_value) -> str:
+    """Encode the last row's sort key as an opaque cursor string."""
+    raw = json.dumps([sort_value, pk_value], separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor: str):
+    """Decode a cursor string back into (sort_value, pk_value)."""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        sort_value, pk_value = json.loads(base64.urlsafe_b64decode(padded))
+        return sort_value, pk_value
+    except Exception:
+        raise PaginationError("Invalid cursor")
+
+
+def describe_table(conn, table: str):
+    """Return (columns, primary_key, seekable_columns) for a pageable table."""
+    if table not in PAGE_TABLES:
+        raise PaginationError(f"Unknown table '{table}'. Choose one of: {', '.join(PAGE_TABLES)}")
+
+    info = conn.execute(f"PRAGMA table_info({table})").fetchall()
+    columns = [col[1] for col in info]
+    pk = next(col[1] for col in info if col[5] == 1)
+
+    # A column is seekable if it is the primary key or leads an index
+    seekable = {pk}
+    for index in conn.execute(f"PRAGMA index_list({table})").fetchall():
+        first = conn.execute(f"PRAGMA index_info({index[1]})").fetchone()
+        if first and first[2]:
+            seekable.add(first[2])
+    return columns, pk, seekable
+
+
+def _filter_values(args, key) -> list:
+    """Every value of a parameter: getlist() of a multi-dict, or a dict value (list or single)."""
+    if hasattr(args, 'getlist'):
+        return args.getlist(key)
+    value = args[key]
+    return list(value) if isinstance(value, (list, tuple)) else [value]
+
+
+def parse_filters(args, columns):
+    """
+    Turn ``column=value`` / ``column__op=value`` pairs into SQL conditions.
+
+    args is a dict or a request's multi-dict of query parameters. A
+    repeated eq / ne filter (``status=completed&status=refunded``) becomes
+    IN / NOT IN; repeating any other operator is rejected rather than
+    keeping one of the values.
+    """
+    conditions, params = [], []
+    for key in args:
+        if key in RESERVED_PARAMS or key.startswith('_'):
+            continue
+        column, _, op = key.partition('__')
+        op = op or 'eq'
+        if column not in columns:
+            raise PaginationError(f"Unknown filter column '{column}'")
+        if op not in FILTER_OPERATORS:
+            raise PaginationError(f"Unknown filter operator '{op}'")
+        values = _filter_values(args, key)
+        if len(values) == 1:
+            conditions.append(f"{column} {FILTER_OPERATORS[op]} ?")
+        elif op in LIST_OPERATORS:
+            conditions.append(f"{column} {LIST_OPERATORS[op]} ({', '.join('?' * len(values))})")
+        else:
+            raise PaginationError(f"Filter '{key}' is repeated; only eq and ne filters take several values")
+        params.extend(values)
+    return conditions, params
+
+
+def fetch_page(conn, table: str, limit: int = DEFAULT_PAGE_SIZE, cursor: str = None,
+               sort: str = None, filters: dict = None, fields=None) -> dict:
+    """
+    Fetch one page of a table using a keyset seek.
+
+    Args:
+        conn: SQLite connection
+        table (str): customers, products or orders
+        limit (int): Rows per page (capped at MAX_PAGE_SIZE)
+        cursor (str): Cursor returned as next_cursor by the previous page
+        sort (str): Column to sort by, prefixed with '-' for descending
+        filters (dict): column / column__op -> value (or a list of values
+            for eq / ne), or the request's query parameters
+        fields (list): Columns to return (all when empty)
+
+    Returns:
+        dict: columns, data, count, next_cursor and has_more
+    """
+    columns, pk, seekable = describe_table(conn, table)
+    limit = max(1, min(int(limit), MAX_PAGE_SIZE))
+
+    if not sort:
+        # Databases without the pagination indexes still page by primary key
+        sort = DEFAULT_SORT[table]
+        if sort.lstrip('-') not in seekable:
+            sort = ('-' if sort.startswith('-') else '') + pk
+    descending = sort.startswith('-')
+    sort_column = sort.lstrip('-')
+    if sort_column not in columns:
+        raise PaginationError(f"Unknown sort column '{sort_column}'")
+    if sort_column not in seekable:
+        raise PaginationError(
+            f"Cannot sort by '{sort_column}': it is not indexed. "
+            f"Sortable columns: {', '.join(sorted(seekable))}")
+
+    fields = [f for f in (fields or []) if f] or columns
+    unknown = [f for f in fields if f not in columns]
+    if unknown:
+        raise PaginationError(f"Unknown field(s): {', '.join(unknown)}")
+    selected = list(dict.fromkeys(fields + [sort_column, pk]))
+
+    conditions, params = parse_filters(filters or {}, columns)
+
+    direction = 'DESC' if descending else 'ASC'
+    comparison = '<' if descending else '>'
+    if cursor:
+        sort_value, pk_value = decode_cursor(cursor)
+        if sort_column == pk:
+            conditions.append(f"{pk} {comparison} ?")
+            params.append(pk_value)
+        else:
+            conditions.append(f"({sort_column}, {pk}) {comparison} (?, ?)")
+            params.extend([sort_value, pk_value])
+
+    order_by = f"{sort_column} {direction}" if sort_column == pk else \
+        f"{sort_column} {direction}, {pk} {direction}"
+    where = f" WHERE {' AND '.join(conditions)}" if conditions else ''
+    sql = f"SELECT {', '.join(selected)} FROM {table}{where} ORDER BY {order_by} LIMIT ?"
+
+    rows = conn.execute(sql, params + [limit + 1]).fetchall()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    next_cursor = None
+    if has_more:
+        last = dict(zip(selected, rows[-1]))
+        next_cursor = encode_cursor(last[sort_column], last[pk])
+
+    positions = [selected.index(f) for f in fields]
+    return {
+        'columns': fields,
+        'data': [{f: row[i] for f, i in zip(fields, positions)} for row in rows],
+        'count': len(rows),
+        'sort': sort,
+        'limit': limit,
+        'next_cursor': next_cursor,
+        'has_more': has_more,
+    }
+
+
+def ensure_indexes(db_path: str = DB_PATH):
+    """Create the pagination indexes on an existing database."""
+    conn = sqlite3.connect(db_path)
+    try:
+        for name, (table, column) in PAGINATION_INDEXES.items():
+            conn.execute(f"CREATE INDEX IF NOT EXISTS {name} ON {table}({column})")
+        conn.execute("ANALYZE")
+        conn.commit()
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    target = sys.argv[1] if len(sys.argv) > 1 else DB_PATH
+    print(f"🔄 Creating pagination indexes on {target}...")
+    ensure_indexes(target)
+    print(f"✅ {len(PAGINATION_INDEXES)} indexes ready")
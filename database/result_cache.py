@@ -0,0 +1,167 @@
+"""
+Query Result Cache
+Caches (headers, rows) for read-only SQL keyed by canonicalized SQL text.
+Every entry is stamped with the database version it was read at, taken
+from ``PRAGMA data_version`` on a dedicated watcher connection plus the
+file change counter in the database header, so any committed write makes
+older entries stale. Memory is bounded by an estimated byte budget with
+LRU eviction.
+"""
+
+import os
+import re
+import sqlite3
+import sys
+import threading
+from collections import OrderedDict
+
+from database.connection_pool import DB_PATH
+
+RESULT_CACHE_ENABLED = os.getenv('RESULT_CACHE_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+RESULT_CACHE_MAX_BYTES = int(os.getenv('RESULT_CACHE_MAX_BYTES', str(64 * 1024 * 1024)))
+
+# Split SQL into quoted literals/identifiers and everything else
+_SQL_TOKENS = re.compile(r"""('(?:[^']|'')*'|"(?:[^"]|"")*"|`[^`]*`|\[[^\]]*\])|([^'"`\[]+)""")
+# Results of these depend on more than the stored data
+_VOLATILE = re.compile(r"\b(random|randomblob|current_date|current_time|current_timestamp)\b|'now'",
+                       re.IGNORECASE)
+_READ_ONLY = re.compile(r"^\s*(select|with|values)\b", re.IGNORECASE)
+
+
+def canonicalize_sql(sql: str) -> str:
+    """
+    Collapse whitespace outside literals and drop trailing semicolons.
+
+    Case is kept because SQLite derives result column names from the
+    SQL text, so ``COUNT(*)`` and ``count(*)`` are different results.
+    """
+    parts = []
+    for quoted, plain in _SQL_TOKENS.findall(sql.strip().rstrip(';').strip()):
+        parts.append(quoted or re.sub(r'\s+', ' ', plain))
+    return ''.join(parts).strip()
+
+
+def is_cacheable(sql: str) -> bool:
+    """Only plain reads whose result depends solely on stored data are cached."""
+    return bool(_READ_ONLY.match(sql)) and not _VOLATILE.search(sql)
+
+
+def estimate_size(headers, rows) -> int:
+    """Rough byte size of a result held in memory."""
+    size = sys.getsizeof(rows) + sum(sys.getsizeof(h) for h in headers)
+    for row in rows:
+        size += sys.getsizeof(row)
+        for value in row:
+            size += sys.getsizeof(value)
+    return size
+
+
+class ResultCache:
+    """Byte-bounded LRU cache of query results, invalidated by data version."""
+
+    def __init__(self, db_path: str = DB_PATH, max_bytes: int = RESULT_CACHE_MAX_BYTES):
+        self.db_path = db_path
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._watcher = None
+        self.hits = 0
+        self.misses = 0
+        self.stale = 0
+        self.evictions = 0
+
+    def _read_change_counter(self) -> int:
+        """Read the 4-byte file change counter at offset 24 of the database header."""
+        try:
+            with open(self.db_path, 'rb') as f:
+                f.seek(24)
+                return int.from_bytes(f.read(4), 'big')
+        except OSError:
+            return -1
+
+    def data_version(self) -> tuple:
+        """
+        Return a token that changes whenever committed data changes.
+
+        ``PRAGMA data_version`` is only comparable on one connection, so a
+        dedicated read-only watcher connection is kept for it.
+        """
+        with self._lock:
+            if self._watcher is None:
+                self._watcher = sqlite3.connect(f"file:{self.db_path}?mode=ro", uri=True,
+                                                check_same_thread=False)
+            version = self._watcher.execute("PRAGMA data_version").fetchone()[0]
+        return version, self._read_change_counter()
+
+    def get(self, sql: str, version: tuple):
+        """Return cached (headers, rows) for SQL at a data version, or None."""
+        key = canonicalize_sql(sql)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            if entry[0] != version:
+                self._drop(key)
+                self.stale += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1], entry[2]
+
+    def put(self, sql: str, version: tuple, headers, rows):
+        """Store a result; results larger than the whole budget are skipped."""
+        size = estimate_size(headers, rows)
+        if size > self.max_bytes:
+            return
+        key = canonicalize_sql(sql)
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = (version, headers, rows, size)
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                oldest = next(iter(self._entries))
+                self._drop(oldest)
+                self.evictions += 1
+
+    def _drop(self, key):
+        entry = self._entries.pop(key)
+        self._bytes -= entry[3]
+
+    def clear(self):
+        """Drop every cached result."""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> dict:
+        """Return hit/miss counters and memory use."""
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'stale': self.stale,
+                'evictions': self.evictions,
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'max_bytes': self.max_bytes,
+            }
+
+
+_caches = {}
+_caches_lock = threading.Lock()
+
+
+def get_result_cache(db_path: str = DB_PATH) -> ResultCache:
+    """Return the shared result cache for a database path."""
+    key = os.path.abspath(db_path)
+    cache = _caches.get(key)
+    if cache is None:
+        with _caches_lock:
+            cache = _caches.get(key)
+            if cache is None:
+                cache = _caches[key] = ResultCache(db_path)
+    return cache
@@ -0,0 +1,265 @@
+"""
+Summary Tables
+Rollup tables that keep /api/stats answerable with two tiny lookups.
+SQLite triggers on customers, products and orders keep them current on
+every insert, update and delete.
+
+Run ``python -m database.summary_tables [db_path]`` to install (or
+rebuild) the rollups on a database created by data/setup_database.py.
+"""
+
+import sqlite3
+import sys
+
+from database.connection_pool import DB_PATH
+
+SUMMARY_SCHEMA = """
+CREATE TABLE IF NOT EXISTS stats_totals (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    customers INTEGER NOT NULL DEFAULT 0,
+    products INTEGER NOT NULL DEFAULT 0,
+    orders INTEGER NOT NULL DEFAULT 0,
+    completed_revenue REAL NOT NULL DEFAULT 0
+);
+
+CREATE TABLE IF NOT EXISTS stats_customer_type (
+    customer_type TEXT PRIMARY KEY,
+    customers INTEGER NOT NULL DEFAULT 0,
+    completed_orders INTEGER NOT NULL DEFAULT 0,
+    revenue REAL NOT NULL DEFAULT 0
+);
+
+-- Customers ---------------------------------------------------------------
+
+CREATE TRIGGER IF NOT EXISTS trg_stats_customers_insert AFTER INSERT ON customers
+BEGIN
+    UPDATE stats_totals SET customers = customers + 1 WHERE id = 1;
+    INSERT OR IGNORE INTO stats_customer_type (customer_type) VALUES (NEW.customer_type);
+    UPDATE stats_customer_type
+       SET customers = customers + 1,
+           completed_orders = completed_orders + (
+               SELECT COUNT(*) FROM orders
+                WHERE customer_id = NEW.customer_id AND status = 'completed'),
+           revenue = revenue + (
+               SELECT COALESCE(SUM(price * quantity), 0) FROM orders
+                WHERE customer_id = NEW.customer_id AND status = 'completed')
+     WHERE customer_type = NEW.customer_type;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_stats_customers_delete AFTER DELETE ON customers
+BEGIN
+    UPDATE stats_totals SET customers = customers - 1 WHERE id = 1;
+    UPDATE stats_customer_type
+       SET customers = customers - 1,
+           completed_orders = completed_orders - (
+               SELECT COUNT(*) FROM orders
+                WHERE customer_id = OLD.customer_id AND status = 'completed'),
+           revenue = revenue - (
+               SELECT COALESCE(SUM(price * quantity), 0) FROM orders
+                WHERE customer_id = OLD.customer_id AND status = 'completed')
+     WHERE customer_type = OLD.customer_type;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_stats_customers_update
+AFTER UPDATE OF customer_id, customer_type ON customers
+BEGIN
+    UPDATE stats_customer_type
+       SET customers = customers - 1,
+           completed_orders = completed_orders - (
+               SELECT COUNT(*) FROM orders
+                WHERE customer_id = OLD.customer_id AND status = 'completed'),
+           revenue = revenue - (
+               SELECT COALESCE(SUM(price * quantity), 0) FROM orders
+                WHERE customer_id = OLD.customer_id AND status = 'completed')
+     WHERE customer_type = OLD.customer_type;
+    INSERT OR IGNORE INTO stats_customer_type (customer_type) VALUES (NEW.customer_type);
+    UPDATE stats_customer_type
+       SET customers = customers + 1,
+           completed_orders = completed_orders + (
+               SELECT COUNT(*) FROM orders
+                WHERE customer_id = NEW.customer_id AND status = 'completed'),
+           revenue = revenue + (
+               SELECT COALESCE(SUM(price * quantity), 0) FROM orders
+                WHERE customer_id = NEW.customer_id AND status = 'completed')
+     WHERE customer_type = NEW.customer_type;
+END;
+
+-- Products ----------------------------------------------------------------
+
+CREATE TRIGGER IF NOT EXISTS trg_stats_products_insert AFTER INSERT ON products
+BEGIN
+    UPDATE stats_totals SET products = products + 1 WHERE id = 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_stats_products_delete AFTER DELETE ON products
+BEGIN
+    UPDATE stats_totals SET products = products - 1 WHERE id = 1;
+END;
+
+-- Orders ------------------------------------------------------------------
+
+CREATE TRIGGER IF NOT EXISTS trg_stats_orders_insert AFTER INSERT ON orders
+BEGIN
+    UPDATE stats_totals
+       SET orders = orders + 1,
+           completed_revenue = completed_revenue +
+               CASE WHEN NEW.status = 'completed' THEN NEW.price * NEW.quantity ELSE 0 END
+     WHERE id = 1;
+    UPDATE stats_customer_type
+       SET completed_orders = completed_orders + 1,
+           revenue = revenue + NEW.price * NEW.quantity
+     WHERE NEW.status = 'completed'
+       AND customer_type = (SELECT customer_type FROM customers
+                             WHERE customer_id = NEW.customer_id);
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_stats_orders_delete AFTER DELETE ON orders
+BEGIN
+    UPDATE stats_totals
+       SET orders = orders - 1,
+           completed_revenue = completed_revenue -
+               CASE WHEN OLD.status = 'completed' THEN OLD.price * OLD.quantity ELSE 0 END
+     WHERE id = 1;
+    UPDATE stats_customer_type
+       SET completed_orders = completed_orders - 1,
+           revenue = revenue - OLD.price * OLD.quantity
+     WHERE OLD.status = 'completed'
+       AND customer_type = (SELECT customer_type FROM customers
+                             WHERE customer_id = OLD.customer_id);
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_stats_orders_update
+AFTER UPDATE OF customer_id, quantity, price, status ON orders
+BEGIN
+    UPDATE stats_totals
+       SET completed_revenue = completed_revenue
+           - CASE WHEN OLD.status = 'completed' THEN OLD.price * OLD.quantity ELSE 0 END
+           + CASE WHEN NEW.status = 'completed' THEN NEW.price * NEW.quantity ELSE 0 END
+     WHERE id = 1;
+    UPDATE stats_customer_type
+       SET completed_orders = completed_orders - 1,
+           revenue = revenue - OLD.price * OLD.quantity
+     WHERE OLD.status = 'completed'
+       AND customer_type = (SELECT customer_type FROM customers
+                             WHERE customer_id = OLD.customer_id);
+    UPDATE stats_customer_type
+       SET completed_orders = completed_orders + 1,
+           revenue = revenue + NEW.price * NEW.quantity
+     WHERE NEW.status = 'completed'
+       AND customer_type = (SELECT customer_type FROM customers
+                             WHERE customer_id = NEW.customer_id);
+END;
+"""
+
+# Full-scan aggregates; used to (re)build the rollups and as the fallback
+# when the rollups are not installed
+TOTALS_SQL = """
+SELECT (SELECT COUNT(*) FROM customers),
+       (SELECT COUNT(*) FROM products),
+       (SELECT COUNT(*) FROM orders),
+       (SELECT COALESCE(SUM(price * quantity), 0) FROM orders WHERE status = 'completed')
+"""
+
+CUSTOMER_TYPE_SQL = """
+SELECT c.customer_type,
+       COUNT(*),
+       COALESCE(SUM(o.completed_orders), 0),
+       COALESCE(SUM(o.revenue), 0)
+  FROM customers c
+  LEFT JOIN (SELECT customer_id,
+                    COUNT(*) AS completed_orders,
+                    SUM(price * quantity) AS revenue
+               FROM orders
+              WHERE status = 'completed'
+              GROUP BY customer_id) o ON o.customer_id = c.customer_id
+ GROUP BY c.customer_type
+ ORDER BY c.customer_type
+"""
+
+REBUILD_SQL = f"""
+DELETE FROM stats_totals;
+INSERT INTO stats_totals (id, customers, products, orders, completed_revenue)
+SELECT 1, * FROM ({TOTALS_SQL});
+
+DELETE FROM stats_customer_type;
+INSERT INTO stats_customer_type (customer_type, customers, completed_orders, revenue)
+{CUSTOMER_TYPE_SQL};
+"""
+
+
+def has_summary_tables(conn) -> bool:
+    """Return True if the rollup tables are installed."""
+    return conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'stats_totals'"
+    ).fetchone() is not None
+
+
+def rebuild_summary_tables(db_path: str = DB_PATH):
+    """Install the rollup tables and triggers, then recompute them from scratch."""
+    conn = sqlite3.connect(db_path)
+    try:
+        conn.executescript("BEGIN IMMEDIATE;" + SUMMARY_SCHEMA + REBUILD_SQL + "COMMIT;")
+    except Exception:
+        if conn.in_transaction:
+            conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+
+def drop_summary_tables(db_path: str = DB_PATH):
+    """Remove the rollup tables and their triggers."""
+    conn = sqlite3.connect(db_path)
+    try:
+        triggers = [row[0] for row in conn.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'trigger' AND name LIKE 'trg_stats_%'")]
+        for name in triggers:
+            conn.execute(f"DROP TRIGGER IF EXISTS {name}")
+        conn.execute("DROP TABLE IF EXISTS stats_totals")
+        conn.execute("DROP TABLE IF EXISTS stats_customer_type")
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def read_stats(conn) -> dict:
+    """
+    Return /api/stats figures.
+
+    Reads the rollup tables when they are installed, otherwise falls back
+    to aggregating the base tables.
+    """
+    if has_summary_tables(conn):
+        totals = conn.execute(
+            "SELECT customers, products, orders, completed_revenue FROM stats_totals WHERE id = 1"
+        ).fetchone()
+        breakdown = conn.execute(
+            "SELECT customer_type, customers, completed_orders, revenue "
+            "FROM stats_customer_type WHERE customers > 0 ORDER BY customer_type"
+        ).fetchall()
+    else:
+        totals = conn.execute(TOTALS_SQL).fetchone()
+        breakdown = conn.execute(CUSTOMER_TYPE_SQL).fetchall()
+
+    customers, products, orders, revenue = totals
+    return {
+        'customers': customers,
+        'products': products,
+        'orders': orders,
+        'total_revenue': round(revenue, 2),
+        'customer_breakdown': [
+            {
+                'type': row[0],
+                'count': row[1],
+                'orders': row[2],
+                'revenue': round(row[3], 2)
+            } for row in breakdown
+        ]
+    }
+
+
+if __name__ == "__main__":
+    target = sys.argv[1] if len(sys.argv) > 1 else DB_PATH
+    print(f"🔄 Rebuilding summary tables on {target}...")
+    rebuild_summary_tables(target)
+    print("✅ Summary tables and triggers are up to date")
@@ -0,0 +1,137 @@
+"""
+HTML Table Renderer
+Renders query results as the Tailwind-styled table shown in the web UI.
+Column formatters are chosen once from a sample of rows instead of type
+checking every cell, each chunk of rows is formatted a column at a time
+and joined rather than appended to one growing string, and every value
+and header is HTML-escaped.
+
+iter_html_table() yields the table in chunks so it can feed a streaming
+response; render_html_table() joins them into one string.
+"""
+
+from html import escape
+from operator import itemgetter
+
+# Rows inspected to pick each column's formatter
+FORMAT_SAMPLE_ROWS = 20
+# Rows per chunk yielded by iter_html_table
+HTML_CHUNK_ROWS = 500
+
+TABLE_OPEN = ('<div class="overflow-x-auto">'
+              '<table class="min-w-full divide-y divide-gray-200">'
+              '<thead class="bg-gray-50"><tr>')
+TH = '<th class="px-6 py-3 text-left text-xs font-medium text-gray-500 uppercase tracking-wider">'
+BODY_OPEN = '</tr></thead><tbody class="bg-white divide-y divide-gray-200">'
+TD = '<td class="px-6 py-4 whitespace-nowrap text-sm text-gray-900">'
+TABLE_CLOSE = '</tbody></table></div>'
+NO_RESULTS = "<div class='text-gray-500 text-center py-8'>No results found</div>"
+
+_ROW_OPEN = '<tr>' + TD
+_CELL_SEP = '</td>' + TD
+_ROW_CLOSE = '</td></tr>'
+_ROW_SEP = _ROW_CLOSE + _ROW_OPEN
+
+
+def format_cell(cell) -> str:
+    """Format any value: floats to 2 places ($ and separators above 1000),
+    ints above 1000 with separators, everything else as escaped text."""
+    if isinstance(cell, float):
+        return f"${cell:,.2f}" if cell > 1000 else f"{cell:.2f}"
+    if isinstance(cell, int) and cell > 1000:
+        return f"{cell:,}"
+    return escape(str(cell))
+
+
+def _format_float_column(values) -> list:
+    return [(f"${v:,.2f}" if v > 1000 else f"{v:.2f}") if type(v) is float else format_cell(v)
+            for v in values]
+
+
+def _format_int_column(values) -> list:
+    return [(f"{v:,}" if v > 1000 else str(v)) if type(v) is int else format_cell(v)
+            for v in values]
+
+
+def _format_text_column(values) -> list:
+    # Escape the whole column in one call: join on a character HTML
+    # escaping never produces, escape, and split back apart
+    try:
+        joined = '\x00'.join(values)
+    except TypeError:  # not all strings
+        return _format_any_column(values)
+    if joined.count('\x00') != len(values) - 1:  # a value contains the separator
+        return _format_any_column(values)
+    return escape(joined).split('\x00')
+
+
+def _format_any_column(values) -> list:
+    return [format_cell(v) for v in values]
+
+
+_COLUMN_FORMATTERS = {float: _format_float_column, int: _format_int_column, str: _format_text_column}
+
+
+def column_formatters(rows, width: int, sample: int = FORMAT_SAMPLE_ROWS) -> list:
+    """
+    Pick a column formatter per column from the type of its first
+    non-NULL value in the sample. Each formats a whole column of values,
+    with a fast path for that type and format_cell for anything else, so
+    mixed columns stay correct.
+    """
+    formatters = [None] * width
+    for row in rows[:sample]:
+        for i, cell in enumerate(row):
+            if formatters[i] is None and cell is not None:
+                formatters[i] = _COLUMN_FORMATTERS.get(type(cell), _format_any_column)
+        if all(formatters):
+            break
+    return [formatter or _format_any_column for formatter in formatters]
+
+
+def table_rows(data) -> tuple:
+    """
+    Split results into headers and row sequences.
+
+    Args:
+        data (list): Dicts keyed by column, or tuples / lists
+
+    Returns:
+        tuple: (headers, rows)
+    """
+    if isinstance(data[0], dict):
+        headers = list(data[0].keys())
+        if len(headers) == 1:
+            key = headers[0]
+            return headers, [(row[key],) for row in data]
+        getter = itemgetter(*headers)
+        return headers, [getter(row) for row in data]
+    return [f"Column_{i+1}" for i in range(len(data[0]))], data
+
+
+def iter_html_table(data, chunk_rows: int = HTML_CHUNK_ROWS, headers=None):
+    """Yield the HTML table for results in chunks of about chunk_rows rows.
+
+    Pass headers when data is row tuples, to label the columns.
+    """
+    if not data:
+        yield NO_RESULTS
+        return
+
+    if headers is None:
+        headers, rows = table_rows(data)
+    else:
+        rows = data
+    formatters = column_formatters(rows, len(headers))
+
+    yield TABLE_OPEN + ''.join(f'{TH}{escape(str(header))}</th>' for header in headers) + BODY_OPEN
+    for start in range(0, len(rows), chunk_rows):
+        columns = zip(*rows[start:start + chunk_rows])
+        cells = [fmt(values) for fmt, values in zip(formatters, columns)]
+        yield _ROW_OPEN + _ROW_SEP.join(map(_CELL_SEP.join, zip(*cells))) + _ROW_CLOSE
+    yield TABLE_CLOSE
+
+
+def render_html_table(data, headers=None) -> str:
+    """Render the whole HTML table as one string."""
+    return ''.join(iter_html_table(data, headers=headers))
@@ -0,0 +1,261 @@
+"""
+HTTP Caching and Compression
+Shared by the Flask and Starlette servers:
+
+- StaticAsset keeps a page in memory with its compressed variants and
+  validators, re-reading it only when the file changes on disk.
+- Responses above COMPRESS_MIN_BYTES are gzip (or brotli, when the
+  ``brotli`` package is installed) encoded for clients that accept it.
+- data_validators() derives an ETag and Last-Modified for data endpoints
+  from the database version, so polling clients revalidate and get a 304
+  without the payload being rebuilt.
+"""
+
+import gzip
+import hashlib
+import os
+import threading
+import time
+import uuid
+from email.utils import formatdate, parsedate_to_datetime
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+from database.result_cache import get_result_cache
+
+COMPRESS_MIN_BYTES = int(os.getenv('COMPRESS_MIN_BYTES', '1024'))
+COMPRESS_LEVEL = int(os.getenv('COMPRESS_LEVEL', '6'))
+# Brotli quality for per-request compression; static assets use the maximum
+BROTLI_QUALITY = int(os.getenv('BROTLI_QUALITY', '5'))
+# Seconds between checks of a static file's mtime (0 checks on every request)
+STATIC_RELOAD_SECONDS = float(os.getenv('STATIC_RELOAD_SECONDS', '1'))
+
+COMPRESSIBLE_TYPES = ('text/', 'application/json', 'application/javascript', 'image/svg+xml')
+
+# data_version is a per-connection counter, so ETags built from it are only
+# meaningful within one process; the boot id keeps a restarted server from
+# reusing an old ETag for different data
+_BOOT_ID = uuid.uuid4().hex[:8]
+
+
+def available_encodings() -> tuple:
+    """Content codings this server can produce, most preferred first."""
+    return ('br', 'gzip') if brotli is not None else ('gzip',)
+
+
+def choose_encoding(accept_encoding: str):
+    """
+    Pick a content coding from an Accept-Encoding header.
+
+    Returns:
+        str: 'br' or 'gzip', or None to send the body unencoded
+    """
+    if not accept_encoding:
+        return None
+    accepted = {}
+    for part in accept_encoding.lower().split(','):
+        name, _, params = part.strip().partition(';')
+        q = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        accepted[name.strip()] = q
+    for encoding in available_encodings():
+        if accepted.get(encoding, accepted.get('*', 0)) > 0:
+            return encoding
+    return None
+
+
+def compress(body: bytes, encoding: str, level: int = None) -> bytes:
+    """Encode a body with gzip or brotli (level defaults to the per-request setting)."""
+    if encoding == 'br':
+        return brotli.compress(body, quality=BROTLI_QUALITY if level is None else level)
+    return gzip.compress(body, compresslevel=COMPRESS_LEVEL if level is None else level, mtime=0)
+
+
+def is_compressible(content_type: str) -> bool:
+    return bool(content_type) and content_type.startswith(COMPRESSIBLE_TYPES)
+
+
+def negotiate(body: bytes, content_type: str, accept_encoding: str):
+    """
+    Decide how to encode a complete response body.
+
+    Returns:
+        tuple: (body, encoding) where encoding is None if sent as is
+    """
+    if len(body) < COMPRESS_MIN_BYTES or not is_compressible(content_type):
+        return body, None
+    encoding = choose_encoding(accept_encoding)
+    if encoding is None:
+        return body, None
+    return compress(body, encoding), encoding
+
+
+def http_date(timestamp: float) -> str:
+    return formatdate(timestamp, usegmt=True)
+
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    """Weak comparison of an If-None-Match header against an ETag."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == '*':
+        return True
+    opaque = etag[2:] if etag.startswith('W/') else etag
+    for candidate in if_none_match.split(','):
+        candidate = candidate.strip()
+        if candidate.startswith('W/'):
+            candidate = candidate[2:]
+        if candidate == opaque:
+            return True
+    return False
+
+
+def is_not_modified(headers, etag: str, last_modified: str) -> bool:
+    """
+    True if a conditional GET can be answered with 304.
+
+    If-None-Match takes precedence; If-Modified-Since is only consulted
+    when the client sent no ETag.
+    """
+    if_none_match = headers.get('If-None-Match')
+    if if_none_match:
+        return etag_matches(if_none_match, etag)
+    if_modified_since = headers.get('If-Modified-Since')
+    if if_modified_since and last_modified:
+        try:
+            return parsedate_to_datetime(last_modified) <= parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+    return False
+
+
+def database_mtime(db_path: str) -> float:
+    """Latest modification time of the database file and its WAL."""
+    mtime = 0.0
+    for path in (db_path, db_path + '-wal'):
+        try:
+            mtime = max(mtime, os.stat(path).st_mtime)
+        except OSError:
+            pass
+    return mtime or time.time()
+
+
+def data_validators(db_path: str, resource: str):
+    """
+    ETag and Last-Modified for a data endpoint.
+
+    The ETag changes whenever committed data changes (the same data
+    version the result cache is keyed on) and differs per resource, i.e.
+    per path and query string.
+
+    Returns:
+        tuple: (etag, last_modified), or None if the version can't be read
+    """
+    try:
+        version = get_result_cache(db_path).data_version()
+    except Exception:
+        return None
+    digest = hashlib.blake2b(f"{_BOOT_ID}:{version}:{resource}".encode('utf-8'),
+                             digest_size=12).hexdigest()
+    return f'W/"{digest}"', http_date(database_mtime(db_path))
+
+
+def validator_headers(etag: str, last_modified: str) -> dict:
+    """Headers that let clients revalidate a data response instead of refetching it."""
+    return {'ETag': etag, 'Last-Modified': last_modified, 'Cache-Control': 'no-cache'}
+
+
+class _AssetVersion:
+    """One loaded version of a static file and its compressed variants"""
+
+    def __init__(self, path: str, mtime_ns: int, body: bytes, content_type: str):
+        self.path = path
+        self.mtime_ns = mtime_ns
+        self.body = body
+        self.content_type = content_type
+        self.etag = '"' + hashlib.blake2b(body, digest_size=12).hexdigest() + '"'
+        self.last_modified = http_date(mtime_ns / 1e9)
+        self._variants = {}
+
+    @property
+    def text(self) -> str:
+        return self.body.decode('utf-8')
+
+    def encoded(self, accept_encoding: str):
+        """
+        The body to send for an Accept-Encoding header.
+
+        Returns:
+            tuple: (body, encoding) where encoding is None if sent as is
+        """
+        if len(self.body) < COMPRESS_MIN_BYTES:
+            return self.body, None
+        encoding = choose_encoding(accept_encoding)
+        if encoding is None:
+            return self.body, None
+        body = self._variants.get(encoding)
+        if body is None:
+            body = self._variants[encoding] = compress(self.body, encoding, 11 if encoding == 'br' else 9)
+        return body, encoding
+
+    def headers(self, encoding=None) -> dict:
+        """Validator and caching headers for a response carrying this version."""
+        headers = {
+            'ETag': self.etag,
+            'Last-Modified': self.last_modified,
+            'Cache-Control': 'no-cache',
+            'Vary': 'Accept-Encoding',
+        }
+        if encoding:
+            headers['Content-Encoding'] = encoding
+        return headers
+
+
+class StaticAsset:
+    """
+    A file served from memory.
+
+    The first existing path is loaded; the file is re-read when its mtime
+    changes (checked at most every STATIC_RELOAD_SECONDS). Compressed
+    variants are built once per version, at the highest level.
+    """
+
+    def __init__(self, *paths, content_type: str = 'text/html; charset=utf-8',
+                 reload_seconds: float = STATIC_RELOAD_SECONDS):
+        self.paths = paths
+        self.content_type = content_type
+        self.reload_seconds = reload_seconds
+        self._lock = threading.Lock()
+        self._checked = 0.0
+        self._version = None
+
+    def _stat(self):
+        for path in self.paths:
+            try:
+                return path, os.stat(path).st_mtime_ns
+            except OSError:
+                continue
+        raise FileNotFoundError(f"None of {', '.join(self.paths)} exist")
+
+    def current(self) -> _AssetVersion:
+        """Return the loaded version, re-reading the file first if it changed."""
+        version = self._version
+        if version is not None and time.monotonic() - self._checked < self.reload_seconds:
+            return version
+        with self._lock:
+            now = time.monotonic()
+            if self._version is None or now - self._checked >= self.reload_seconds:
+                path, mtime_ns = self._stat()
+                if self._version is None or (path, mtime_ns) != (self._version.path, self._version.mtime_ns):
+                    with open(path, 'rb') as f:
+                        self._version = _AssetVersion(path, mtime_ns, f.read(), self.content_type)
+                self._checked = now
+            return self._version
@@ -0,0 +1,424 @@
+"""
+LLM Backends and Hedged Requests
+A backend is one provider and model behind an OpenAI-compatible
+chat-completions endpoint: Groq, OpenAI, or a local stand-in such as
+llama.cpp, Ollama, vLLM or the benchmark mock. LLM_BACKENDS lists them in
+order of preference as ``provider:model`` pairs, e.g.
+
+    LLM_BACKENDS=groq:llama-3.3-70b-versatile,groq:llama-3.1-8b-instant
+
+Every question goes to the first backend. If it has not answered within
+the hedge delay (its HEDGE_PERCENTILE latency over recent calls, clamped
+to HEDGE_MIN_DELAY..HEDGE_MAX_DELAY), the question is also sent to the
+next backend, and so on. A failed or invalid answer moves on to the
+next backend at once. The first valid SQL wins and the other requests
+are cancelled: their streams are closed, or their tasks cancelled on
+the async path. Because hedging starts at the tail of the primary's
+latency, only about (100 - HEDGE_PERCENTILE)% of questions cost a second
+request.
+
+With a single backend (the default) there is no hedging and no thread
+hop: questions go straight to it.
+
+Each backend calls through a BackendGuard (llm.resilience) that paces it
+to its provider's quota and retries throttled or failed calls. A backend
+whose circuit is open fails at once, so the next backend takes over
+without waiting for the hedge delay.
+"""
+
+import asyncio
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, CancelledError, ThreadPoolExecutor, wait
+
+from llm.llm_interface import (
+    GROQ_API_URL,
+    GROQ_MODEL,
+    GROQ_POOL_SIZE,
+    GROQ_RPM_LIMIT,
+    GROQ_TPM_LIMIT,
+    AsyncGroqClient,
+    GroqClient,
+)
+from llm.prompt_builder import DEFAULT_DB_PATH, build_prompt
+from llm.resilience import BackendGuard, BackendUnavailable, get_guard
+
+# provider -> (chat-completions URL, environment variable holding the API key,
+#              requests per minute, tokens per minute; 0 = no limit)
+PROVIDERS = {
+    'groq': (GROQ_API_URL, 'GROQ_API_KEY', GROQ_RPM_LIMIT, GROQ_TPM_LIMIT),
+    'openai': (os.getenv('OPENAI_API_URL', 'https://api.openai.com/v1/chat/completions'), 'OPENAI_API_KEY',
+               float(os.getenv('OPENAI_RPM_LIMIT', '0')), float(os.getenv('OPENAI_TPM_LIMIT', '0'))),
+    'local': (os.getenv('LOCAL_LLM_URL', 'http://127.0.0.1:8080/v1/chat/completions'), None, 0, 0),
+}
+
+LLM_BACKENDS = os.getenv('LLM_BACKENDS', f'groq:{GROQ_MODEL}')
+HEDGE_PERCENTILE = float(os.getenv('HEDGE_PERCENTILE', '95'))
+HEDGE_MIN_DELAY = float(os.getenv('HEDGE_MIN_DELAY', '0.05'))
+# Also the delay used until a backend has HEDGE_MIN_SAMPLES latencies
+HEDGE_MAX_DELAY = float(os.getenv('HEDGE_MAX_DELAY', '2.0'))
+HEDGE_MIN_SAMPLES = 20
+# Recent latencies kept per backend
+LATENCY_WINDOW = int(os.getenv('LLM_LATENCY_WINDOW', '200'))
+# Threads running hedged calls for the synchronous client
+HEDGE_WORKERS = int(os.getenv('HEDGE_WORKERS', '32'))
+
+
+_READ_STATEMENT = re.compile(r'\s*\(*\s*(SELECT|WITH)\b', re.I)
+
+
+def is_valid_sql(sql: str) -> bool:
+    """True for one complete read-only statement (SELECT or WITH)."""
+    return bool(sql and _READ_STATEMENT.match(sql)
+                and sqlite3.complete_statement(sql.rstrip().rstrip(';') + ';'))
+
+
+class LatencyTracker:
+    """Recent call latencies and outcome counters for one backend."""
+
+    def __init__(self, window: int = LATENCY_WINDOW):
+        self._samples = deque(maxlen=window)
+        self._lock = threading.Lock()
+        # rejected: failed fast by the backend's circuit breaker or rate limiter
+        self.counts = {'ok': 0, 'error': 0, 'invalid': 0, 'cancelled': 0, 'rejected': 0}
+
+    def record(self, seconds: float, outcome: str = 'ok'):
+        """
+        Record a finished call.
+
+        Cancelled calls are recorded at the time they were cut off. That is
+        a lower bound on their latency, but leaving them out would hide the
+        slow tail that triggered the hedge and shrink the delay.
+        """
+        with self._lock:
+            self.counts[outcome] += 1
+            if outcome in ('ok', 'cancelled'):
+                self._samples.append(seconds)
+
+    def percentile(self, p: float):
+        """The p-th percentile latency in seconds, or None without samples."""
+        with self._lock:
+            samples = sorted(self._samples)
+        if not samples:
+            return None
+        return samples[min(len(samples) - 1, int(len(samples) * p / 100))]
+
+    def __len__(self):
+        with self._lock:
+            return len(self._samples)
+
+
+class Backend:
+    """
+    One provider and model.
+
+    The sync client is created on first use and shared across threads;
+    async clients are created per event loop by AsyncHedgedClient.
+    Subclasses can override get_sql / get_sql_async for providers that
+    are not OpenAI-compatible.
+
+    Without a ``guard`` the backend gets its own, with retries and a
+    circuit breaker but no rate limit.
+    """
+
+    def __init__(self, name: str, url: str, model: str, api_key=None, guard: BackendGuard = None):
+        self.name = name
+        self.url = url
+        self.model = model
+        self.api_key = api_key
+        self.guard = guard or BackendGuard(name)
+        self.latency = LatencyTracker()
+        self.hedged = 0  # requests sent to this backend as a hedge
+        self.wins = 0    # questions this backend answered first
+        self._client = None
+        self._lock = threading.Lock()
+
+    def client(self) -> GroqClient:
+        if self._client is None:
+            with self._lock:
+                if self._client is None:
+                    self._client = GroqClient(self.api_key, self.model, self.url, guard=self.guard)
+        return self._client
+
+    def async_client(self, pool_size: int = GROQ_POOL_SIZE) -> AsyncGroqClient:
+        return AsyncGroqClient(self.api_key, self.model, self.url, pool_size, guard=self.guard)
+
+    def get_sql(self, prompt: str, cancel: threading.Event = None) -> str:
+        return self.client().get_sql(None, prompt=prompt, cancel=cancel)
+
+    async def get_sql_async(self, client: AsyncGroqClient, prompt: str) -> str:
+        return await client.get_sql(None, prompt=prompt)
+
+    def hedge_delay(self, percentile: float = HEDGE_PERCENTILE) -> float:
+        """Seconds to wait on this backend before asking the next one too."""
+        if len(self.latency) < HEDGE_MIN_SAMPLES:
+            return HEDGE_MAX_DELAY
+        return min(HEDGE_MAX_DELAY, max(HEDGE_MIN_DELAY, self.latency.percentile(percentile)))
+
+    def count(self, hedged: bool = False, won: bool = False):
+        with self._lock:
+            self.hedged += hedged
+            self.wins += won
+
+    def stats(self) -> dict:
+        latency = {f'p{p}_ms': round(value * 1000, 1) if value is not None else None
+                   for p, value in ((p, self.latency.percentile(p)) for p in (50, 95, 99))}
+        return {
+            'name': self.name,
+            'model': self.model,
+            **self.latency.counts,
+            'hedged': self.hedged,
+            'wins': self.wins,
+            **latency,
+            'hedge_delay_ms': round(self.hedge_delay() * 1000, 1),
+            **self.guard.stats(),
+        }
+
+    def close(self):
+        if self._client is not None:
+            self._client.close()
+
+
+def parse_backends(spec: str = LLM_BACKENDS) -> list:
+    """
+    Build backends from a comma-separated ``provider:model`` list.
+
+    Raises:
+        ValueError: For an unknown provider or a missing API key
+    """
+    backends = []
+    for item in filter(None, (part.strip() for part in spec.split(','))):
+        provider, _, model = item.partition(':')
+        if provider not in PROVIDERS or not model:
+            raise ValueError(f"LLM backend {item!r} must be provider:model with provider one of: "
+                             f"{', '.join(PROVIDERS)}")
+        url, key_env, rpm, tpm = PROVIDERS[provider]
+        if key_env is None:
+            api_key = provider  # local servers ignore the Authorization header
+        elif provider == 'groq':
+            api_key = None  # GroqClient reads GROQ_API_KEY when it sends
+        else:
+            api_key = os.getenv(key_env)
+            if not api_key:
+                raise ValueError(f"LLM backend {item!r} needs {key_env} to be set")
+        # Shared with get_sql_from_query's client for the same model
+        backends.append(Backend(item, url, model, api_key, get_guard(item, rpm, tpm)))
+    if not backends:
+        raise ValueError("LLM_BACKENDS lists no backends")
+    return backends
+
+
+class _Hedging:
+    """Outcome bookkeeping shared by the sync and async clients."""
+
+    def __init__(self, backends):
+        self.backends = backends
+        self.model = backends[0].model
+
+    @staticmethod
+    def _finish(backend: Backend, start: float, sql: str, validate: bool) -> str:
+        # A lone backend's answer goes to the query guardrails as before;
+        # validating only decides between backends
+        elapsed = time.perf_counter() - start
+        if validate and not is_valid_sql(sql):
+            backend.latency.record(elapsed, 'invalid')
+            raise Exception(f"{backend.name} returned invalid SQL: {sql[:80]!r}")
+        backend.latency.record(elapsed)
+        return sql
+
+    @staticmethod
+    def _all_failed(errors: list):
+        return Exception("All LLM backends failed: " + '; '.join(errors))
+
+
+class HedgedClient(_Hedging):
+    """
+    Thread-safe client that hedges each question across the backends.
+
+    Calls run on a shared thread pool so the caller can wait on the
+    primary with a timeout; losers are cancelled through a threading.Event
+    that closes their stream.
+    """
+
+    def __init__(self, backends=None, workers: int = HEDGE_WORKERS):
+        super().__init__(backends or get_backends())
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='llm-hedge')
+
+    def _call(self, backend: Backend, prompt: str, cancel: threading.Event = None,
+              validate: bool = True) -> str:
+        start = time.perf_counter()
+        try:
+            sql = backend.get_sql(prompt, cancel)
+        except Exception as e:
+            if cancel is None or not cancel.is_set():
+                backend.latency.record(time.perf_counter() - start,
+                                       'rejected' if isinstance(e, BackendUnavailable) else 'error')
+                raise
+            sql = None
+        if cancel is not None and cancel.is_set():
+            backend.latency.record(time.perf_counter() - start, 'cancelled')
+            raise CancelledError()
+        return self._finish(backend, start, sql, validate)
+
+    def get_sql(self, user_query: str, db_path: str = DEFAULT_DB_PATH, prompt: str = None) -> str:
+        """
+        Convert a question into SQL with the first backend to answer validly.
+
+        Raises:
+            Exception: If every backend failed
+        """
+        prompt = prompt or build_prompt(user_query, db_path)
+        if len(self.backends) == 1:
+            sql = self._call(self.backends[0], prompt, validate=False)
+            self.backends[0].count(won=True)
+            return sql
+
+        cancel = threading.Event()
+        remaining = list(self.backends)
+        pending, errors = {}, []
+
+        def launch():
+            backend = remaining.pop(0)
+            backend.count(hedged=bool(pending))
+            pending[self.executor.submit(self._call, backend, prompt, cancel)] = backend
+            return backend
+
+        last = launch()
+        try:
+            while pending:
+                done, _ = wait(pending, timeout=last.hedge_delay() if remaining else None,
+                               return_when=FIRST_COMPLETED)
+                if not done:
+                    last = launch()  # the tail: hedge to the next backend
+                    continue
+                for future in done:
+                    backend = pending.pop(future)
+                    try:
+                        sql = future.result()
+                    except Exception as e:
+                        errors.append(f"{backend.name}: {e}")
+                        continue
+                    backend.count(won=True)
+                    return sql
+                if remaining:
+                    last = launch()  # failed: don't wait for the hedge delay
+            raise self._all_failed(errors)
+        finally:
+            cancel.set()
+
+    def close(self):
+        self.executor.shutdown(wait=False)
+        for backend in self.backends:
+            backend.close()
+
+
+class AsyncHedgedClient(_Hedging):
+    """
+    asyncio counterpart of HedgedClient; a drop-in for AsyncGroqClient.
+
+    Each backend gets its own AsyncGroqClient on this loop. Losing
+    requests are cancelled, which closes their connection.
+    """
+
+    def __init__(self, backends=None, pool_size: int = GROQ_POOL_SIZE):
+        super().__init__(backends or get_backends())
+        self.clients = [backend.async_client(pool_size) for backend in self.backends]
+
+    async def _call(self, index: int, prompt: str, validate: bool = True) -> str:
+        backend = self.backends[index]
+        start = time.perf_counter()
+        try:
+            sql = await backend.get_sql_async(self.clients[index], prompt)
+        except asyncio.CancelledError:
+            backend.latency.record(time.perf_counter() - start, 'cancelled')
+            raise
+        except Exception as e:
+            backend.latency.record(time.perf_counter() - start,
+                                   'rejected' if isinstance(e, BackendUnavailable) else 'error')
+            raise
+        return self._finish(backend, start, sql, validate)
+
+    async def get_sql(self, user_query: str, db_path: str = DEFAULT_DB_PATH, prompt: str = None) -> str:
+        """
+        Convert a question into SQL with the first backend to answer validly.
+
+        Building the prompt may read the schema from SQLite, so callers
+        should build it on an executor and pass it in.
+        """
+        prompt = prompt or build_prompt(user_query, db_path)
+        if len(self.backends) == 1:
+            sql = await self._call(0, prompt, validate=False)
+            self.backends[0].count(won=True)
+            return sql
+
+        remaining = list(range(len(self.backends)))
+        pending, errors = {}, []
+
+        def launch():
+            index = remaining.pop(0)
+            self.backends[index].count(hedged=bool(pending))
+            pending[asyncio.ensure_future(self._call(index, prompt))] = index
+            return self.backends[index]
+
+        last = launch()
+        try:
+            while pending:
+                done, _ = await asyncio.wait(pending, timeout=last.hedge_delay() if remaining else None,
+                                             return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    last = launch()
+                    continue
+                for task in done:
+                    index = pending.pop(task)
+                    try:
+                        sql = task.result()
+                    except Exception as e:
+                        errors.append(f"{self.backends[index].name}: {e}")
+                        continue
+                    self.backends[index].count(won=True)
+                    return sql
+                if remaining:
+                    last = launch()
+            raise self._all_failed(errors)
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def aclose(self):
+        for client in self.clients:
+            await client.aclose()
+
+
+_backends = None
+_hedged_client = None
+_init_lock = threading.Lock()
+
+
+def get_backends() -> list:
+    """The configured backends, parsed from LLM_BACKENDS on first use."""
+    global _backends
+    if _backends is None:
+        with _init_lock:
+            if _backends is None:
+                _backends = parse_backends()
+    return _backends
+
+
+def get_hedged_client() -> HedgedClient:
+    """Return the shared HedgedClient, creating it on first use."""
+    global _hedged_client
+    if _hedged_client is None:
+        backends = get_backends()
+        with _init_lock:
+            if _hedged_client is None:
+                _hedged_client = HedgedClient(backends)
+    return _hedged_client
+
+
+def backend_stats() -> list:
+    """Per-backend latency percentiles, outcomes, hedges, wins, retries and circuit state."""
+    return [backend.stats() for backend in get_backends()]
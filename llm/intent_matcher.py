@@ -0,0 +1,161 @@
+"""
+Rule-Based Intent Matcher
+Answers the common canned questions (the /api/examples list and the
+"show all ..." patterns from the LLM prompt) with fixed SQL, so they never
+wait on a Groq round trip. Questions that do not match with enough
+confidence fall through to the LLM.
+"""
+
+import os
+import re
+from typing import NamedTuple, Optional
+
+from llm.query_cache import normalize_question
+
+MIN_CONFIDENCE = float(os.getenv('INTENT_MIN_CONFIDENCE', '0.8'))
+DEFAULT_TOP_N = 3
+
+# Folded onto one canonical word before matching
+SYNONYMS = {
+    'list': 'show', 'display': 'show', 'get': 'show', 'see': 'show', 'view': 'show',
+    'every': 'all', 'entire': 'all',
+    'client': 'customer', 'clients': 'customer', 'customers': 'customer', 'buyers': 'customer',
+    'products': 'product', 'items': 'product', 'item': 'product',
+    'orders': 'order', 'purchases': 'order', 'purchase': 'order',
+    'sales': 'revenue', 'income': 'revenue', 'earnings': 'revenue',
+    'number': 'count',
+    'mean': 'average', 'avg': 'average',
+    'vips': 'vip', 'best': 'top', 'highest': 'most',
+    'types': 'type', 'segment': 'type', 'generate': 'generates', 'brings': 'generates',
+}
+
+# Words that carry no intent once the stopwords are gone
+FILLER = {'is', 'are', 'do', 'does', 'have', 'has', 'what', 'which', 'was', 'were',
+          'of', 'by', 'in', 'from', 'for', 'there', 'all', 'data', 'table', 'records'}
+
+_NUMBER = re.compile(r'\b\d+\b')
+_WORD_NUMBERS = {'one': 1, 'two': 2, 'three': 3, 'four': 4, 'five': 5,
+                 'six': 6, 'seven': 7, 'eight': 8, 'nine': 9, 'ten': 10}
+
+
+class Intent(NamedTuple):
+    name: str
+    phrasings: tuple
+    sql: str
+
+
+class IntentMatch(NamedTuple):
+    intent: str
+    sql: str
+    confidence: float
+
+
+INTENTS = [
+    Intent('all_customers',
+           ('show all customers', 'show customers', 'all customers'),
+           "SELECT * FROM customers ORDER BY customer_id"),
+    Intent('all_products',
+           ('show all products', 'show products', 'all products'),
+           "SELECT * FROM products ORDER BY product_id"),
+    Intent('all_orders',
+           ('show all orders', 'show orders', 'all orders'),
+           "SELECT * FROM orders ORDER BY order_date DESC"),
+    Intent('count_customers',
+           ('how many customers do we have', 'count customers', 'number of customers'),
+           "SELECT COUNT(*) FROM customers"),
+    Intent('count_products',
+           ('how many products do we have', 'count products', 'number of products'),
+           "SELECT COUNT(*) FROM products"),
+    Intent('count_orders',
+           ('how many orders do we have', 'count orders', 'number of orders'),
+           "SELECT COUNT(*) FROM orders"),
+    Intent('count_vip_customers',
+           ('how many vip customers do we have', 'count vip customers',
+            'number of vip customers'),
+           "SELECT COUNT(*) FROM customers WHERE customer_type = 'vip'"),
+    Intent('completed_revenue',
+           ('what is the total revenue from completed orders', 'total revenue',
+            'what is our total revenue', 'completed orders revenue'),
+           "SELECT SUM(price * quantity) AS total_revenue FROM orders WHERE status = 'completed'"),
+    Intent('top_products_by_sales',
+           ('show me the top 3 products by sales', 'top 3 products by sales',
+            'top 3 products'),
+           "SELECT p.name, SUM(o.quantity) AS units_sold, "
+           "ROUND(SUM(o.price * o.quantity), 2) AS total_revenue "
+           "FROM orders o JOIN products p ON o.product_id = p.product_id "
+           "WHERE o.status = 'completed' GROUP BY p.product_id, p.name "
+           "ORDER BY total_revenue DESC LIMIT {n}"),
+    Intent('average_order_value',
+           ('what is the average order value', 'average order value'),
+           "SELECT ROUND(AVG(price * quantity), 2) AS average_order_value "
+           "FROM orders WHERE status = 'completed'"),
+    Intent('orders_last_month',
+           ('how many orders were placed last month', 'orders placed last month',
+            'orders last month'),
+           "SELECT COUNT(*) FROM orders "
+           "WHERE order_date >= date('now', 'start of month', '-1 month') "
+           "AND order_date < date('now', 'start of month')"),
+    Intent('revenue_by_customer_type',
+           ('which customer type generates the most revenue', 'revenue by customer type'),
+           "SELECT c.customer_type, ROUND(SUM(o.price * o.quantity), 2) AS revenue "
+           "FROM customers c JOIN orders o ON c.customer_id = o.customer_id "
+           "WHERE o.status = 'completed' GROUP BY c.customer_type ORDER BY revenue DESC"),
+]
+
+
+def _tokens(text: str) -> frozenset:
+    """Reduce a question to its set of canonical intent-bearing words."""
+    words = []
+    for word in normalize_question(text).split():
+        if word in _WORD_NUMBERS or _NUMBER.fullmatch(word):
+            word = '{n}'
+        word = SYNONYMS.get(word, word)
+        if word not in FILLER:
+            words.append(word)
+    return frozenset(words)
+
+
+def _extract_number(question: str) -> Optional[int]:
+    """Return the first number (digits or one..ten) in a question."""
+    for word in normalize_question(question).split():
+        if word.isdigit():
+            return int(word)
+        if word in _WORD_NUMBERS:
+            return _WORD_NUMBERS[word]
+    return None
+
+
+# Token sets are computed once at import time
+_INDEX = [(intent, [_tokens(p) for p in intent.phrasings]) for intent in INTENTS]
+
+
+def match_intent(question: str, min_confidence: float = MIN_CONFIDENCE) -> Optional[IntentMatch]:
+    """
+    Match a question against the known intents.
+
+    Args:
+        question (str): Natural language question from the user
+        min_confidence (float): Minimum Jaccard similarity to accept a match
+
+    Returns:
+        IntentMatch or None: The best match, or None if confidence is low
+    """
+    tokens = _tokens(question)
+    if not tokens:
+        return None
+
+    best_intent, best_score = None, 0.0
+    for intent, phrasing_tokens in _INDEX:
+        for candidate in phrasing_tokens:
+            score = len(tokens & candidate) / len(tokens | candidate)
+            if score > best_score:
+                best_intent, best_score = intent, score
+
+    if best_intent is None or best_score < min_confidence:
+        return None
+
+    sql = best_intent.sql
+    if '{n}' in sql:
+        sql = sql.replace('{n}', str(_extract_number(question) or DEFAULT_TOP_N))
+
+    return IntentMatch(best_intent.name, sql, round(best_score, 3))
@@ -1,94 +1,296 @@
 import requests
 import os
+import threading
 import dotenv
+from requests.adapters import HTTPAdapter
+
+from llm.prompt_builder import DEFAULT_DB_PATH, build_prompt, estimate_tokens
+from llm.resilience import BackendGuard, LLMAPIError, get_guard, parse_retry_after
+from llm.sql_stream import SqlStreamParser, parse_sse_line
 
 # Load environment variables from .env file
 dotenv.load_dotenv()
 
-def get_sql_from_query(user_query: str) -> str:
+GROQ_MODEL = os.getenv('GROQ_MODEL', 'llama-3.3-70b-versatile')
+GROQ_API_URL = os.getenv('GROQ_API_URL', 'https://api.groq.com/openai/v1/chat/completions')
+GROQ_POOL_SIZE = int(os.getenv('GROQ_POOL_SIZE', '10'))
+GROQ_CONNECT_TIMEOUT = float(os.getenv('GROQ_CONNECT_TIMEOUT', '5'))
+GROQ_READ_TIMEOUT = float(os.getenv('GROQ_READ_TIMEOUT', '30'))
+# Stream completions and stop reading once the SQL statement is complete
+GROQ_STREAM = os.getenv('GROQ_STREAM', 'true').lower() in ('1', 'true', 'yes')
+# Per-model Groq quota (defaults: free tier of llama-3.3-70b-versatile; 0 = no limit)
+GROQ_RPM_LIMIT = float(os.getenv('GROQ_RPM_LIMIT', '30'))
+GROQ_TPM_LIMIT = float(os.getenv('GROQ_TPM_LIMIT', '12000'))
+MAX_COMPLETION_TOKENS = 100
+
+
+def clean_sql_response(content: str) -> str:
+    """Strip markdown fences and <think> sections from a model completion."""
+    sql_query = content.strip()
+
+    # Clean up response - remove markdown and thinking sections
+    sql_query = sql_query.replace('```sql', '').replace('```', '').strip()
+
+    # Handle DeepSeek thinking format
+    if '<think>' in sql_query:
+        lines = sql_query.split('\n')
+        cleaned_lines = []
+        skip = False
+        for line in lines:
+            if '<think>' in line:
+                skip = True
+            elif '</think>' in line:
+                skip = False
+            elif not skip and line.strip():
+                cleaned_lines.append(line.strip())
+        sql_query = ' '.join(cleaned_lines)
+
+    return ' '.join(sql_query.split())
+
+
+def _get_api_key(api_key=None) -> str:
+    """Return the Groq API key, raising if it is not configured."""
+    api_key = api_key or os.getenv('GROQ_API_KEY')
+    if not api_key:
+        raise Exception("GROQ_API_KEY environment variable not set. Please set your Groq API key.")
+    return api_key
+
+
+def build_request(prompt: str, model: str = GROQ_MODEL, api_key=None, stream: bool = False) -> dict:
+    """Build headers and JSON body for a chat-completions request carrying a prompt."""
+    request = {
+        'headers': {
+            "Authorization": f"Bearer {_get_api_key(api_key)}",
+            "Content-Type": "application/json"
+        },
+        'json': {
+            "model": model,
+            "messages": [{"role": "user", "content": prompt}],
+            "temperature": 0.1,
+            "max_tokens": MAX_COMPLETION_TOKENS
+        }
+    }
+    if stream:
+        request['json']['stream'] = True
+    return request
+
+
+def request_tokens(prompt: str) -> int:
+    """Tokens a request counts against a tokens-per-minute quota, at most."""
+    return estimate_tokens(prompt) + MAX_COMPLETION_TOKENS
+
+
+def api_error(response) -> LLMAPIError:
+    """LLMAPIError for a non-200 requests or httpx response."""
+    return LLMAPIError(f"Groq API error: {response.status_code}", response.status_code,
+                       parse_retry_after(response.headers.get('retry-after')))
+
+
+def parsed_sql(parser: SqlStreamParser) -> str:
+    """SQL from a finished completion: the statement found, else the cleaned text."""
+    return parser.finish() or clean_sql_response(parser.text)
+
+
+def extract_sql(content: str) -> str:
+    """SQL from a whole completion, cut at the end of the statement like a stream is."""
+    parser = SqlStreamParser()
+    parser.feed(content)
+    return parsed_sql(parser)
+
+
+class GroqClient:
+    """
+    Groq chat-completions client that reuses pooled keep-alive connections.
+
+    One client should be shared across threads; the underlying
+    requests.Session keeps up to ``pool_size`` connections open so repeat
+    questions skip DNS, TCP and TLS setup.
+
+    With ``stream`` the completion is read as server-sent events and the
+    response is closed as soon as the SQL statement is complete. That
+    connection is dropped rather than reused, which costs far less than
+    waiting for the rest of the completion.
+
+    With a ``guard`` calls are paced to its quota and retried on 429s,
+    5xxs and network errors (see llm.resilience).
+    """
+
+    def __init__(self, api_key=None, model: str = GROQ_MODEL, url: str = GROQ_API_URL,
+                 pool_size: int = GROQ_POOL_SIZE,
+                 connect_timeout: float = GROQ_CONNECT_TIMEOUT,
+                 read_timeout: float = GROQ_READ_TIMEOUT,
+                 stream: bool = GROQ_STREAM, guard: BackendGuard = None):
+        self.api_key = api_key
+        self.stream = stream
+        self.guard = guard
+        self.model = model
+        self.url = url
+        self.timeout = (connect_timeout, read_timeout)
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+    def get_sql(self, user_query: str, db_path: str = DEFAULT_DB_PATH, prompt: str = None,
+                cancel: threading.Event = None) -> str:
+        """
+        Convert a user question into SQL (prompt defaults to build_prompt's).
+
+        Setting ``cancel`` closes a streamed completion at the next event;
+        whatever was read by then is returned and should be discarded.
+        """
+        prompt = prompt or build_prompt(user_query, db_path)
+        kwargs = build_request(prompt, self.model, self.api_key, self.stream)
+        if self.guard is None:
+            return self._send(kwargs, cancel)
+        return self.guard.call(lambda: self._send(kwargs, cancel), request_tokens(prompt), cancel)
+
+    def _send(self, kwargs: dict, cancel: threading.Event = None) -> str:
+        try:
+            if self.stream:
+                return self._get_sql_streamed(kwargs, cancel)
+            response = self.session.post(self.url, timeout=self.timeout, **kwargs)
+
+            if response.status_code == 200:
+                return extract_sql(response.json()['choices'][0]['message']['content'])
+            else:
+                raise api_error(response)
+
+        except LLMAPIError:
+            raise
+        except requests.exceptions.RequestException as e:
+            raise LLMAPIError(f"Network error: {str(e)}")
+        except Exception as e:
+            raise Exception(f"API error: {str(e)}")
+
+    def _get_sql_streamed(self, kwargs: dict, cancel: threading.Event = None) -> str:
+        parser = SqlStreamParser()
+        with self.session.post(self.url, timeout=self.timeout, stream=True, **kwargs) as response:
+            if response.status_code != 200:
+                response.content  # read the short error body so the connection is kept
+                raise api_error(response)
+            for line in response.iter_lines(decode_unicode=True):
+                if cancel is not None and cancel.is_set():
+                    break
+                done, content = parse_sse_line(line)
+                if (content and parser.feed(content) is not None) or done:
+                    break
+        return parsed_sql(parser)
+
+    def close(self):
+        """Close pooled connections."""
+        self.session.close()
+
+
+class AsyncGroqClient:
+    """
+    asyncio counterpart of GroqClient built on httpx.AsyncClient.
+
+    Many questions can be in flight on one event loop without holding an
+    OS thread each. Create and close it on the loop that uses it.
+    """
+
+    def __init__(self, api_key=None, model: str = GROQ_MODEL, url: str = GROQ_API_URL,
+                 pool_size: int = GROQ_POOL_SIZE,
+                 connect_timeout: float = GROQ_CONNECT_TIMEOUT,
+                 read_timeout: float = GROQ_READ_TIMEOUT,
+                 stream: bool = GROQ_STREAM, guard: BackendGuard = None):
+        import httpx
+
+        self._httpx = httpx
+        self.api_key = api_key
+        self.stream = stream
+        self.guard = guard
+        self.model = model
+        self.url = url
+        self.client = httpx.AsyncClient(
+            limits=httpx.Limits(max_connections=pool_size,
+                                max_keepalive_connections=pool_size),
+            timeout=httpx.Timeout(read_timeout, connect=connect_timeout)
+        )
+
+    async def get_sql(self, user_query: str, db_path: str = DEFAULT_DB_PATH, prompt: str = None) -> str:
+        """
+        Convert a user question into SQL without blocking the event loop.
+
+        Building the prompt may read the schema from SQLite, so async
+        callers should build it on an executor and pass it in.
+        """
+        prompt = prompt or build_prompt(user_query, db_path)
+        kwargs = build_request(prompt, self.model, self.api_key, self.stream)
+        if self.guard is None:
+            return await self._send(kwargs)
+        return await self.guard.call_async(lambda: self._send(kwargs), request_tokens(prompt))
+
+    async def _send(self, kwargs: dict) -> str:
+        try:
+            if self.stream:
+                return await self._get_sql_streamed(kwargs)
+            response = await self.client.post(self.url, **kwargs)
+
+            if response.status_code == 200:
+                return extract_sql(response.json()['choices'][0]['message']['content'])
+            else:
+                raise api_error(response)
+
+        except LLMAPIError:
+            raise
+        except self._httpx.HTTPError as e:
+            raise LLMAPIError(f"Network error: {str(e)}")
+        except Exception as e:
+            raise Exception(f"API error: {str(e)}")
+
+    async def _get_sql_streamed(self, kwargs: dict) -> str:
+        parser = SqlStreamParser()
+        async with self.client.stream('POST', self.url, **kwargs) as response:
+            if response.status_code != 200:
+                await response.aread()
+                raise api_error(response)
+            async for line in response.aiter_lines():
+                done, content = parse_sse_line(line)
+                if (content and parser.feed(content) is not None) or done:
+                    break
+        return parsed_sql(parser)
+
+    async def aclose(self):
+        """Close pooled connections."""
+        await self.client.aclose()
+
+
+_default_client = None
+_default_client_lock = threading.Lock()
+
+
+def get_default_client() -> GroqClient:
+    """Return the shared GroqClient, creating it on first use."""
+    global _default_client
+    if _default_client is None:
+        with _default_client_lock:
+            if _default_client is None:
+                _default_client = GroqClient(guard=get_guard(f'groq:{GROQ_MODEL}', GROQ_RPM_LIMIT,
+                                                             GROQ_TPM_LIMIT))
+    return _default_client
+
+
+def get_sql_from_query(user_query: str, db_path: str = DEFAULT_DB_PATH) -> str:
     """
     Uses Groq's DeepSeek model to convert a user question into SQL.
-    
+
     Args:
         user_query (str): Natural language question from the user
-        
+        db_path (str): Database whose schema goes into the prompt
+
     Returns:
         str: SQL query string
-        
+
     Raises:
-        Exception: If API call fails or API key is missing
+        LLMAPIError: If the API still fails after retrying within the quota
+        BackendUnavailable: If the circuit is open or the quota is exhausted
+        Exception: If the API key is missing
     """
     # Check if API key is set
-    api_key = os.getenv('GROQ_API_KEY')
-    if not api_key:
-        raise Exception("GROQ_API_KEY environment variable not set. Please set your Groq API key.")    # Enhanced schema prompt for Llama model with emphasis on complete table results
-    prompt = f"""Generate only a SQL query for SQLite. No explanations.
-
-Schema:
-customers: customer_id (PK), name, email, join_date, customer_type ('regular', 'premium', 'vip')
-products: product_id (PK), name, category, base_price, stock_level
-orders: order_id (PK), customer_id (FK), product_id (FK), quantity, price, order_date (YYYY-MM-DD), status ('completed', 'refunded', 'cancelled', 'pending')
-
-Important: When user asks to "show all" or requests complete data, return ALL rows without LIMIT.
-
-Example queries:
-- VIP customers: SELECT COUNT(*) FROM customers WHERE customer_type = 'vip'
-- All customers: SELECT * FROM customers ORDER BY customer_id
-- All products: SELECT * FROM products ORDER BY product_id
-- All orders: SELECT * FROM orders ORDER BY order_date DESC
-- Show customers: SELECT * FROM customers
-- Show products: SELECT * FROM products
-- Show orders: SELECT * FROM orders
-- Completed orders revenue: SELECT SUM(price * quantity) FROM orders WHERE status = 'completed'
-- Customer order info: SELECT c.name, o.* FROM customers c JOIN orders o ON c.customer_id = o.customer_id
-
-Question: {user_query}
-SQL:""".strip()
-
-    headers = {
-        "Authorization": f"Bearer {api_key}",
-        "Content-Type": "application/json"
-    }
-    
-    data = {
-        "model": "llama-3.3-70b-versatile",
-        "messages": [{"role": "user", "content": prompt}],
-        "temperature": 0.1,
-        "max_tokens": 100
-    }
-
-    try:
-        response = requests.post("https://api.groq.com/openai/v1/chat/completions", 
-                               headers=headers, json=data, timeout=30)
-        
-        if response.status_code == 200:
-            sql_query = response.json()['choices'][0]['message']['content'].strip()
-            
-            # Clean up response - remove markdown and thinking sections
-            sql_query = sql_query.replace('```sql', '').replace('```', '').strip()
-            
-            # Handle DeepSeek thinking format
-            if '<think>' in sql_query:
-                lines = sql_query.split('\n')
-                cleaned_lines = []
-                skip = False
-                for line in lines:
-                    if '<think>' in line:
-                        skip = True
-                    elif '</think>' in line:
-                        skip = False
-                    elif not skip and line.strip():
-                        cleaned_lines.append(line.strip())
-                sql_query = ' '.join(cleaned_lines)
-            
-            return ' '.join(sql_query.split())
-        else:
-            raise Exception(f"Groq API error: {response.status_code}")
-            
-    except requests.exceptions.RequestException as e:
-        raise Exception(f"Network error: {str(e)}")
-    except Exception as e:
-        raise Exception(f"API error: {str(e)}")
+    _get_api_key()
+    return get_default_client().get_sql(user_query, db_path)
 
 
 def test_connection() -> bool:
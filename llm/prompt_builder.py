@@ -0,0 +1,349 @@
+"""
+Prompt Builder
+Builds the text-to-SQL prompt from the live database schema instead of a
+hard-coded block. Tables, keys and foreign keys come from PRAGMA
+table_info / foreign_key_list; low-cardinality text columns list their
+values and date columns their format, sampled from the data. The
+introspected schema is cached per database and reloaded only when
+PRAGMA schema_version changes.
+
+Each prompt carries only the tables a question refers to (plus the
+tables that join them) and the examples that use those tables, and is
+trimmed to PROMPT_TOKEN_BUDGET estimated tokens. Fewer input tokens mean
+a faster first token and more questions per minute under Groq's token
+rate limits.
+"""
+
+import os
+import re
+import sqlite3
+import threading
+from functools import lru_cache
+from typing import NamedTuple, Optional
+
+from database.connection_pool import DB_PATH as DEFAULT_DB_PATH
+
+# Target size of a whole prompt, in estimated tokens
+PROMPT_TOKEN_BUDGET = int(os.getenv('PROMPT_TOKEN_BUDGET', '300'))
+PROMPT_MAX_EXAMPLES = int(os.getenv('PROMPT_MAX_EXAMPLES', '3'))
+# Text columns with at most this many distinct values list them in the prompt
+ENUM_MAX_VALUES = 8
+ENUM_MAX_LENGTH = 30
+# Rows sampled per column to find its values and date format
+SAMPLE_ROWS = 10000
+# Rough size of a Llama / GPT token in English text and SQL identifiers
+CHARS_PER_TOKEN = 4
+
+INSTRUCTIONS = "Generate only a SQL query for SQLite. No explanations."
+SHOW_ALL_RULE = 'When the user asks to "show all" or for complete data, return ALL rows without LIMIT.'
+
+# Question words that refer to a column without naming it -> column name parts
+ALIASES = {
+    'revenue': ('price', 'quantity'), 'sales': ('price', 'quantity'), 'income': ('price', 'quantity'),
+    'spent': ('price', 'quantity'), 'spend': ('price', 'quantity'), 'value': ('price', 'quantity'),
+    'sold': ('quantity',), 'sell': ('quantity',), 'selling': ('quantity',), 'units': ('quantity',),
+    'cost': ('price',), 'expensive': ('price',), 'cheap': ('price',),
+    'stock': ('stock',), 'inventory': ('stock',),
+    'client': ('customer',), 'buyer': ('customer',), 'item': ('product',), 'purchase': ('order',),
+    'day': ('date',), 'week': ('date',), 'month': ('date',), 'year': ('date',),
+    'recent': ('date',), 'latest': ('date',), 'joined': ('join',),
+}
+
+# (description, SQL); only those whose tables exist and were picked are sent
+EXAMPLES = [
+    ("VIP customers", "SELECT COUNT(*) FROM customers WHERE customer_type = 'vip'"),
+    ("All orders", "SELECT * FROM orders ORDER BY order_date DESC"),
+    ("Completed orders revenue", "SELECT SUM(price * quantity) FROM orders WHERE status = 'completed'"),
+    ("Customer order info",
+     "SELECT c.name, o.* FROM customers c JOIN orders o ON c.customer_id = o.customer_id"),
+    ("Units sold per product",
+     "SELECT p.name, SUM(o.quantity) FROM products p JOIN orders o ON p.product_id = o.product_id "
+     "GROUP BY p.product_id"),
+    ("Orders per month", "SELECT strftime('%Y-%m', order_date) AS month, COUNT(*) FROM orders GROUP BY month"),
+]
+
+_WORD = re.compile(r'[a-z0-9]+')
+_TABLE_REF = re.compile(r'\b(?:FROM|JOIN)\s+([A-Za-z_]\w*)', re.I)
+_DATE = re.compile(r'^\d{4}-\d{2}-\d{2}$')
+_DATETIME = re.compile(r'^\d{4}-\d{2}-\d{2}[ T]\d{2}:\d{2}(:\d{2})?')
+
+
+class Column(NamedTuple):
+    name: str
+    pk: bool
+    references: Optional[str]  # table this column is a foreign key to
+    values: tuple              # the distinct values of a low-cardinality text column
+    note: str                  # e.g. the date format
+
+
+class Table(NamedTuple):
+    name: str
+    columns: tuple
+
+    @property
+    def references(self) -> set:
+        return {column.references for column in self.columns if column.references}
+
+
+def estimate_tokens(text: str) -> int:
+    """Approximate prompt tokens (about four characters each)."""
+    return -(-len(text) // CHARS_PER_TOKEN)
+
+
+def _quote(name: str) -> str:
+    return '"' + name.replace('"', '""') + '"'
+
+
+def _singular(word: str) -> str:
+    return word[:-1] if len(word) > 3 and word.endswith('s') and not word.endswith('ss') else word
+
+
+def _terms(text: str) -> set:
+    """Lower-cased, singular words of a question, with aliases expanded."""
+    terms = set()
+    for word in _WORD.findall(text.lower()):
+        terms.update(ALIASES.get(word, ()))
+        word = _singular(word)
+        terms.add(word)
+        terms.update(ALIASES.get(word, ()))
+    return terms
+
+
+@lru_cache(maxsize=4096)
+def _name_parts(name: str) -> frozenset:
+    return frozenset(_singular(part) for part in _WORD.findall(name.lower())) - {'id'}
+
+
+def _sample_column(conn, table: str, column: str):
+    """(values, note) for a text column from a sample of its rows."""
+    sample = (f"SELECT {_quote(column)} AS v FROM {_quote(table)} "
+              f"WHERE {_quote(column)} IS NOT NULL LIMIT {SAMPLE_ROWS}")
+    rows, distinct = conn.execute(f"SELECT COUNT(*), COUNT(DISTINCT v) FROM ({sample})").fetchone()
+    if not rows:
+        return (), ''
+
+    values = [v for (v,) in conn.execute(f"SELECT DISTINCT v FROM ({sample}) LIMIT 20")]
+    if not all(isinstance(v, str) for v in values):
+        return (), ''
+    if all(_DATE.match(v) for v in values):
+        return (), 'YYYY-MM-DD'
+    if all(_DATETIME.match(v) for v in values):
+        return (), 'YYYY-MM-DD HH:MM:SS'
+    if distinct <= ENUM_MAX_VALUES and distinct * 2 <= rows and all(len(v) <= ENUM_MAX_LENGTH for v in values):
+        return tuple(v for v in values if _WORD.search(v.lower())), ''
+    return (), ''
+
+
+def introspect_schema(conn) -> dict:
+    """
+    Read every user table's columns, keys and sampled value hints.
+
+    Foreign keys are taken from the declared constraints; an undeclared
+    ``<x>_id`` column matching another table's primary key counts too.
+
+    Returns:
+        dict: table name -> Table
+    """
+    names = [name for (name,) in conn.execute(
+        "SELECT name FROM sqlite_master WHERE type = 'table' AND name NOT LIKE 'sqlite_%' ORDER BY name")]
+    info = {name: conn.execute(f"PRAGMA table_info({_quote(name)})").fetchall() for name in names}
+    primary_keys = {}
+    for name, columns in info.items():
+        keys = [column[1] for column in columns if column[5]]
+        if len(keys) == 1:
+            primary_keys[keys[0]] = name
+
+    tables = {}
+    for name in names:
+        declared = {row[3]: row[2] for row in conn.execute(f"PRAGMA foreign_key_list({_quote(name)})")}
+        columns = []
+        for _cid, column, col_type, _notnull, _default, pk in info[name]:
+            references = declared.get(column)
+            if references is None and not pk and column.endswith('_id') and primary_keys.get(column, name) != name:
+                references = primary_keys[column]
+            values, note = (), ''
+            if not pk and references is None and (not col_type or 'CHAR' in col_type.upper()
+                                                   or 'TEXT' in col_type.upper() or 'DATE' in col_type.upper()):
+                values, note = _sample_column(conn, name, column)
+            columns.append(Column(column, bool(pk), references, values, note))
+        tables[name] = Table(name, tuple(columns))
+    return tables
+
+
+_schemas = {}
+_schema_lock = threading.Lock()
+
+
+def _file_stamp(db_path: str) -> tuple:
+    stamp = []
+    for path in (db_path, db_path + '-wal'):
+        try:
+            st = os.stat(path)
+            stamp.append((st.st_mtime_ns, st.st_size))
+        except OSError:
+            stamp.append(None)
+    return tuple(stamp)
+
+
+def get_schema(db_path: str = DEFAULT_DB_PATH) -> dict:
+    """
+    Return the introspected schema of a database (table name -> Table).
+
+    While the file is untouched this is a stat call. After a write, only
+    PRAGMA schema_version is read; the tables are introspected again when
+    it has changed.
+    """
+    stamp = _file_stamp(db_path)
+    with _schema_lock:
+        cached = _schemas.get(db_path)
+    if cached and cached[0] == stamp:
+        return cached[2]
+
+    conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+    try:
+        version = conn.execute("PRAGMA schema_version").fetchone()[0]
+        tables = cached[2] if cached and cached[1] == version else introspect_schema(conn)
+    finally:
+        conn.close()
+
+    with _schema_lock:
+        _schemas[db_path] = (stamp, version, tables)
+    return tables
+
+
+def relevant_tables(question: str, tables: dict) -> tuple:
+    """
+    Pick the tables and columns a question refers to.
+
+    A table is picked when the question names it, names a column only it
+    has, or mentions one of its column values ("vip", "completed").
+    Tables whose foreign keys join two picked tables are added. With no
+    match at all, every table is a candidate.
+
+    Returns:
+        tuple: (picked table names, {table: matched column names})
+    """
+    terms = _terms(question)
+    owners = {}
+    for table in tables.values():
+        for column in table.columns:
+            for part in _name_parts(column.name):
+                owners.setdefault(part, set()).add(table.name)
+
+    picked, matched = [], {}
+    for table in tables.values():
+        valued = {column.name for column in table.columns
+                  if any(_name_parts(v) <= terms for v in column.values)}
+        hits = valued | {column.name for column in table.columns
+                         if _name_parts(column.name) & terms and not column.references}
+        matched[table.name] = hits
+        named = bool(_name_parts(table.name) & terms)
+        unique = any(len(owners[part]) == 1 for column in hits for part in _name_parts(column) & terms)
+        if named or unique or valued:
+            picked.append(table.name)
+
+    if not picked:
+        return list(tables), matched
+    if len(picked) > 1:
+        for table in tables.values():
+            if table.name not in picked and len(table.references & set(picked)) >= 2:
+                picked.append(table.name)
+    return picked, matched
+
+
+def _render_column(column: Column, note: bool) -> str:
+    text = column.name
+    if column.pk:
+        text += ' PK'
+    elif column.references:
+        text += f' -> {column.references}'
+    if column.values:
+        text += ' ' + '|'.join(f"'{v}'" for v in column.values)
+    elif note and column.note:
+        text += ' ' + column.note
+    return text
+
+
+def render_schema(tables: list, matched: dict, compact: bool = False, notes: bool = True) -> str:
+    """
+    One line per table: ``name(col PK, col -> other, col 'a'|'b', ...)``.
+
+    Value hints are always kept: without them the model has to guess the
+    casing of literals like 'vip' or 'completed' for a question that
+    doesn't name the column. notes=False drops the notes (date formats)
+    of unmatched columns; compact also drops unmatched columns that are
+    neither keys nor enums.
+    """
+    lines = []
+    for table in tables:
+        hits = matched.get(table.name, set())
+        columns = [_render_column(c, notes or c.name in hits) for c in table.columns
+                   if not compact or c.pk or c.references or c.values or c.name in hits]
+        lines.append(f"{table.name}({', '.join(columns)})")
+    return '\n'.join(lines)
+
+
+def pick_examples(question: str, table_names, max_examples: int = PROMPT_MAX_EXAMPLES) -> list:
+    """Examples that only use the given tables, most similar to the question first."""
+    terms = _terms(question)
+    allowed = set(table_names)
+    scored = []
+    for i, (label, sql) in enumerate(EXAMPLES):
+        used = set(_TABLE_REF.findall(sql))
+        if not used or not used <= allowed:
+            continue
+        score = len(_terms(label + ' ' + sql) & terms)
+        if score:
+            scored.append((-score, i, label, sql))
+    return [(label, sql) for _, _, label, sql in sorted(scored)[:max_examples]]
+
+
+def render_prompt(question: str, schema: str, examples) -> str:
+    parts = [INSTRUCTIONS, f"Schema:\n{schema}", SHOW_ALL_RULE]
+    if examples:
+        parts.append("Examples:\n" + '\n'.join(f"- {label}: {sql}" for label, sql in examples))
+    parts.append(f"Question: {question}\nSQL:")
+    return '\n\n'.join(parts)
+
+
+def build_prompt(user_query: str, db_path: str = DEFAULT_DB_PATH,
+                 token_budget: int = PROMPT_TOKEN_BUDGET) -> str:
+    """
+    Build the text-to-SQL prompt for a user question.
+
+    Starts from the relevant tables with every column and the best
+    examples, then, while over the token budget, drops the notes of
+    unmatched columns, then examples, then unmatched columns, then the
+    tables with the fewest foreign keys. The question itself, the key
+    columns and the values of enum columns are never cut from a table
+    that is kept.
+
+    Args:
+        user_query (str): Natural language question from the user
+        db_path (str): Database whose schema the SQL targets
+        token_budget (int): Target prompt size in estimated tokens
+
+    Returns:
+        str: The prompt, ending in ``Question: ...`` / ``SQL:``
+    """
+    tables = get_schema(db_path)
+    names, matched = relevant_tables(user_query, tables)
+    # Tables with more foreign keys (fact tables) are kept longest
+    picked = sorted((tables[name] for name in names), key=lambda table: -len(table.references))
+    examples = pick_examples(user_query, names)
+
+    compact, notes = False, True
+    while True:
+        prompt = render_prompt(user_query, render_schema(picked, matched, compact, notes), examples)
+        if estimate_tokens(prompt) <= token_budget:
+            return prompt
+        if notes:
+            notes = False
+        elif examples:
+            examples = examples[:-1]
+        elif not compact:
+            compact = True
+        elif len(picked) > 1:
+            picked = picked[:-1]
+        else:
+            return prompt
@@ -0,0 +1,233 @@
+"""
+Question -> SQL Cache
+Caches generated SQL keyed on the normalized question, the model name and a
+fingerprint of the database schema. Entries live in an in-process LRU tier
+with a TTL and are persisted to a local SQLite file so they survive restarts.
+"""
+
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+from database.connection_pool import DB_PATH as DEFAULT_DB_PATH
+from llm.backends import get_hedged_client
+
+CACHE_PATH = os.getenv('QUERY_CACHE_PATH', os.path.join('data', 'query_cache.db'))
+CACHE_MAX_ENTRIES = int(os.getenv('QUERY_CACHE_MAX_ENTRIES', '512'))
+CACHE_TTL_SECONDS = float(os.getenv('QUERY_CACHE_TTL', '86400'))
+
+# Words that do not change the meaning of a sales question
+STOPWORDS = {
+    'a', 'an', 'the', 'please', 'me', 'us', 'our', 'my', 'we', 'i',
+    'can', 'could', 'would', 'you', 'kindly', 'just', 'tell', 'give',
+}
+
+# Signed and decimal numbers kept whole, words, and comparison operators;
+# other punctuation (hyphens between words, sentence breaks) is dropped
+_TOKEN = re.compile(r"(?<!\w)-?\d+(?:\.\d+)?|\w+|[<>=!]+")
+_TRAILING = re.compile(r"[\s?.!]+$")
+# Bumped when normalize_question changes, so keys from an older
+# normalization (which merged "> 100" and "< 100") are never served
+KEY_VERSION = 2
+
+
+def normalize_question(question: str) -> str:
+    """
+    Fold case, whitespace, stopwords and trailing ``?`` / ``.`` out of a question.
+
+    Comparison operators stay as their own tokens and numbers keep their
+    sign and decimals, so "price > 100" and "price < 100" (or "-5" and
+    "5") never share a cache entry or an in-flight computation.
+    """
+    text = _TRAILING.sub('', question.lower())
+    return ' '.join(word for word in _TOKEN.findall(text) if word not in STOPWORDS)
+
+
+_fingerprints = {}
+_fingerprint_lock = threading.Lock()
+
+
+def get_schema_fingerprint(db_path: str = DEFAULT_DB_PATH) -> str:
+    """
+    Return a short hash of the database schema.
+
+    The hash is recomputed only when the database file's size or mtime
+    changes, so the common path is a single os.stat call.
+    """
+    try:
+        st = os.stat(db_path)
+    except OSError:
+        return 'missing'
+
+    stamp = (st.st_mtime_ns, st.st_size)
+    with _fingerprint_lock:
+        cached = _fingerprints.get(db_path)
+        if cached and cached[0] == stamp:
+            return cached[1]
+
+    conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+    try:
+        rows = conn.execute(
+            "SELECT type, name, sql FROM sqlite_master "
+            "WHERE name NOT LIKE 'sqlite_%' ORDER BY type, name"
+        ).fetchall()
+    finally:
+        conn.close()
+
+    fingerprint = hashlib.sha1(repr(rows).encode('utf-8')).hexdigest()[:16]
+    with _fingerprint_lock:
+        _fingerprints[db_path] = (stamp, fingerprint)
+    return fingerprint
+
+
+class QueryCache:
+    """Two-tier (memory LRU + SQLite file) cache of generated SQL."""
+
+    def __init__(self, path: Optional[str] = CACHE_PATH,
+                 max_entries: int = CACHE_MAX_ENTRIES,
+                 ttl: float = CACHE_TTL_SECONDS):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._conn = None
+        self.hits = 0
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+        if path:
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._conn = sqlite3.connect(path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS sql_cache (
+                    cache_key TEXT PRIMARY KEY,
+                    question TEXT NOT NULL,
+                    sql TEXT NOT NULL,
+                    created_at REAL NOT NULL
+                )
+            """)
+            self._conn.commit()
+
+    @staticmethod
+    def make_key(question: str, model: str, schema_fingerprint: str) -> str:
+        """Build the cache key for a question."""
+        raw = f"{KEY_VERSION}|{model}|{schema_fingerprint}|{normalize_question(question)}"
+        return hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        """Return cached SQL for a key, or None on a miss."""
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                sql, created_at = entry
+                if now - created_at <= self.ttl:
+                    self._memory.move_to_end(key)
+                    self.hits += 1
+                    self.memory_hits += 1
+                    return sql
+                del self._memory[key]
+
+            if self._conn is not None:
+                row = self._conn.execute(
+                    "SELECT sql, created_at FROM sql_cache WHERE cache_key = ?", (key,)
+                ).fetchone()
+                if row and now - row[1] <= self.ttl:
+                    self._remember(key, row[0], row[1])
+                    self.hits += 1
+                    self.disk_hits += 1
+                    return row[0]
+                if row:
+                    self._conn.execute("DELETE FROM sql_cache WHERE cache_key = ?", (key,))
+                    self._conn.commit()
+
+            self.misses += 1
+            return None
+
+    def set(self, key: str, question: str, sql: str):
+        """Store SQL for a key in both tiers."""
+        now = time.time()
+        with self._lock:
+            self._remember(key, sql, now)
+            if self._conn is not None:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO sql_cache VALUES (?, ?, ?, ?)",
+                    (key, question, sql, now)
+                )
+                self._conn.commit()
+
+    def _remember(self, key, sql, created_at):
+        """Insert into the memory tier, evicting the least recently used entry."""
+        self._memory[key] = (sql, created_at)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def clear(self):
+        """Drop every entry from both tiers."""
+        with self._lock:
+            self._memory.clear()
+            if self._conn is not None:
+                self._conn.execute("DELETE FROM sql_cache")
+                self._conn.commit()
+
+    def stats(self) -> dict:
+        """Return hit/miss counters."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'memory_hits': self.memory_hits,
+                'disk_hits': self.disk_hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0,
+                'memory_entries': len(self._memory),
+            }
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_query_cache() -> QueryCache:
+    """Return the process-wide query cache, creating it on first use."""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = QueryCache()
+    return _cache
+
+
+def get_sql_cached(user_query: str, db_path: str = DEFAULT_DB_PATH) -> Tuple[str, bool]:
+    """
+    Convert a question to SQL, serving repeated questions from the cache.
+
+    Args:
+        user_query (str): Natural language question from the user
+        db_path (str): Database whose schema the SQL targets
+
+    Returns:
+        tuple: (sql, cache_hit)
+    """
+    cache = get_query_cache()
+    client = get_hedged_client()
+    key = cache.make_key(user_query, client.model, get_schema_fingerprint(db_path))
+
+    sql = cache.get(key)
+    if sql is not None:
+        return sql, True
+
+    sql = client.get_sql(user_query, db_path)
+    cache.set(key, user_query, sql)
+    return sql, False
@@ -0,0 +1,326 @@
+"""
+LLM Rate Limiting, Retries and Circuit Breaking
+Keeps calls to a provider inside its requests-per-minute and
+tokens-per-minute quota, retries throttled (429) and failed (5xx,
+network) calls, and stops calling a provider that keeps failing.
+
+- One token bucket per quota paces the calls. A call reserves one
+  request plus its prompt's estimated tokens and max_tokens, then sleeps
+  until the buckets cover them. Reservations queue up at the refill
+  rate, so a burst is spread out instead of being sent at once and
+  rejected.
+- A 429 pauses every caller of the quota until its Retry-After and
+  empties the buckets. Callers resume paced by the refill rate rather
+  than each retrying on its own schedule.
+- Other retryable failures back off with full jitter: a uniform delay
+  in [0, min(LLM_BACKOFF_MAX, LLM_BACKOFF_BASE * 2 ** attempt)].
+- After LLM_BREAKER_FAILURES consecutive failures the circuit opens.
+  While it is open, calls fail at once for LLM_BREAKER_RESET seconds.
+  Then one probe call is let through, and its success closes the
+  circuit. HedgedClient treats these fast failures like any other and
+  moves straight on to the next backend.
+
+A call that would wait longer than LLM_MAX_WAIT for quota or backoff
+fails instead. A saturated provider then sheds load rather than queueing
+it without bound.
+"""
+
+import asyncio
+import email.utils
+import itertools
+import os
+import random
+import threading
+import time
+from concurrent.futures import CancelledError
+from typing import Optional
+
+LLM_MAX_RETRIES = int(os.getenv('LLM_MAX_RETRIES', '3'))
+LLM_BACKOFF_BASE = float(os.getenv('LLM_BACKOFF_BASE', '0.5'))
+LLM_BACKOFF_MAX = float(os.getenv('LLM_BACKOFF_MAX', '8'))
+# Longest a call may wait for quota or a retry before failing instead
+LLM_MAX_WAIT = float(os.getenv('LLM_MAX_WAIT', '10'))
+# Consecutive failures that open the circuit (0 disables it), and how long it stays open
+LLM_BREAKER_FAILURES = int(os.getenv('LLM_BREAKER_FAILURES', '5'))
+LLM_BREAKER_RESET = float(os.getenv('LLM_BREAKER_RESET', '30'))
+# Bucket capacity in seconds of quota: a short burst is allowed, a minute's worth is not
+BURST_SECONDS = 5
+
+
+class LLMAPIError(Exception):
+    """A failed chat-completions call; status is None for network errors."""
+
+    def __init__(self, message: str, status: int = None, retry_after: float = None):
+        super().__init__(message)
+        self.status = status
+        self.retry_after = retry_after
+
+    @property
+    def retryable(self) -> bool:
+        return self.status is None or self.status == 429 or self.status >= 500
+
+
+class BackendUnavailable(Exception):
+    """Raised without calling the provider: its circuit is open or its quota is exhausted."""
+
+
+def parse_retry_after(value: str) -> Optional[float]:
+    """Seconds from a Retry-After header (delay-seconds or HTTP-date), or None."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        when = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, when.timestamp() - time.time())
+
+
+def backoff_delay(attempt: int, base: float = LLM_BACKOFF_BASE, cap: float = LLM_BACKOFF_MAX) -> float:
+    """Full-jitter exponential backoff for the attempt-th retry (0-based)."""
+    return random.uniform(0, min(cap, base * 2 ** attempt))
+
+
+class TokenBucket:
+    """
+    Refills at per_minute / 60 units a second, up to BURST_SECONDS' worth.
+
+    Not locked on its own; RateLimiter updates its buckets together.
+    """
+
+    def __init__(self, per_minute: float, burst_seconds: float = BURST_SECONDS):
+        self.rate = per_minute / 60
+        self.capacity = max(1.0, self.rate * burst_seconds)
+        self.level = self.capacity
+        self._updated = time.monotonic()
+
+    def refill(self, now: float):
+        self.level = min(self.capacity, self.level + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def wait_time(self, amount: float) -> float:
+        """Seconds until the bucket covers amount (after refill())."""
+        return max(0.0, (amount - self.level) / self.rate)
+
+
+class RateLimiter:
+    """Requests- and tokens-per-minute buckets for one quota; 0 leaves that limit off."""
+
+    def __init__(self, rpm: float = 0, tpm: float = 0, jitter: float = LLM_BACKOFF_BASE,
+                 burst_seconds: float = BURST_SECONDS):
+        self.requests = TokenBucket(rpm, burst_seconds) if rpm > 0 else None
+        self.tokens = TokenBucket(tpm, burst_seconds) if tpm > 0 else None
+        self.jitter = jitter
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def reserve(self, tokens: int, max_wait: float = LLM_MAX_WAIT) -> float:
+        """
+        Reserve a request of ``tokens`` tokens.
+
+        The balance may go negative. Each caller then sleeps for the
+        returned seconds, so concurrent callers are released one refill
+        apart.
+
+        Raises:
+            BackendUnavailable: If the wait would exceed max_wait; nothing is reserved
+        """
+        with self._lock:
+            now = time.monotonic()
+            wait = 0.0
+            if now < self._paused_until:
+                # Spread the callers held by a 429 instead of waking them together
+                wait = self._paused_until - now + random.uniform(0, self.jitter)
+            for bucket, amount in ((self.requests, 1), (self.tokens, tokens)):
+                if bucket is not None:
+                    bucket.refill(now)
+                    wait = max(wait, bucket.wait_time(amount))
+            if wait > max_wait:
+                raise BackendUnavailable(f"rate limit: next slot in {wait:.1f}s")
+            for bucket, amount in ((self.requests, 1), (self.tokens, tokens)):
+                if bucket is not None:
+                    bucket.level -= amount
+            return wait
+
+    def pause(self, seconds: float):
+        """Hold every caller for seconds (a 429's Retry-After) and empty the buckets."""
+        with self._lock:
+            now = time.monotonic()
+            self._paused_until = max(self._paused_until, now + seconds)
+            for bucket in (self.requests, self.tokens):
+                if bucket is not None:
+                    bucket.refill(now)
+                    bucket.level = min(bucket.level, 0.0)
+
+
+class CircuitBreaker:
+    """
+    Consecutive-failure circuit breaker.
+
+    Once open, allow() is False for ``reset`` seconds. After that the next
+    caller becomes the probe and the timer restarts, so a probe that never
+    reports back only delays the next one. A success closes the circuit.
+    """
+
+    def __init__(self, failures: int = LLM_BREAKER_FAILURES, reset: float = LLM_BREAKER_RESET):
+        self.threshold = failures
+        self.reset = reset
+        self.failures = 0
+        self.opened = 0  # times the circuit has opened
+        self._opened_at = None
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            now = time.monotonic()
+            if now - self._opened_at < self.reset:
+                return False
+            self._opened_at = now  # this caller probes; the rest wait another reset period
+            return True
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self._opened_at = None
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.threshold and self.failures >= self.threshold:
+                self.opened += self._opened_at is None
+                self._opened_at = time.monotonic()
+
+    def retry_in(self) -> float:
+        """Seconds until the next probe is let through (0 when closed)."""
+        with self._lock:
+            if self._opened_at is None:
+                return 0.0
+            return max(0.0, self._opened_at + self.reset - time.monotonic())
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._opened_at is None:
+                return 'closed'
+            return 'open' if time.monotonic() - self._opened_at < self.reset else 'half-open'
+
+
+def _sleep(seconds: float, cancel: threading.Event = None):
+    if seconds <= 0:
+        return
+    if cancel is None:
+        time.sleep(seconds)
+    elif cancel.wait(seconds):
+        raise CancelledError()
+
+
+class BackendGuard:
+    """
+    Rate limiter, retries and circuit breaker around the calls to one quota.
+
+    Share one guard between every client of the same provider, key and
+    model (see get_guard) so they pace and trip together.
+    """
+
+    def __init__(self, name: str, rpm: float = 0, tpm: float = 0,
+                 max_retries: int = LLM_MAX_RETRIES, max_wait: float = LLM_MAX_WAIT,
+                 burst_seconds: float = BURST_SECONDS):
+        self.name = name
+        self.limiter = RateLimiter(rpm, tpm, burst_seconds=burst_seconds)
+        self.breaker = CircuitBreaker()
+        self.max_retries = max_retries
+        self.max_wait = max_wait
+        self.counts = {'retries': 0, 'throttled': 0}
+        self._lock = threading.Lock()
+
+    def _count(self, key: str):
+        with self._lock:
+            self.counts[key] += 1
+
+    def _admit(self, tokens: int) -> float:
+        if not self.breaker.allow():
+            raise BackendUnavailable(f"{self.name} is failing; circuit open for another "
+                                     f"{self.breaker.retry_in():.0f}s")
+        return self.limiter.reserve(tokens, self.max_wait)
+
+    def _retry_delay(self, error: LLMAPIError, attempt: int) -> float:
+        """Seconds to back off before retrying after error; re-raises it when giving up."""
+        if not error.retryable:
+            raise error
+        if error.status == 429:
+            self._count('throttled')
+            pause = error.retry_after if error.retry_after is not None else backoff_delay(attempt)
+            self.limiter.pause(pause)
+            if pause > self.max_wait:
+                raise error
+            delay = 0.0  # the next reservation waits out the pause
+        else:
+            self.breaker.record_failure()
+            delay = backoff_delay(attempt)
+        if attempt >= self.max_retries or self.breaker.state != 'closed':
+            raise error
+        self._count('retries')
+        return delay
+
+    def call(self, send, tokens: int, cancel: threading.Event = None):
+        """
+        Run send() within the quota, retrying LLMAPIErrors that allow it.
+
+        Setting ``cancel`` interrupts a wait with concurrent.futures.CancelledError.
+
+        Raises:
+            BackendUnavailable: If the circuit is open or the quota is exhausted
+            LLMAPIError: The last error once retries are used up
+        """
+        for attempt in itertools.count():
+            _sleep(self._admit(tokens), cancel)
+            try:
+                result = send()
+            except LLMAPIError as e:
+                _sleep(self._retry_delay(e, attempt), cancel)
+                continue
+            self.breaker.record_success()
+            return result
+
+    async def call_async(self, send, tokens: int):
+        """call() for a coroutine function; waits with asyncio.sleep."""
+        for attempt in itertools.count():
+            wait = self._admit(tokens)
+            if wait:
+                await asyncio.sleep(wait)
+            try:
+                result = await send()
+            except LLMAPIError as e:
+                delay = self._retry_delay(e, attempt)
+                if delay:
+                    await asyncio.sleep(delay)
+                continue
+            self.breaker.record_success()
+            return result
+
+    def stats(self) -> dict:
+        return {
+            **self.counts,
+            'circuit': self.breaker.state,
+            'circuit_opened': self.breaker.opened,
+        }
+
+
+_guards = {}
+_guards_lock = threading.Lock()
+
+
+def get_guard(name: str, rpm: float = 0, tpm: float = 0) -> BackendGuard:
+    """The shared guard for a quota, created with its limits on first use."""
+    guard = _guards.get(name)
+    if guard is None:
+        with _guards_lock:
+            guard = _guards.get(name)
+            if guard is None:
+                guard = _guards[name] = BackendGuard(name, rpm, tpm)
+    return guard
@@ -0,0 +1,90 @@
+"""
+SQL Router
+Decides which path turns a question into SQL: the rule-based fast path,
+the question cache, or a live LLM call. Counts how often each path serves
+a request and appends every generated statement to the index advisor's
+workload log.
+"""
+
+import asyncio
+import threading
+from typing import Tuple
+
+from database.index_advisor import record_workload
+from llm.intent_matcher import match_intent
+from llm.prompt_builder import build_prompt
+from llm.query_cache import DEFAULT_DB_PATH, get_query_cache, get_schema_fingerprint, get_sql_cached
+
+SOURCE_RULES = 'rules'
+SOURCE_CACHE = 'cache'
+SOURCE_LLM = 'llm'
+
+_source_counts = {SOURCE_RULES: 0, SOURCE_CACHE: 0, SOURCE_LLM: 0}
+_counts_lock = threading.Lock()
+
+
+def _record(source: str):
+    with _counts_lock:
+        _source_counts[source] += 1
+
+
+def generate_sql(user_query: str, db_path: str = DEFAULT_DB_PATH) -> Tuple[str, str]:
+    """
+    Convert a question to SQL using the cheapest path that can answer it.
+
+    Args:
+        user_query (str): Natural language question from the user
+        db_path (str): Database whose schema the SQL targets
+
+    Returns:
+        tuple: (sql, source) where source is 'rules', 'cache' or 'llm'
+    """
+    match = match_intent(user_query)
+    if match is not None:
+        sql, source = match.sql, SOURCE_RULES
+    else:
+        sql, cache_hit = get_sql_cached(user_query, db_path)
+        source = SOURCE_CACHE if cache_hit else SOURCE_LLM
+
+    _record(source)
+    record_workload(sql, source)
+    return sql, source
+
+
+async def generate_sql_async(user_query: str, client, db_path: str = DEFAULT_DB_PATH,
+                             executor=None) -> Tuple[str, str]:
+    """
+    asyncio counterpart of generate_sql.
+
+    The LLM call is awaited on ``client`` (an AsyncGroqClient); cache I/O
+    runs on ``executor`` so the event loop never blocks on SQLite.
+
+    Returns:
+        tuple: (sql, source) where source is 'rules', 'cache' or 'llm'
+    """
+    loop = asyncio.get_running_loop()
+    match = match_intent(user_query)
+    if match is not None:
+        sql, source = match.sql, SOURCE_RULES
+    else:
+        cache = get_query_cache()
+        fingerprint = await loop.run_in_executor(executor, get_schema_fingerprint, db_path)
+        key = cache.make_key(user_query, client.model, fingerprint)
+        sql = await loop.run_in_executor(executor, cache.get, key)
+        if sql is not None:
+            source = SOURCE_CACHE
+        else:
+            prompt = await loop.run_in_executor(executor, build_prompt, user_query, db_path)
+            sql = await client.get_sql(user_query, prompt=prompt)
+            await loop.run_in_executor(executor, cache.set, key, user_query, sql)
+            source = SOURCE_LLM
+
+    _record(source)
+    record_workload(sql, source)  # only enqueues; safe on the event loop
+    return sql, source
+
+
+def source_stats() -> dict:
+    """Return how many requests each path has served."""
+    with _counts_lock:
+        return dict(_source_counts)
@@ -0,0 +1,166 @@
+"""
+Streaming SQL Extraction
+Parses a chat-completions stream token by token and returns the SQL
+statement as soon as it is complete, so the caller can close the stream
+instead of waiting for closing fences, explanations or the rest of
+max_tokens.
+
+<think> sections are dropped as they arrive. The statement starts at the
+first SELECT / WITH at the start of a line or right after a code fence,
+and is complete at a terminating ``;``, a closing fence or a blank line,
+provided its parentheses are balanced and no string literal is open.
+"""
+
+import json
+import re
+from typing import Optional, Tuple
+
+THINK_OPEN = '<think>'
+THINK_CLOSE = '</think>'
+
+_SQL_START = re.compile(r'(?:^|\n|`)[ \t]*((?:SELECT|WITH)\b)', re.I)
+
+
+def _partial_suffix(text: str, tag: str) -> int:
+    """Length of the longest end of text that could be the start of tag."""
+    for length in range(min(len(tag) - 1, len(text)), 0, -1):
+        if text.endswith(tag[:length]):
+            return length
+    return 0
+
+
+def parse_sse_line(line: str) -> Tuple[bool, Optional[str]]:
+    """
+    Read one line of an OpenAI-style server-sent event stream.
+
+    Returns:
+        tuple: (done, content) where content is the text delta, if any.
+        done is only set by the final ``[DONE]``, so a stream read to
+        the end leaves its connection reusable.
+    """
+    if not line or not line.startswith('data:'):
+        return False, None
+    data = line[5:].strip()
+    if data == '[DONE]':
+        return True, None
+    try:
+        choice = json.loads(data)['choices'][0]
+    except (ValueError, KeyError, IndexError):
+        return False, None
+    return False, (choice.get('delta') or {}).get('content')
+
+
+class SqlStreamParser:
+    """
+    Incremental SQL extractor for a completion arriving in pieces.
+
+    feed() returns the statement (whitespace collapsed, without the
+    trailing ``;``) once it is complete, else None. When the stream ends
+    first, finish() returns whatever statement was started, or None if
+    no SQL was recognised.
+    """
+
+    def __init__(self):
+        self.text = ''        # everything received, for the non-streaming fallback
+        self.sql = None
+        self._pos = 0         # how far self.text has been split into visible / thinking
+        self._in_think = False
+        self._visible = ''    # received text outside <think> sections
+        self._start = None    # where the statement starts in _visible
+        self._scan = 0        # how far the statement has been scanned
+        self._depth = 0
+        self._quote = None
+        self._comment = None  # start of the -- comment being scanned
+        self._comments = []   # (start, end) of -- comments, cut from the statement
+
+    def feed(self, chunk: str) -> Optional[str]:
+        """Add a piece of the completion; return the SQL once it is complete."""
+        if self.sql is not None:
+            return self.sql
+        self.text += chunk
+        self._advance_visible()
+        if self._start is None:
+            match = _SQL_START.search(self._visible)
+            if match is None:
+                return None
+            self._start = self._scan = match.start(1)
+        return self._scan_statement()
+
+    def finish(self) -> Optional[str]:
+        """The statement at the end of the stream, complete or not."""
+        if self.sql is None and self._start is not None and self._quote is None:
+            self._visible += self.text[self._pos:] if not self._in_think else ''
+            self._pos = len(self.text)
+            end = self._visible.find('```', self._start)
+            if self._comment is not None:
+                self._comments.append((self._comment, len(self._visible)))
+            self.sql = self._statement(end if end >= 0 else len(self._visible))
+        return self.sql
+
+    def _advance_visible(self):
+        """Move received text into _visible, skipping <think> sections.
+
+        A tail that may be the start of a tag is held back until the next
+        chunk shows what it is.
+        """
+        text = self.text
+        while True:
+            if self._in_think:
+                end = text.find(THINK_CLOSE, self._pos)
+                if end < 0:
+                    self._pos = max(self._pos, len(text) - len(THINK_CLOSE) + 1)
+                    return
+                self._pos = end + len(THINK_CLOSE)
+                self._in_think = False
+            else:
+                start = text.find(THINK_OPEN, self._pos)
+                if start < 0:
+                    stop = len(text) - _partial_suffix(text, THINK_OPEN)
+                    self._visible += text[self._pos:stop]
+                    self._pos = stop
+                    return
+                self._visible += text[self._pos:start]
+                self._pos = start + len(THINK_OPEN)
+                self._in_think = True
+
+    def _scan_statement(self) -> Optional[str]:
+        text = self._visible
+        i = self._scan
+        while i < len(text):
+            ch = text[i]
+            if self._comment is not None:
+                if ch == '\n':
+                    self._comments.append((self._comment, i))
+                    self._comment = None
+            elif self._quote is not None:
+                if ch == self._quote:
+                    self._quote = None
+            elif ch in '\'"':
+                self._quote = ch
+            elif ch == '(':
+                self._depth += 1
+            elif ch == ')':
+                self._depth -= 1
+            elif ch == '-':
+                if i + 1 >= len(text):
+                    break  # can't tell a comment from a minus yet
+                if text[i + 1] == '-':
+                    self._comment = i
+            elif self._depth <= 0 and ch in ';`\n':
+                if ch != ';' and i + 2 >= len(text):
+                    break  # can't tell a fence or blank line apart yet
+                if ch == ';' or text.startswith('```', i) or text.startswith('\n\n', i):
+                    self.sql = self._statement(i)
+                    return self.sql
+            i += 1
+        self._scan = i
+        return None
+
+    def _statement(self, end: int) -> str:
+        """The statement up to end, comments removed and whitespace collapsed."""
+        parts, start = [], self._start
+        for comment_start, comment_end in self._comments:
+            parts.append(self._visible[start:comment_start])
+            start = comment_end
+        parts.append(self._visible[start:end])
+        return ' '.join(' '.join(parts).split()).rstrip(';').strip()
@@ -6,6 +6,9 @@ A sophisticated sales analysis chatbot powered by AI
 
 import os
 import sys
+import argparse
+
+SERVER_MODES = ('sync', 'async')
 
 def show_menu():
     """Display the main menu options."""
@@ -21,8 +24,44 @@ def show_menu():
     print("7. ❌ Exit")
     print("-" * 55)
 
+def parse_args():
+    """Parse startup flags."""
+    parser = argparse.ArgumentParser(description="Sales Chatbot - AI-Powered Sales Analysis")
+    parser.add_argument('--server-mode', choices=SERVER_MODES,
+                        default=os.getenv('WEB_SERVER_MODE', 'sync'),
+                        help="web server implementation: 'sync' (Flask) or 'async' (ASGI, Starlette); "
+                             "both serve the same routes and web UI")
+    parser.add_argument('--web', action='store_true',
+                        help="start the web server immediately instead of showing the menu")
+    parser.add_argument('--host', default=os.getenv('HOST', '0.0.0.0'), help="web server host")
+    parser.add_argument('--port', type=int, default=int(os.getenv('PORT', '5000')),
+                        help="web server port")
+    return parser.parse_args()
+
+def start_web_server(mode='sync', host='0.0.0.0', port=5000):
+    """Start the web server in the chosen mode."""
+    print(f"\n🌐 Starting web server ({mode} mode)...")
+    print(f"📱 The web UI will be available at: http://localhost:{port}")
+    print("⚡ Press Ctrl+C to stop the server")
+    try:
+        if mode == 'async':
+            from async_server import run
+            run(host=host, port=port)
+        else:
+            from web_server import app
+            app.run(debug=False, host=host, port=port, threaded=True)
+    except ImportError as e:
+        print(f"❌ Error importing web server: {e}")
+    except Exception as e:
+        print(f"❌ Error starting web server: {e}")
+
 def main():
     """Main application entry point."""
+    args = parse_args()
+    if args.web:
+        start_web_server(args.server_mode, args.host, args.port)
+        return
+    
     while True:
         show_menu()
         choice = input("Enter your choice (1-7): ").strip()
@@ -48,16 +87,7 @@ def main():
                 print(f"❌ Error running demo: {e}")
         
         elif choice == "3":
-            print("\n🌐 Starting web server...")
-            print("📱 The web UI will be available at: http://localhost:5000")
-            print("⚡ Press Ctrl+C to stop the server")
-            try:
-                from web_server import app
-                app.run(debug=False, host='0.0.0.0', port=5000)
-            except ImportError as e:
-                print(f"❌ Error importing web server: {e}")
-            except Exception as e:
-                print(f"❌ Error starting web server: {e}")
+            start_web_server(args.server_mode, args.host, args.port)
         
         elif choice == "4":
             print("\n🗄️  Showing database contents...")
@@ -0,0 +1,214 @@
+"""
+Request Metrics
+Histograms, counters and gauges for the query hot path, rendered in the
+Prometheus text exposition format by the /metrics endpoint. Each metric
+is a handful of numbers behind a lock, so recording costs microseconds
+and needs no extra dependency.
+"""
+
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+
+# Seconds; spans cached rule-path answers through slow LLM calls
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+ROW_BUCKETS = (0, 1, 10, 100, 1000, 10000, 100000, 1000000)
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+def _escape(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def format_labels(labels: dict) -> str:
+    """Render {'a': 'x'} as '{a="x"}' (empty string for no labels)."""
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in labels.items()) + '}'
+
+
+def format_value(value) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def render_metric(name: str, kind: str, help_text: str, samples) -> str:
+    """
+    Render one metric family.
+
+    Args:
+        samples: iterable of (labels dict, value) pairs
+    """
+    lines = [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}"]
+    lines += [f"{name}{format_labels(labels)} {format_value(value)}" for labels, value in samples]
+    return '\n'.join(lines) + '\n'
+
+
+class _Metric:
+    kind = 'untyped'
+
+    def __init__(self, name: str, help_text: str, labelnames=(), registry=None):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values = {}
+        (registry or REGISTRY).register(self)
+
+    def _key(self, labels: dict) -> tuple:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def _labels(self, key: tuple) -> dict:
+        return dict(zip(self.labelnames, key))
+
+
+class Counter(_Metric):
+    """Monotonically increasing count"""
+    kind = 'counter'
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+
+    def render(self) -> str:
+        with self._lock:
+            samples = [(self._labels(key), value) for key, value in sorted(self._values.items())]
+        if not samples and not self.labelnames:
+            samples = [({}, 0)]
+        return render_metric(self.name, self.kind, self.help, samples)
+
+
+class Gauge(Counter):
+    """Value that goes up and down"""
+    kind = 'gauge'
+
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+    @contextmanager
+    def track(self, **labels):
+        """Count the enclosed block as in progress."""
+        self.inc(**labels)
+        try:
+            yield
+        finally:
+            self.dec(**labels)
+
+
+class Histogram(_Metric):
+    """Bucketed distribution with a running sum and count"""
+    kind = 'histogram'
+
+    def __init__(self, name: str, help_text: str, labelnames=(), buckets=LATENCY_BUCKETS,
+                 registry=None):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, help_text, labelnames, registry)
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            state[0][index] += 1
+            state[1] += value
+            state[2] += 1
+
+    def render(self) -> str:
+        with self._lock:
+            snapshot = [(key, list(state[0]), state[1], state[2])
+                        for key, state in sorted(self._values.items())]
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        for key, counts, total, count in snapshot:
+            labels = self._labels(key)
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += bucket_count
+                bucket_labels = format_labels({**labels, 'le': format_value(bound)})
+                lines.append(f"{self.name}_bucket{bucket_labels} {cumulative}")
+            lines.append(f"{self.name}_sum{format_labels(labels)} {format_value(total)}")
+            lines.append(f"{self.name}_count{format_labels(labels)} {count}")
+        return '\n'.join(lines) + '\n'
+
+
+class Registry:
+    """The metrics rendered by /metrics"""
+
+    def __init__(self):
+        self._metrics = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+
+    def render(self) -> str:
+        return ''.join(metric.render() for metric in self._metrics)
+
+
+REGISTRY = Registry()
+
+PHASE_SECONDS = Histogram(
+    'sales_chatbot_phase_seconds',
+    'Time spent in each phase of answering a question',
+    ('phase',))
+SQL_GENERATION_SECONDS = Histogram(
+    'sales_chatbot_sql_generation_seconds',
+    'Question to SQL time by path; source="llm" is the Groq round trip',
+    ('source',))
+RESULT_ROWS = Histogram(
+    'sales_chatbot_result_rows',
+    'Rows returned per query',
+    buckets=ROW_BUCKETS)
+ERRORS = Counter(
+    'sales_chatbot_errors_total',
+    'Failed questions by the phase that failed and error class',
+    ('phase', 'error'))
+IN_FLIGHT = Gauge(
+    'sales_chatbot_queries_in_flight',
+    'Questions currently being answered')
+
+
+def record_error(phase: str, error):
+    """Count a failure under its phase and exception class (or a given class name)."""
+    ERRORS.inc(phase=phase, error=error if isinstance(error, str) else type(error).__name__)
+
+
+class PhaseTimer:
+    """
+    Times the phases of one request.
+
+    Each phase is observed in PHASE_SECONDS as it finishes and kept for
+    the per-request breakdown returned to the client.
+    """
+
+    def __init__(self):
+        self.phases = {}
+        # Phase that raised, if any; None while nothing has failed
+        self.failed = None
+
+    @contextmanager
+    def phase(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        except BaseException:
+            self.failed = name
+            raise
+        finally:
+            elapsed = time.perf_counter() - start
+            self.phases[name] = self.phases.get(name, 0.0) + elapsed
+            PHASE_SECONDS.observe(elapsed, phase=name)
+
+    def breakdown(self) -> dict:
+        """Phase durations in milliseconds, keyed '<phase>_ms'."""
+        return {f"{name}_ms": round(seconds * 1000, 3) for name, seconds in self.phases.items()}
@@ -24,8 +24,7 @@ def setup_database():
     print("🗄️  Setting up database...")
     try:
         # Import and run database setup
-        sys.path.append(os.path.join(os.path.dirname(__file__), 'data'))
-        from setup_database import main as setup_db
+        from data.setup_database import main as setup_db
         setup_db()
         print("✅ Database created and populated successfully!")
         return True
@@ -6,11 +6,10 @@ Shows complete database contents for the Sales Chatbot
 
 import sqlite3
 from tabulate import tabulate
+from database.connection_pool import DB_PATH
 
 def show_database_contents():
     """Display all database contents in a formatted way"""
-    DB_PATH = "data/sales.db"
-    
     try:
         conn = sqlite3.connect(DB_PATH)
         cursor = conn.cursor()
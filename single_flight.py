@@ -0,0 +1,116 @@
+"""
+Single-Flight Request Coalescing
+Lets concurrent callers asking for the same key share one computation:
+the first caller (the leader) runs it, everyone who arrives while it is in
+flight waits and receives the same result or exception. Used to collapse
+bursts of identical questions into one LLM call and one SQLite query.
+"""
+
+import asyncio
+import threading
+
+
+class _Call:
+    """One in-flight computation and the callers waiting on it"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class _Counters:
+    """Leader / merged counters shared by the thread and asyncio variants"""
+
+    def __init__(self):
+        self._counts_lock = threading.Lock()
+        self.leaders = 0
+        self.merged = 0
+
+    def _count(self, merged: bool):
+        with self._counts_lock:
+            if merged:
+                self.merged += 1
+            else:
+                self.leaders += 1
+
+    def stats(self) -> dict:
+        """Return computations run, requests merged into them and what is in flight."""
+        with self._counts_lock:
+            total = self.leaders + self.merged
+            return {
+                'computations': self.leaders,
+                'merged': self.merged,
+                'in_flight': len(self._calls),
+                'merge_rate': round(self.merged / total, 4) if total else 0.0,
+            }
+
+
+class SingleFlight(_Counters):
+    """Coalesce identical concurrent calls made from threads"""
+
+    def __init__(self):
+        super().__init__()
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    def do(self, key, func, *args, **kwargs):
+        """
+        Run ``func(*args, **kwargs)`` unless a call for ``key`` is already running.
+
+        Returns:
+            tuple: (result, shared) where shared is True if this caller
+            received another caller's result
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+        self._count(merged=not leader)
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+
+        try:
+            call.result = func(*args, **kwargs)
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            # Forget the key before waking waiters so later arrivals start
+            # a fresh computation instead of reusing a finished one
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result, False
+
+
+class AsyncSingleFlight(_Counters):
+    """Coalesce identical concurrent calls made from one event loop"""
+
+    def __init__(self):
+        super().__init__()
+        self._calls = {}
+
+    async def do(self, key, coro_func, *args, **kwargs):
+        """
+        Await ``coro_func(*args, **kwargs)`` unless a call for ``key`` is already running.
+
+        Returns:
+            tuple: (result, shared) as for SingleFlight.do
+        """
+        task = self._calls.get(key)
+        if task is not None:
+            self._count(merged=True)
+            # shield: a cancelled waiter must not cancel the shared task
+            return await asyncio.shield(task), True
+
+        self._count(merged=False)
+        task = asyncio.ensure_future(coro_func(*args, **kwargs))
+        self._calls[key] = task
+        task.add_done_callback(lambda _: self._calls.pop(key, None))
+        return await asyncio.shield(task), False
@@ -0,0 +1,31 @@
+import io
+
+import pytest
+
+pa = pytest.importorskip('pyarrow')
+pq = pytest.importorskip('pyarrow.parquet')
+
+from database.export import ExportError, export_rows
+
+
+def read(fmt, data):
+    return pa.ipc.open_stream(data).read_all() if fmt == 'arrow' else pq.read_table(io.BytesIO(data))
+
+
+@pytest.mark.parametrize('fmt', ['arrow', 'parquet'])
+def test_int_column_with_later_floats_is_widened(fmt):
+    batches = [[(1, 2), (2, 3)], [(3, 158.58)]]
+    table = read(fmt, b''.join(export_rows(fmt, ['id', 'revenue'], batches, ['INTEGER', ''])))
+    assert table.schema.types == [pa.int64(), pa.float64()]
+    assert table.column('revenue').to_pylist() == [2.0, 3.0, 158.58]
+
+
+def test_single_batch_keeps_ints():
+    table = read('arrow', b''.join(export_rows('arrow', ['n'], [[(1,), (2,)]])))
+    assert table.schema.types == [pa.int64()]
+
+
+def test_fractional_value_in_integer_column_is_not_truncated():
+    chunks = export_rows('arrow', ['n'], [[(1,)], [(2.5,)]], ['INTEGER'])
+    with pytest.raises(ExportError):
+        b''.join(chunks)
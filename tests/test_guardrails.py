@@ -0,0 +1,42 @@
+import re
+import sqlite3
+
+import pytest
+
+from database.guardrails import scan_cost
+
+SQL = "SELECT * FROM orders o, customers c"
+
+
+class OldPlanConnection:
+    """Reports EXPLAIN QUERY PLAN steps the way SQLite < 3.36 did: "SCAN TABLE orders AS o"."""
+
+    def __init__(self, conn):
+        self.conn = conn
+
+    def execute(self, sql, *args):
+        if not sql.startswith('EXPLAIN QUERY PLAN'):
+            return self.conn.execute(sql, *args)
+        rows = self.conn.execute(sql, *args).fetchall()
+        tables = {'o': 'orders', 'c': 'customers'}
+        return [(id_, parent, unused, re.sub(r'^SCAN (\w+)', lambda m: f"SCAN TABLE {tables[m[1]]} AS {m[1]}",
+                                             detail))
+                for id_, parent, unused, detail in rows]
+
+
+@pytest.fixture
+def conn():
+    conn = sqlite3.connect(':memory:')
+    conn.execute("CREATE TABLE orders (order_id INTEGER PRIMARY KEY, customer_id INTEGER)")
+    conn.execute("CREATE TABLE customers (customer_id INTEGER PRIMARY KEY, name TEXT)")
+    conn.executemany("INSERT INTO orders VALUES (?, ?)", [(i, i) for i in range(1, 101)])
+    conn.executemany("INSERT INTO customers VALUES (?, ?)", [(i, 'x') for i in range(1, 51)])
+    yield conn
+    conn.close()
+
+
+@pytest.mark.parametrize('wrap', [lambda conn: conn, OldPlanConnection], ids=['current', 'pre-3.36'])
+def test_scan_cost_reads_both_plan_formats(conn, wrap):
+    cost, tables = scan_cost(wrap(conn), SQL)
+    assert cost == 100 * 50
+    assert sorted(tables) == ['customers', 'orders']
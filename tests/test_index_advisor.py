@@ -0,0 +1,45 @@
+import json
+import sqlite3
+
+from database.index_advisor import advise
+
+WORKLOAD = [
+    "SELECT * FROM orders WHERE status = 'completed'",
+    "DELETE FROM orders WHERE 1=1",
+    "DROP TABLE customers",
+    "WITH doomed AS (SELECT order_id FROM orders) DELETE FROM orders WHERE order_id IN doomed",
+    "SELECT 1; DELETE FROM orders",
+    "SELECT * FROM orders o1, orders o2, orders o3, orders o4",
+]
+
+
+def counts(db_path):
+    conn = sqlite3.connect(db_path)
+    try:
+        return {table: conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+                for table in ('customers', 'orders')}
+    finally:
+        conn.close()
+
+
+def test_advisor_never_writes_logged_statements(tmp_path):
+    db_path = str(tmp_path / 'shop.db')
+    conn = sqlite3.connect(db_path)
+    conn.execute("CREATE TABLE customers (customer_id INTEGER PRIMARY KEY, name TEXT)")
+    conn.execute("CREATE TABLE orders (order_id INTEGER PRIMARY KEY, customer_id INTEGER, status TEXT)")
+    conn.executemany("INSERT INTO customers VALUES (?, ?)", [(i, f'c{i}') for i in range(1, 51)])
+    conn.executemany("INSERT INTO orders VALUES (?, ?, ?)",
+                     [(i, i % 50 + 1, ('completed', 'pending')[i % 2]) for i in range(1, 501)])
+    conn.commit()
+    conn.close()
+    log_path = tmp_path / 'workload.jsonl'
+    log_path.write_text(''.join(json.dumps({'sql': sql}) + '\n' for sql in WORKLOAD))
+    before = counts(db_path)
+
+    report = advise(db_path, str(log_path), repeat=1)
+
+    assert counts(db_path) == before
+    analyzed = {query['sql']: query for query in report['queries']}
+    assert 'time_before_ms' in analyzed[WORKLOAD[0]]
+    assert 'error' in analyzed[WORKLOAD[5]]  # rejected by the plan check, never run
+    assert report['skipped'] == 2
@@ -0,0 +1,34 @@
+import sqlite3
+
+import pytest
+from werkzeug.datastructures import MultiDict
+
+from database.pagination import PaginationError, fetch_page
+
+
+@pytest.fixture
+def conn():
+    conn = sqlite3.connect(':memory:')
+    conn.execute("CREATE TABLE orders (order_id INTEGER PRIMARY KEY, order_date TEXT, status TEXT)")
+    conn.executemany("INSERT INTO orders VALUES (?, ?, ?)",
+                     [(i, f'2024-01-{i:02d}', ('completed', 'refunded', 'pending')[i % 3])
+                      for i in range(1, 13)])
+    yield conn
+    conn.close()
+
+
+def statuses(page):
+    return {row['status'] for row in page['data']}
+
+
+def test_repeated_filter_matches_any_value(conn):
+    args = MultiDict([('status', 'completed'), ('status', 'refunded'), ('_', '1700000000')])
+    assert statuses(fetch_page(conn, 'orders', filters=args)) == {'completed', 'refunded'}
+    args = MultiDict([('status__ne', 'completed'), ('status__ne', 'refunded')])
+    assert statuses(fetch_page(conn, 'orders', filters=args)) == {'pending'}
+
+
+def test_repeated_range_filter_is_rejected(conn):
+    args = MultiDict([('order_date__gt', '2024-01-02'), ('order_date__gt', '2024-01-05')])
+    with pytest.raises(PaginationError):
+        fetch_page(conn, 'orders', filters=args)
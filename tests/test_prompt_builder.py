@@ -0,0 +1,20 @@
+import sqlite3
+
+from llm.prompt_builder import build_prompt
+
+
+def test_tight_budget_keeps_enum_values(tmp_path):
+    db_path = str(tmp_path / 'shop.db')
+    conn = sqlite3.connect(db_path)
+    conn.execute("CREATE TABLE customers (customer_id INTEGER PRIMARY KEY, name TEXT, email TEXT, "
+                 "join_date TEXT, customer_type TEXT)")
+    conn.executemany("INSERT INTO customers VALUES (?, ?, ?, ?, ?)",
+                     [(i, f'name {i}', f'c{i}@example.com', f'2024-01-{i % 28 + 1:02d}',
+                       ('regular', 'premium', 'vip')[i % 3]) for i in range(60)])
+    conn.commit()
+    conn.close()
+
+    prompt = build_prompt("How many customers are there?", db_path, token_budget=1)
+    assert "customer_type 'regular'|'premium'|'vip'" in prompt
+    assert 'YYYY-MM-DD' not in prompt
+    assert 'email' not in prompt
@@ -0,0 +1,20 @@
+from llm.query_cache import QueryCache, normalize_question
+
+
+def test_operators_are_kept():
+    assert normalize_question("Orders with price > 100") != normalize_question("Orders with price < 100")
+    assert normalize_question("price >= 100") != normalize_question("price = 100")
+    assert normalize_question("price != 5") != normalize_question("price 5")
+    assert normalize_question("balance below -5") != normalize_question("balance below 5")
+    assert normalize_question("price 10.5") != normalize_question("price 105")
+
+
+def test_cosmetic_differences_fold():
+    assert normalize_question("Show me the VIP customers?") == normalize_question("show vip   customers")
+    assert normalize_question("Show all orders.") == normalize_question("show all orders")
+    assert normalize_question("top-10 products") == normalize_question("top 10 products")
+
+
+def test_operator_questions_get_separate_cache_keys():
+    key = lambda q: QueryCache.make_key(q, 'model', 'schema')
+    assert key("orders with price > 100") != key("orders with price < 100")
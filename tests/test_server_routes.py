@@ -0,0 +1,8 @@
+import async_server
+import web_server
+
+
+def test_async_server_serves_the_flask_routes():
+    flask_routes = {rule.rule for rule in web_server.app.url_map.iter_rules() if rule.endpoint != 'static'}
+    async_routes = {route.path for route in async_server.app.routes}
+    assert flask_routes == async_routes
@@ -4,7 +4,7 @@ Sales Chatbot Web Server
 A Flask web server that provides REST API endpoints for the web UI
 """
 
-from flask import Flask, request, jsonify, render_template_string
+from flask import Flask, Response, request, jsonify, render_template_string, stream_with_context
 from flask_cors import CORS
 import sqlite3
 import os
@@ -12,10 +12,34 @@ import json
 import time
 from datetime import datetime
 from tabulate import tabulate
+try:
+    import orjson
+except ImportError:  # encode_json falls back to the json module
+    orjson = None
 
 # Import functions from chat_bot module
-from chat_bot import execute_query
-from llm.llm_interface import get_sql_from_query
+from chat_bot import (run_query, iter_query, iter_in_order, run_batch, column_types, BATCH_CONCURRENCY,
+                      DB_PATH)
+from database.connection_pool import get_pool
+from database.export import (EXPORT_BATCH_ROWS, EXPORT_FORMATS, SQL_REGISTRY, ExportError,
+                             check_format, export_rows)
+from database.guardrails import QUERY_MAX_ROWS, QueryRejected
+from database.result_cache import get_result_cache
+from database.pagination import PAGE_TABLES, PaginationError, fetch_page
+from database.summary_tables import read_stats
+from llm.query_cache import get_query_cache, normalize_question
+from llm.backends import backend_stats
+from llm.sql_router import generate_sql, source_stats
+from single_flight import SingleFlight
+from html_table import render_html_table
+from http_cache import (StaticAsset, data_validators, is_compressible, is_not_modified, negotiate,
+                        validator_headers, COMPRESS_MIN_BYTES)
+from metrics import (CONTENT_TYPE, IN_FLIGHT, PHASE_SECONDS, REGISTRY, RESULT_ROWS,
+                     SQL_GENERATION_SECONDS, PhaseTimer, record_error, render_metric)
+
+BATCH_MAX_QUESTIONS = int(os.getenv('BATCH_MAX_QUESTIONS', '1000'))
+# Row layouts /api/query can send; see parse_result_format
+RESULT_FORMATS = ('records', 'compact', 'columnar')
 
 app = Flask(__name__)
 CORS(app)  # Enable CORS for all routes
@@ -30,59 +54,164 @@ class SalesChatBot:
         # Check if API key is available
         if not os.environ.get('GROQ_API_KEY'):
             print("❌ Warning: GROQ_API_KEY not found in environment variables. Please check your .env file.")
+        
+        # Identical questions asked concurrently share one LLM + SQL run
+        self.flights = SingleFlight()
+    
+    @staticmethod
+    def flight_key(user_input, use_cache=True):
+        """Key under which concurrent identical questions are coalesced"""
+        return normalize_question(user_input), use_cache
     
-    def process_query(self, user_input):
-        """Process a natural language query and return structured results"""
+    def process_query(self, user_input, use_cache=True):
+        """Process a natural language query and return structured results
+
+        use_cache=False bypasses the SQL result cache for this request.
+        Concurrent calls with the same normalized question wait for one
+        computation; their results carry coalesced=True.
+        """
+        with IN_FLIGHT.track():
+            result, shared = self.flights.do(self.flight_key(user_input, use_cache),
+                                             self._process_query, user_input, use_cache)
+        return dict(result, coalesced=shared)
+    
+    def _process_query(self, user_input, use_cache=True):
+        """Generate and run the SQL for one question"""
         start_time = time.time()
+        timer = PhaseTimer()
         
         try:
             print(f"Processing query: {user_input}")
             
-            # Generate SQL query
-            sql = get_sql_from_query(user_input)
-            print(f"Generated SQL: {sql}")
+            # Generate SQL query (rule-based fast path, then cache, then LLM)
+            with timer.phase('sql_generation'):
+                sql, source = generate_sql(user_input, DB_PATH)
+            SQL_GENERATION_SECONDS.observe(timer.phases['sql_generation'], source=source)
+            print(f"Generated SQL ({source}): {sql}")
 
             # Execute query
-            headers, results = execute_query(sql)
+            with timer.phase('sql_execution'):
+                headers, results, truncated = run_query(sql, use_cache=use_cache)
             
-            execution_time = round(time.time() - start_time, 2)
+            return self._build_result(user_input, sql, source, headers, results, start_time, timer,
+                                      truncated)
 
-            if isinstance(results, str):  # It's an error message
-                return {
-                    'success': False,
-                    'error': results,
-                    'sql_query': sql,
-                    'execution_time': execution_time
-                }
-            
-            # Convert results to list of dictionaries for JSON serialization
-            sql_result = []
-            if headers and results:
-                sql_result = [dict(zip(headers, row)) for row in results]
-            
-            # Generate natural language response
-            response = self._generate_response(user_input, sql_result, headers)
-            
+        except Exception as e:
+            return self._build_error(e, start_time, timer)
+    
+    def _build_result(self, user_input, sql, source, headers, results, start_time, timer=None,
+                      truncated=False):
+        """Turn executed SQL results into the process_query result dict"""
+        timer = timer or PhaseTimer()
+
+        if isinstance(results, str):  # It's an error message
+            # Guardrail messages start "❌ Query rejected" / "❌ Query stopped"
+            record_error('sql_execution', 'QueryRejected' if results.startswith('❌ Query ') else 'SQLError')
             return {
+                'success': False,
+                'error': results,
+                'sql_query': sql,
+                'execution_time': self._finish(start_time),
+                'phases': timer.breakdown()
+            }
+        
+        RESULT_ROWS.observe(len(results))
+        
+        # Rows stay tuples here; build_query_payload converts them to dicts
+        # only for the "records" format
+        if not headers:
+            results = []
+        
+        # Generate natural language response
+        with timer.phase('response'):
+            response = self._generate_response(user_input, results, headers)
+            if truncated:
+                response += f" Showing the first {QUERY_MAX_ROWS:,} rows; the full result is larger."
+        
+        return {
+            'success': True,
+            'response': response,
+            'sql_query': sql,
+            'sql_id': SQL_REGISTRY.register(sql),
+            'columns': headers,
+            'rows': results,
+            'source': source,
+            'cache_hit': source == 'cache',
+            'truncated': truncated,
+            'execution_time': self._finish(start_time),
+            'phases': timer.breakdown()
+        }
+    
+    def _build_error(self, error, start_time, timer=None):
+        """Build the process_query result dict for an unexpected failure"""
+        record_error(timer.failed if timer and timer.failed else 'unknown', error)
+        error_msg = f"Error processing query: {str(error)}"
+        print(error_msg)
+        return {
+            'success': False,
+            'error': error_msg,
+            'execution_time': self._finish(start_time),
+            'phases': timer.breakdown() if timer else {}
+        }
+    
+    @staticmethod
+    def _finish(start_time):
+        """Record the total time of a question and return it rounded for the response"""
+        elapsed = time.time() - start_time
+        PHASE_SECONDS.observe(elapsed, phase='total')
+        return round(elapsed, 2)
+    
+    def stream_query(self, user_input):
+        """Process a query and yield events as rows are read from SQLite
+
+        Yields a 'meta' event with the SQL and columns, one 'rows' event per
+        fetchmany chunk (rows as arrays), then an 'end' event. Failures are
+        reported as a single 'error' event.
+        """
+        start_time = time.time()
+        sql = ''
+        try:
+            sql, source = generate_sql(user_input, DB_PATH)
+            print(f"Generated SQL ({source}): {sql}")
+
+            rows_iter = iter_query(sql)
+            headers = next(rows_iter)
+            yield {
+                'type': 'meta',
+                'sql_query': sql,
+                'source': source,
+                'columns': headers,
+                'first_row_time': round(time.time() - start_time, 4)
+            }
+
+            row_count = 0
+            for rows in rows_iter:
+                row_count += len(rows)
+                yield {'type': 'rows', 'rows': rows}
+
+            if row_count:
+                response = f"Query executed successfully and returned {row_count} result(s)."
+            else:
+                response = "No results found for your query. The data might not exist or the query needs adjustment."
+            yield {
+                'type': 'end',
                 'success': True,
                 'response': response,
-                'sql_query': sql,
-                'sql_result': sql_result,
-                'execution_time': execution_time
+                'row_count': row_count,
+                'execution_time': round(time.time() - start_time, 2)
             }
 
         except Exception as e:
-            execution_time = round(time.time() - start_time, 2)
-            error_msg = f"Error processing query: {str(e)}"
-            print(error_msg)
-            return {
+            yield {
+                'type': 'error',
                 'success': False,
-                'error': error_msg,
-                'execution_time': execution_time
+                'error': f"Error processing query: {str(e)}",
+                'sql_query': sql,
+                'execution_time': round(time.time() - start_time, 2)
             }
-    
+
     def _generate_response(self, query, results, headers):
-        """Generate a natural language response based on query results"""
+        """Generate a natural language response based on query results (rows as tuples)"""
         if not results:
             return "No results found for your query. The data might not exist or the query needs adjustment."
         
@@ -92,17 +221,18 @@ class SalesChatBot:
         query_lower = query.lower()
         
         if "total" in query_lower and "revenue" in query_lower:
-            if results and 'total_amount' in results[0]:
-                total = sum(float(r.get('total_amount', 0)) for r in results)
+            if results and 'total_amount' in headers:
+                column = headers.index('total_amount')
+                total = sum(float(r[column] or 0) for r in results)
                 return f"The total revenue is ${total:,.2f} based on {result_count} record(s)."
-            elif results and len(results[0]) == 1:
+            elif results and len(headers) == 1:
                 # Single value result
-                value = list(results[0].values())[0]
+                value = results[0][0]
                 return f"The total revenue is ${float(value):,.2f}."
         
         elif "count" in query_lower or "how many" in query_lower:
-            if result_count == 1 and len(results[0]) == 1:
-                count = list(results[0].values())[0]
+            if result_count == 1 and len(headers) == 1:
+                count = results[0][0]
                 return f"Found {count} matching records."
             else:
                 return f"Found {result_count} records matching your criteria."
@@ -123,31 +253,71 @@ def initialize_chatbot():
         chatbot = SalesChatBot()
 
 def get_db_connection():
-    """Get database connection"""
-    db_path = os.path.join('data', 'sales.db')
-    return sqlite3.connect(db_path)
+    """Check out a pooled database connection (use as a context manager)"""
+    return get_pool(DB_PATH).connection()
+
+# Pages are served from memory and re-read when the file changes
+INDEX_PAGE = StaticAsset('web_ui_integrated.html', 'web_ui.html')  # Fallback to the regular web_ui file
+TEST_PAGE = StaticAsset('test_ui.html')
+
+@app.after_request
+def compress_response(response):
+    """gzip / brotli encode complete text and JSON responses above COMPRESS_MIN_BYTES"""
+    if (response.direct_passthrough or response.is_streamed or response.status_code in (204, 304)
+            or 'Content-Encoding' in response.headers or not is_compressible(response.content_type)):
+        return response
+    body = response.get_data()
+    if len(body) < COMPRESS_MIN_BYTES:
+        return response
+    response.vary.add('Accept-Encoding')
+    body, encoding = negotiate(body, response.content_type, request.headers.get('Accept-Encoding', ''))
+    if encoding:
+        response.set_data(body)
+        response.headers['Content-Encoding'] = encoding
+    return response
+
+def asset_response(asset, error_prefix):
+    """Serve an in-memory page, precompressed, answering revalidations with 304"""
+    try:
+        page = asset.current()
+    except Exception as e:
+        return f"{error_prefix}: {str(e)}"
+    if is_not_modified(request.headers, page.etag, page.last_modified):
+        return Response(status=304, headers=page.headers())
+    body, encoding = page.encoded(request.headers.get('Accept-Encoding', ''))
+    return Response(body, content_type=page.content_type, headers=page.headers(encoding))
+
+def data_response(build_payload, *args):
+    """Answer a data endpoint with validators from the database version.
+
+    A client that sends back the ETag (or Last-Modified) of unchanged
+    data gets a 304 without the payload being rebuilt.
+    """
+    validators = data_validators(DB_PATH, request.full_path)
+    if validators and is_not_modified(request.headers, *validators):
+        return Response(status=304, headers=validator_headers(*validators))
+    payload, status = build_payload(*args)
+    response = jsonify(payload)
+    if validators and status == 200:
+        response.headers.update(validator_headers(*validators))
+    return response, status
 
 @app.route('/')
 def index():
     """Serve the main web UI"""
+    return asset_response(INDEX_PAGE, "Error loading UI")
+
+def load_index_html():
+    """Read the main web UI page"""
     try:
-        with open('web_ui_integrated.html', 'r', encoding='utf-8') as f:
-            return f.read()
-    except FileNotFoundError:
-        # Fallback to the regular web_ui file
-        with open('web_ui.html', 'r', encoding='utf-8') as f:
-            return f.read()
+        return INDEX_PAGE.current().text
     except Exception as e:
         return f"Error loading UI: {str(e)}"
 
 @app.route('/test')
 def test_ui():
     """Serve the test UI for debugging"""
-    try:
-        with open('test_ui.html', 'r', encoding='utf-8') as f:
-            return f.read()
-    except Exception as e:
-        return f"Error loading test UI: {str(e)}"
+    return asset_response(TEST_PAGE, "Error loading test UI")
 
 @app.route('/api/query', methods=['POST'])
 def process_query():
@@ -167,152 +337,532 @@ def process_query():
                 'status': 'error'
             }), 400
         
-        # Process the query with chatbot
-        result = chatbot.process_query(query)
-        
-        if not result['success']:
+        result_format, html, error = parse_result_format(data, request.args)
+        if error:
             return jsonify({
                 'success': False,
-                'error': result.get('error', 'Unknown error'),
-                'status': 'error',
-                'sql_query': result.get('sql_query', ''),
-                'execution_time': result.get('execution_time', 0)
-            }), 500        # Generate HTML table if SQL result exists
+                'error': error,
+                'status': 'error'
+            }), 400
+        
+        # Results are cached unless the client opts out with "cache": false
+        # or a "Cache-Control: no-cache" request header
+        use_cache = data.get('cache', True) is not False and \
+            'no-cache' not in request.headers.get('Cache-Control', '')
+        
+        # Process the query with chatbot
+        result = chatbot.process_query(query, use_cache=use_cache)
+        
+        payload, status = build_query_payload(result, result_format, html)
+        return json_response(payload, status)
+        
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e),
+            'status': 'error'
+        }), 500
+
+def parse_result_format(data, args):
+    """Read the result format and HTML option of an /api/query request
+
+    "format" (JSON body or query string) selects how rows are sent:
+    "records" (default) as one object per row, "compact" as "columns" plus
+    "rows" arrays, or "columnar" as "columns" plus one "data" array per
+    column. "html": false leaves out the rendered HTML table.
+
+    Returns:
+        tuple: (format, html, error message or None)
+    """
+    result_format = data.get('format') or args.get('format') or 'records'
+    if result_format not in RESULT_FORMATS:
+        return None, None, f"format must be one of: {', '.join(RESULT_FORMATS)}"
+    html = data.get('html', args.get('html', True))
+    if isinstance(html, str):
+        html = html.lower() not in ('0', 'false', 'no')
+    return result_format, html is not False, None
+
+def result_records(result):
+    """Rows of a process_query result as dicts keyed by column (built once per result)"""
+    records = result.get('sql_result')
+    if records is None:
+        columns = result.get('columns') or []
+        records = result['sql_result'] = [dict(zip(columns, row)) for row in result.get('rows', [])]
+    return records
+
+def build_query_payload(result, result_format='records', html=True):
+    """Build the /api/query JSON body and HTTP status from a process_query result"""
+    if not result['success']:
+        return {
+            'success': False,
+            'error': result.get('error', 'Unknown error'),
+            'status': 'error',
+            'sql_query': result.get('sql_query', ''),
+            'execution_time': result.get('execution_time', 0),
+            'phases': result.get('phases', {})
+        }, 500
+
+    timer = PhaseTimer()
+    columns = result.get('columns') or []
+    rows = result.get('rows') or []
+    payload = {
+        'success': True,
+        'status': 'success',
+        'response': result.get('response', 'Query executed successfully'),
+        'sql_query': result.get('sql_query', ''),
+        'sql_id': result.get('sql_id'),
+        'format': result_format,
+    }
+
+    # Rows: one object per row, or column names once with arrays
+    if result_format == 'records':
+        with timer.phase('dict_conversion'):
+            payload['results'] = result_records(result)
+    elif result_format == 'compact':
+        payload.update(columns=columns, rows=rows)
+    else:
+        payload.update(columns=columns, data=list(zip(*rows)) if rows else [[] for _ in columns])
+
+    # Generate HTML table if SQL result exists
+    if html:
         html_output = ""
-        if result.get('sql_result'):
+        if rows:
             try:
-                html_output = generate_html_table(result['sql_result'], result.get('sql_query', ''))
+                with timer.phase('html_render'):
+                    html_output = render_html_table(rows, columns)
             except Exception as e:
+                record_error('html_render', e)
                 html_output = f"<div class='text-red-600'>Error generating table: {str(e)}</div>"
+        payload['html_output'] = html_output
+        if result_format == 'records':
+            payload['html_table'] = html_output  # Keep backward compatibility
+    
+    payload.update({
+        'source': result.get('source', ''),
+        'cache_hit': result.get('cache_hit', False),
+        'coalesced': result.get('coalesced', False),
+        'truncated': result.get('truncated', False),
+        'row_limit': QUERY_MAX_ROWS,
+        'execution_time': result.get('execution_time', 0),
+        'phases': {**result.get('phases', {}), **timer.breakdown()},
+        'timestamp': datetime.now().isoformat()
+    })
+    return payload, 200
+
+def encode_json(payload) -> bytes:
+    """Serialize a response body with orjson, or the standard library without it"""
+    if orjson is not None:
+        return orjson.dumps(payload, default=str)
+    return json.dumps(payload, ensure_ascii=False, separators=(',', ':'), default=str).encode('utf-8')
+
+def json_response(payload, status=200):
+    """Serialize a payload with encode_json, recording the time it takes"""
+    with PhaseTimer().phase('serialization'):
+        body = encode_json(payload)
+    return Response(body, status=status, mimetype='application/json')
+
+def format_ndjson(event):
+    """Encode one stream event as a newline-delimited JSON record"""
+    return json.dumps(event, default=str) + '\n'
+
+def format_sse(event):
+    """Encode one stream event as a Server-Sent Events message"""
+    return f"event: {event['type']}\ndata: {json.dumps(event, default=str)}\n\n"
+
+@app.route('/api/query/stream', methods=['POST'])
+def stream_query():
+    """Process a natural language query and stream rows as they are read
+
+    Responds with NDJSON by default, or Server-Sent Events when the request
+    sets "format": "sse" or sends "Accept: text/event-stream".
+    """
+    if not chatbot:
+        initialize_chatbot()
         
+    data = request.get_json(silent=True) or {}
+    query = data.get('query', '').strip()
+    
+    if not query:
         return jsonify({
-            'success': True,
-            'status': 'success',
-            'response': result.get('response', 'Query executed successfully'),
-            'sql_query': result.get('sql_query', ''),
-            'html_output': html_output,
-            'html_table': html_output,  # Keep backward compatibility
-            'results': result.get('sql_result', []),
-            'execution_time': result.get('execution_time', 0),
-            'timestamp': datetime.now().isoformat()
-        })
+            'success': False,
+            'error': 'Query is required',
+            'status': 'error'
+        }), 400
+    
+    use_sse = data.get('format') == 'sse' or \
+        'text/event-stream' in request.headers.get('Accept', '')
+    if use_sse:
+        encode, mimetype = format_sse, 'text/event-stream'
+    else:
+        encode, mimetype = format_ndjson, 'application/x-ndjson'
+    
+    def generate():
+        for event in chatbot.stream_query(query):
+            yield encode(event)
+    
+    return Response(stream_with_context(generate()), mimetype=mimetype,
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+@app.route('/api/export', methods=['GET', 'POST'])
+def export_query():
+    """Stream a query result as CSV, Arrow IPC or Parquet
+
+    Parameters (JSON body or query string):
+        question: natural language question; its SQL is generated (rules,
+            cache or LLM) and run
+        sql_id: the sql_id of an earlier /api/query response, to export
+            exactly that statement
+        format: csv (default), arrow or parquet (the last two need pyarrow)
+
+    Rows are read from SQLite EXPORT_BATCH_ROWS at a time and each batch
+    is converted and sent before the next is read.
+    """
+    params = {**request.args.to_dict(), **(request.get_json(silent=True) or {})}
+    fmt = params.get('format', 'csv')
+    question = (params.get('question') or '').strip()
+    key = params.get('sql_id')
+    
+    try:
+        check_format(fmt)
+        if key:
+            sql = SQL_REGISTRY.get(key)
+            if sql is None:
+                return jsonify({
+                    'success': False,
+                    'error': f"Unknown sql_id {key!r}; ask the question through /api/query first "
+                             f"or export by question",
+                    'status': 'error'
+                }), 404
+        elif question:
+            sql, source = generate_sql(question, DB_PATH)
+            key = SQL_REGISTRY.register(sql)
+            print(f"Exporting SQL ({source}): {sql}")
+        else:
+            return jsonify({
+                'success': False,
+                'error': 'question or sql_id is required',
+                'status': 'error'
+            }), 400
         
+        declared = column_types(sql) if fmt != 'csv' else None
+        batches = iter_query(sql, EXPORT_BATCH_ROWS)
+        body = export_rows(fmt, next(batches), batches, declared)
+    
+    except ExportError as e:
+        return jsonify({'success': False, 'error': str(e), 'status': 'error'}), 400
+    except QueryRejected as e:
+        record_error('export', e)
+        return jsonify({'success': False, 'error': f"❌ {e}", 'sql_query': sql, 'status': 'error'}), 400
     except Exception as e:
+        record_error('export', e)
         return jsonify({
             'success': False,
-            'error': str(e),
+            'error': f"Error exporting query: {str(e)}",
             'status': 'error'
         }), 500
+    
+    content_type, extension = EXPORT_FORMATS[fmt]
+    return Response(stream_with_context(body), content_type=content_type, headers={
+        'Content-Disposition': f'attachment; filename="export-{key}.{extension}"',
+        'X-SQL-Id': key,
+        'Cache-Control': 'no-cache'
+    })
+
+@app.route('/api/query/batch', methods=['POST'])
+def process_query_batch():
+    """Answer a list of questions concurrently
+
+    Body: {"questions": [...], "cache": bool, "stream": bool, "ordered": bool}
+
+    Returns every result in input order, or with "stream": true (or
+    "Accept: application/x-ndjson") one NDJSON 'result' record per question
+    as it finishes followed by an 'end' record. Streamed results are in
+    input order when "ordered": true.
+    """
+    if not chatbot:
+        initialize_chatbot()
+    
+    data = request.get_json(silent=True)
+    data = data if isinstance(data, dict) else {}
+    questions, error = parse_batch_questions(data)
+    if error:
+        return jsonify({
+            'success': False,
+            'error': error,
+            'status': 'error'
+        }), 400
+    
+    use_cache = data.get('cache', True) is not False and \
+        'no-cache' not in request.headers.get('Cache-Control', '')
+    start_time = time.time()
+    results = run_batch(questions, lambda q: chatbot.process_query(q, use_cache=use_cache),
+                        workers=BATCH_CONCURRENCY)
+    
+    stream = data.get('stream') is True or \
+        'application/x-ndjson' in request.headers.get('Accept', '')
+    if not stream:
+        items = [build_batch_item(index, questions[index], result)
+                 for index, result in iter_in_order(results)]
+        return jsonify(build_batch_summary(items, start_time, results=items)), 200
+    
+    if data.get('ordered') is True:
+        results = iter_in_order(results)
+    
+    def generate():
+        items = []
+        for index, result in results:
+            item = build_batch_item(index, questions[index], result)
+            items.append(item)
+            yield format_ndjson({'type': 'result', **item})
+        yield format_ndjson({'type': 'end', **build_batch_summary(items, start_time)})
+    
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+def parse_batch_questions(data):
+    """Validate a batch request body and return (questions, error message)"""
+    questions = data.get('questions')
+    if not isinstance(questions, list) or not questions:
+        return None, 'questions must be a non-empty list'
+    if len(questions) > BATCH_MAX_QUESTIONS:
+        return None, f'At most {BATCH_MAX_QUESTIONS} questions per batch'
+    if not all(isinstance(q, str) and q.strip() for q in questions):
+        return None, 'Every question must be a non-empty string'
+    return [q.strip() for q in questions], None
+
+def build_batch_item(index, question, result):
+    """Build one per-question entry of a batch response"""
+    item = {
+        'index': index,
+        'question': question,
+        'success': result['success'],
+        'sql_query': result.get('sql_query', ''),
+        'execution_time': result.get('execution_time', 0)
+    }
+    if result['success']:
+        item.update({
+            'response': result.get('response', ''),
+            'results': result_records(result),
+            'source': result.get('source', ''),
+            'cache_hit': result.get('cache_hit', False),
+            'coalesced': result.get('coalesced', False),
+            'truncated': result.get('truncated', False)
+        })
+    else:
+        item['error'] = result.get('error', 'Unknown error')
+    return item
+
+def build_batch_summary(items, start_time, **extra):
+    """Build the batch totals shared by the JSON and NDJSON responses"""
+    succeeded = sum(1 for item in items if item['success'])
+    return {
+        'success': True,
+        'status': 'success',
+        'count': len(items),
+        'succeeded': succeeded,
+        'failed': len(items) - succeeded,
+        'execution_time': round(time.time() - start_time, 2),
+        **extra,
+        'timestamp': datetime.now().isoformat()
+    }
+
+@app.route('/metrics', methods=['GET'])
+def get_metrics():
+    """Prometheus metrics: phase histograms, errors, in-flight questions and cache counters"""
+    return Response(REGISTRY.render() + collect_cache_metrics(), mimetype=CONTENT_TYPE)
+
+def collect_cache_metrics(bot=None):
+    """Render cache, SQL-path and coalescing counters owned by other modules"""
+    bot = bot or chatbot
+    questions = get_query_cache().stats()
+    results = get_result_cache(DB_PATH).stats()
+    parts = [
+        render_metric('sales_chatbot_cache_lookups_total', 'counter',
+                      'Question -> SQL and SQL result cache lookups by outcome', [
+                          ({'cache': 'question', 'result': 'hit'}, questions['hits']),
+                          ({'cache': 'question', 'result': 'miss'}, questions['misses']),
+                          ({'cache': 'result', 'result': 'hit'}, results['hits']),
+                          ({'cache': 'result', 'result': 'miss'}, results['misses']),
+                      ]),
+        render_metric('sales_chatbot_result_cache_bytes', 'gauge',
+                      'Bytes held by the SQL result cache', [({}, results['bytes'])]),
+        render_metric('sales_chatbot_sql_source_total', 'counter',
+                      'Questions answered by each SQL path',
+                      [({'source': source}, count) for source, count in source_stats().items()]),
+    ]
+    backends = backend_stats()
+    parts += [
+        render_metric('sales_chatbot_llm_requests_total', 'counter',
+                      'LLM backend calls by outcome (cancelled = lost to a hedge, rejected = failed fast)',
+                      [({'backend': b['name'], 'outcome': outcome}, b[outcome])
+                       for b in backends for outcome in ('ok', 'error', 'invalid', 'cancelled', 'rejected')]),
+        render_metric('sales_chatbot_llm_hedged_total', 'counter',
+                      'Questions also sent to a backend because the one before it was slow or failed',
+                      [({'backend': b['name']}, b['hedged']) for b in backends]),
+        render_metric('sales_chatbot_llm_latency_seconds', 'gauge',
+                      'Recent LLM backend latency percentiles (the hedge delay uses HEDGE_PERCENTILE)',
+                      [({'backend': b['name'], 'quantile': q}, b[f'p{p}_ms'] / 1000)
+                       for b in backends for q, p in (('0.5', 50), ('0.95', 95), ('0.99', 99))
+                       if b[f'p{p}_ms'] is not None]),
+        render_metric('sales_chatbot_llm_retries_total', 'counter',
+                      'LLM calls retried after a 429, 5xx or network error',
+                      [({'backend': b['name']}, b['retries']) for b in backends]),
+        render_metric('sales_chatbot_llm_throttled_total', 'counter',
+                      'LLM calls rejected by the provider with 429',
+                      [({'backend': b['name']}, b['throttled']) for b in backends]),
+        render_metric('sales_chatbot_llm_circuit_state', 'gauge',
+                      'LLM backend circuit breaker state (1 for the current one)',
+                      [({'backend': b['name'], 'state': state}, int(b['circuit'] == state))
+                       for b in backends for state in ('closed', 'open', 'half-open')]),
+    ]
+    if bot is not None:
+        flights = bot.flights.stats()
+        parts.append(render_metric('sales_chatbot_coalesced_total', 'counter',
+                                   'Questions merged into an identical in-flight question',
+                                   [({}, flights['merged'])]))
+    return ''.join(parts)
 
 @app.route('/api/stats', methods=['GET'])
 def get_stats():
-    """Get database statistics"""
+    """Get database statistics (O(1) lookups when the summary tables are installed)"""
+    return data_response(build_stats_payload)
+
+def build_stats_payload():
+    """Build the /api/stats JSON body and HTTP status"""
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        
-        # Get basic counts
-        cursor.execute("SELECT COUNT(*) FROM customers")
-        customer_count = cursor.fetchone()[0]
-        
-        cursor.execute("SELECT COUNT(*) FROM products")
-        product_count = cursor.fetchone()[0]
-        
-        cursor.execute("SELECT COUNT(*) FROM orders")
-        order_count = cursor.fetchone()[0]
-          # Get revenue stats
-        cursor.execute("SELECT SUM(price * quantity) FROM orders WHERE status = 'completed'")
-        total_revenue = cursor.fetchone()[0] or 0
+        with get_db_connection() as conn:
+            stats = read_stats(conn)
         
-        # Get customer type breakdown
-        cursor.execute("""
-            SELECT customer_type, COUNT(*) as count, 
-                   COALESCE(SUM(o.price * o.quantity), 0) as revenue
-            FROM customers c
-            LEFT JOIN orders o ON c.customer_id = o.customer_id 
-            WHERE o.status = 'completed' OR o.status IS NULL
-            GROUP BY customer_type
-        """)
-        customer_breakdown = cursor.fetchall()
-        
-        conn.close()
-        
-        return jsonify({
+        return {
             'status': 'success',
-            'stats': {
-                'customers': customer_count,
-                'products': product_count,
-                'orders': order_count,
-                'total_revenue': total_revenue,
-                'customer_breakdown': [
-                    {
-                        'type': row[0],
-                        'count': row[1],
-                        'revenue': row[2]
-                    } for row in customer_breakdown
-                ]
-            }
-        })
+            'stats': stats
+        }, 200
         
     except Exception as e:
-        return jsonify({
+        return {
             'error': str(e),
             'status': 'error'
-        }), 500
+        }, 500
+
+@app.route('/api/cache/stats', methods=['GET'])
+def get_cache_stats():
+    """Get cache counters, per-path request counts and coalescing counters"""
+    return jsonify(build_cache_stats_payload())
+
+def build_cache_stats_payload(bot=None):
+    """Build the /api/cache/stats JSON body"""
+    bot = bot or chatbot
+    return {
+        'status': 'success',
+        'cache': get_query_cache().stats(),
+        'results': get_result_cache(DB_PATH).stats(),
+        'sources': source_stats(),
+        'backends': backend_stats(),
+        'coalescing': bot.flights.stats() if bot else None
+    }
+
+EXAMPLE_QUERIES = [
+    "How many VIP customers do we have?",
+    "What is the total revenue from completed orders?",
+    "Show me the top 3 products by sales",
+    "What is the average order value?",
+    "How many orders were placed last month?",
+    "Which customer type generates the most revenue?",
+    "Show all customers",
+    "Show all products",
+    "Show all orders"
+]
 
 @app.route('/api/examples', methods=['GET'])
 def get_examples():
     """Get example queries"""
-    examples = [
-        "How many VIP customers do we have?",
-        "What is the total revenue from completed orders?",
-        "Show me the top 3 products by sales",
-        "What is the average order value?",
-        "How many orders were placed last month?",
-        "Which customer type generates the most revenue?",
-        "Show all customers",
-        "Show all products",
-        "Show all orders"
-    ]
-    
     return jsonify({
         'status': 'success',
-        'examples': examples
+        'examples': EXAMPLE_QUERIES
     })
 
 @app.route('/api/database', methods=['GET'])
 def get_database_contents():
-    """Get complete database contents"""
+    """Get database contents, one keyset-paginated page at a time
+
+    Query parameters:
+        table: customers, products or orders (default: first page of each)
+        limit: rows per page
+        cursor: next_cursor from the previous page
+        sort: indexed column to sort by, '-' prefix for descending
+        fields: comma-separated column projection
+        <column> / <column>__gt|gte|lt|lte|ne: filters; a repeated <column>
+            or <column>__ne matches any / none of its values
+        _<anything>: ignored (cache busters)
+        full=1: the original complete dump of all three tables
+    """
+    return data_response(build_database_payload, request.args)
+
+def build_database_payload(args):
+    """Build the /api/database JSON body and HTTP status from query parameters"""
+    if args.get('full', '').lower() in ('1', 'true', 'yes'):
+        return build_full_database_payload()
+    
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
+        table = args.get('table')
+        page_args = {
+            'limit': args.get('limit', 100),
+            'cursor': args.get('cursor'),
+            'sort': args.get('sort'),
+            'filters': args,
+            'fields': args.get('fields', '').split(',')
+        }
         
-        # Get customers
-        cursor.execute("SELECT * FROM customers ORDER BY customer_id")
-        customers = cursor.fetchall()
-        cursor.execute("PRAGMA table_info(customers)")
-        customer_columns = [col[1] for col in cursor.fetchall()]
+        with get_db_connection() as conn:
+            if table:
+                page = fetch_page(conn, table, **page_args)
+                return {'status': 'success', 'table': table, **page}, 200
+            
+            pages = {name: fetch_page(conn, name, limit=page_args['limit'])
+                     for name in PAGE_TABLES}
+        return {'status': 'success', 'data': pages}, 200
+    
+    except (PaginationError, ValueError) as e:
+        return {
+            'error': str(e),
+            'status': 'error'
+        }, 400
+    except Exception as e:
+        return {
+            'error': str(e),
+            'status': 'error'
+        }, 500
+
+def build_full_database_payload():
+    """Build the complete database dump (small databases only)"""
+    try:
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
         
-        # Get products
-        cursor.execute("SELECT * FROM products ORDER BY product_id")
-        products = cursor.fetchall()
-        cursor.execute("PRAGMA table_info(products)")
-        product_columns = [col[1] for col in cursor.fetchall()]
+            # Get customers
+            cursor.execute("SELECT * FROM customers ORDER BY customer_id")
+            customers = cursor.fetchall()
+            cursor.execute("PRAGMA table_info(customers)")
+            customer_columns = [col[1] for col in cursor.fetchall()]
         
-        # Get orders
-        cursor.execute("SELECT * FROM orders ORDER BY order_date DESC")
-        orders = cursor.fetchall()
-        cursor.execute("PRAGMA table_info(orders)")
-        order_columns = [col[1] for col in cursor.fetchall()]
+            # Get products
+            cursor.execute("SELECT * FROM products ORDER BY product_id")
+            products = cursor.fetchall()
+            cursor.execute("PRAGMA table_info(products)")
+            product_columns = [col[1] for col in cursor.fetchall()]
         
-        conn.close()
+            # Get orders
+            cursor.execute("SELECT * FROM orders ORDER BY order_date DESC")
+            orders = cursor.fetchall()
+            cursor.execute("PRAGMA table_info(orders)")
+            order_columns = [col[1] for col in cursor.fetchall()]
         
         # Convert to dictionaries
         customers_data = [dict(zip(customer_columns, row)) for row in customers]
         products_data = [dict(zip(product_columns, row)) for row in products]
         orders_data = [dict(zip(order_columns, row)) for row in orders]
         
-        return jsonify({
+        return {
             'status': 'success',
             'data': {
                 'customers': {
@@ -331,65 +881,17 @@ def get_database_contents():
                     'count': len(orders_data)
                 }
             }
-        })
+        }, 200
         
     except Exception as e:
-        return jsonify({
+        return {
             'error': str(e),
             'status': 'error'
-        }), 500
+        }, 500
 
 def generate_html_table(data, sql_query):
     """Generate HTML table from SQL results"""
-    if not data:
-        return "<div class='text-gray-500 text-center py-8'>No results found</div>"
-    
-    # Extract headers and rows
-    headers = list(data[0].keys()) if isinstance(data[0], dict) else []
-    
-    if not headers:
-        # Handle tuple/list format
-        headers = [f"Column_{i+1}" for i in range(len(data[0]))]
-        rows = data
-    else:
-        # Handle dict format
-        rows = [[row[col] for col in headers] for row in data]
-    
-    # Generate HTML table
-    html = '<div class="overflow-x-auto">'
-    html += '<table class="min-w-full divide-y divide-gray-200">'
-    
-    # Headers
-    html += '<thead class="bg-gray-50">'
-    html += '<tr>'
-    for header in headers:
-        html += f'<th class="px-6 py-3 text-left text-xs font-medium text-gray-500 uppercase tracking-wider">{header}</th>'
-    html += '</tr>'
-    html += '</thead>'
-    
-    # Body
-    html += '<tbody class="bg-white divide-y divide-gray-200">'
-    for row in rows:
-        html += '<tr>'
-        for cell in row:
-            # Format cell value
-            if isinstance(cell, float):
-                if cell > 1000:
-                    formatted_cell = f"${cell:,.2f}"
-                else:
-                    formatted_cell = f"{cell:.2f}"
-            elif isinstance(cell, int) and cell > 1000:
-                formatted_cell = f"{cell:,}"
-            else:
-                formatted_cell = str(cell)
-            
-            html += f'<td class="px-6 py-4 whitespace-nowrap text-sm text-gray-900">{formatted_cell}</td>'
-        html += '</tr>'
-    html += '</tbody>'
-    html += '</table>'
-    html += '</div>'
-    
-    return html
+    return render_html_table(data)
 
 if __name__ == '__main__':
     print("🚀 Starting Sales Chatbot Web Server...")